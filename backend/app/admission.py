@@ -0,0 +1,232 @@
+"""Admission control and load shedding for the todo routes.
+
+Without it, an overloaded worker queues every request in Starlette's
+threadpool and on the connection pool, until they all time out together.
+Instead, at most ADMISSION_MAX_IN_FLIGHT requests per worker run at once;
+up to ADMISSION_MAX_QUEUE more wait in arrival order, each for at most
+ADMISSION_QUEUE_TIMEOUT_MS. A request that finds the queue full, or waits
+past its timeout, gets an immediate 503 with Retry-After, so the requests
+that are admitted finish in time and clients back off.
+
+With RATE_LIMIT_PER_SECOND, each client address also has a token bucket of
+RATE_LIMIT_BURST requests, refilled at that rate; requests over it get 429.
+Both limits are per worker process.
+
+Admission happens in the event loop, when the router hands a request to
+its route, before the request gets a threadpool thread or a connection.
+Only routes built with AdmittedRoute (routes.router) are gated, so the
+internal and metrics endpoints answer under overload.
+"""
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, Optional, Tuple
+
+from fastapi.responses import ORJSONResponse
+from starlette.types import Receive, Scope, Send
+
+from app import config, metrics
+from app.middleware.timing import TimedRoute
+
+class Rejected(Exception):
+    """Raised instead of admitting a request; carries the response to send."""
+
+    def __init__(self, reason: str, status_code: int, detail: str, retry_after: float):
+        super().__init__(detail)
+        self.reason = reason
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+    def response(self) -> ORJSONResponse:
+        return ORJSONResponse(
+            {"detail": self.detail},
+            status_code=self.status_code,
+            headers={"Retry-After": str(max(1, math.ceil(self.retry_after)))},
+        )
+
+class TokenBuckets:
+    """One token bucket per client, the least recently seen dropped beyond ``max_clients``.
+
+    A dropped client starts again with a full bucket.
+    """
+
+    def __init__(self, rate_per_second: float, burst: int, max_clients: int = 10000):
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    def take(self, client: str, now: float) -> float:
+        """Take a token for ``client``: 0.0 if there was one, else the seconds until there is."""
+        tokens, updated_at = self._buckets.pop(client, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated_at) * self.rate_per_second)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / self.rate_per_second
+        self._buckets[client] = (tokens, now)
+        if len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)
+        return wait
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+class AdmissionController:
+    """Limits the requests served at once, queueing a bounded number more; see the module docstring.
+
+    ``max_in_flight`` 0 admits every request that its client's rate limit
+    allows. Slots pass straight from a finishing request to the oldest
+    waiter, so queued requests are served in arrival order. Used from one
+    event loop at a time.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int,
+        max_queue: int,
+        queue_timeout_seconds: float,
+        retry_after_seconds: float,
+        rate_limits: Optional[TokenBuckets] = None,
+    ):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self.retry_after_seconds = retry_after_seconds
+        self.rate_limits = rate_limits
+        self.in_flight = 0
+        self.admitted = 0
+        self.shed: Dict[str, int] = {"queue_full": 0, "queue_timeout": 0, "rate_limited": 0}
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    def stats(self) -> dict:
+        stats = {
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "queue_timeout_ms": self.queue_timeout_seconds * 1000,
+            "in_flight": self.in_flight,
+            "queued": len(self._waiters),
+            "admitted": self.admitted,
+            "shed": dict(self.shed),
+        }
+        if self.rate_limits is not None:
+            stats["rate_limit"] = {
+                "per_second": self.rate_limits.rate_per_second,
+                "burst": self.rate_limits.burst,
+                "clients": len(self.rate_limits),
+            }
+        return stats
+
+    @asynccontextmanager
+    async def admit(self, client: str) -> AsyncIterator[None]:
+        """Hold a slot for the body of the ``async with``; raises Rejected instead of admitting."""
+        if self.rate_limits is not None:
+            wait = self.rate_limits.take(client, time.monotonic())
+            if wait > 0:
+                raise self._reject("rate_limited", 429, "Too many requests", wait)
+        if self.max_in_flight <= 0:
+            self.admitted += 1
+            yield
+            return
+        if self.in_flight < self.max_in_flight and not self._waiters:
+            self.in_flight += 1
+        else:
+            await self._wait()
+        self.admitted += 1
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def _wait(self) -> None:
+        if len(self._waiters) >= self.max_queue:
+            raise self._reject("queue_full", 503, "Server overloaded", self.retry_after_seconds)
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        self._waiters.append(waiter)
+        metrics.ADMISSION_QUEUE_DEPTH.set(len(self._waiters))
+        started = loop.time()
+        timer = loop.call_later(self.queue_timeout_seconds, self._expire, waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            # The client went away; a slot handed over in the meantime goes to the next waiter.
+            if waiter.done() and not waiter.cancelled() and waiter.exception() is None:
+                self._release()
+            else:
+                self._forget(waiter)
+            raise
+        finally:
+            timer.cancel()
+        metrics.ADMISSION_WAIT.observe(loop.time() - started)
+
+    def _expire(self, waiter: asyncio.Future) -> None:
+        if waiter.done():
+            return
+        self._forget(waiter)
+        waiter.set_exception(
+            self._reject("queue_timeout", 503, "Server overloaded", self.retry_after_seconds)
+        )
+
+    def _forget(self, waiter: asyncio.Future) -> None:
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+        metrics.ADMISSION_QUEUE_DEPTH.set(len(self._waiters))
+
+    def _release(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                metrics.ADMISSION_QUEUE_DEPTH.set(len(self._waiters))
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def _reject(self, reason: str, status_code: int, detail: str, retry_after: float) -> Rejected:
+        self.shed[reason] += 1
+        metrics.ADMISSION_SHED.labels(reason).inc()
+        return Rejected(reason, status_code, detail, retry_after)
+
+def client_address(scope: Scope) -> str:
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+# Per-worker admission control of routes.router; None when both
+# ADMISSION_MAX_IN_FLIGHT and RATE_LIMIT_PER_SECOND are 0.
+admission_controller: Optional[AdmissionController] = (
+    AdmissionController(
+        config.ADMISSION_MAX_IN_FLIGHT,
+        config.ADMISSION_MAX_QUEUE,
+        config.ADMISSION_QUEUE_TIMEOUT_MS / 1000,
+        config.ADMISSION_RETRY_AFTER_SECONDS,
+        TokenBuckets(config.RATE_LIMIT_PER_SECOND, config.RATE_LIMIT_BURST)
+        if config.RATE_LIMIT_PER_SECOND > 0
+        else None,
+    )
+    if config.ADMISSION_MAX_IN_FLIGHT > 0 or config.RATE_LIMIT_PER_SECOND > 0
+    else None
+)
+
+# Event streams last as long as the client stays connected and are capped
+# by STREAM_MAX_SUBSCRIBERS instead.
+UNADMITTED_PATHS = frozenset({"/todos/stream"})
+
+class AdmittedRoute(TimedRoute):
+    """TimedRoute that passes each request through ``admission_controller`` first."""
+
+    async def handle(self, scope: Scope, receive: Receive, send: Send) -> None:
+        controller = admission_controller
+        if controller is None or self.path in UNADMITTED_PATHS:
+            await super().handle(scope, receive, send)
+            return
+        try:
+            async with controller.admit(client_address(scope)):
+                await super().handle(scope, receive, send)
+        except Rejected as rejected:
+            await rejected.response()(scope, receive, send)
@@ -0,0 +1,79 @@
+"""Move old completed todos to todos_archive: python -m app.archive [--days N] [--batch-size N] [--retention-days N]
+
+A todo is archived once it has been completed and unchanged for
+ARCHIVE_AFTER_DAYS; todos have no completion time of their own, so this
+goes by updated_at. Todos move ARCHIVE_BATCH_SIZE at a time, each batch in
+its own transaction, so writers wait for one short batch at a time rather
+than the whole run. Run it from cron, or set ARCHIVE_INTERVAL_SECONDS to
+have every worker run it in the background; concurrent runs skip the
+todos another run has locked, so they never move a todo twice. Each run
+then prunes change-feed history older than CHANGES_RETENTION_DAYS.
+"""
+import argparse
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Callable
+
+from sqlalchemy.exc import SQLAlchemyError
+from starlette.concurrency import run_in_threadpool
+
+from app import cache, config, events
+from app.database import SessionLocal
+from app.repositories.todo_repository import TodoRepository
+from app.services.todo_service import TodoService
+
+logger = logging.getLogger(__name__)
+
+def archive_completed(session_factory: Callable, days: int, batch_size: int) -> int:
+    """Archive every todo due for it, batch by batch; returns how many moved."""
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    total = 0
+    while True:
+        with session_factory() as db:
+            repository = TodoRepository(db, counts=config.STATS_COUNTERS_ENABLED)
+            archived = TodoService(repository, cache.todo_cache, events.todo_events).archive_todos(cutoff, batch_size)
+        total += len(archived)
+        if len(archived) < batch_size:
+            return total
+
+def prune_changes(session_factory: Callable, days: int) -> int:
+    """Prune change-feed history older than ``days``, unless it is 0; returns how many tombstones went."""
+    if days <= 0:
+        return 0
+    with session_factory() as db:
+        repository = TodoRepository(db)
+        return TodoService(repository).prune_changes(datetime.utcnow() - timedelta(days=days))
+
+async def archive_periodically(interval: float) -> None:
+    """Run ``archive_completed`` every ``interval`` seconds until cancelled."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            archived = await run_in_threadpool(
+                archive_completed, SessionLocal, config.ARCHIVE_AFTER_DAYS, config.ARCHIVE_BATCH_SIZE
+            )
+        except SQLAlchemyError as e:
+            logger.warning("Archiving completed todos failed: %s", e)
+            continue
+        if archived:
+            logger.info("Archived %s completed todos", archived)
+        try:
+            await run_in_threadpool(prune_changes, SessionLocal, config.CHANGES_RETENTION_DAYS)
+        except SQLAlchemyError as e:
+            logger.warning("Pruning the change feed failed: %s", e)
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=config.ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--batch-size", type=int, default=config.ARCHIVE_BATCH_SIZE)
+    parser.add_argument("--retention-days", type=int, default=config.CHANGES_RETENTION_DAYS)
+    args = parser.parse_args(argv)
+    archived = archive_completed(SessionLocal, args.days, args.batch_size)
+    print(f"Archived {archived} todos completed more than {args.days} days ago")
+    pruned = prune_changes(SessionLocal, args.retention_days)
+    if pruned:
+        print(f"Pruned {pruned} change-feed tombstones older than {args.retention_days} days")
+
+if __name__ == "__main__":
+    main()
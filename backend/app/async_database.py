@@ -0,0 +1,72 @@
+import os
+from typing import Optional
+from fastapi import Depends, Request
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from app import config, request_timing
+from app.config import DATABASE_URL
+from app.database import pool_options
+from app.pool_metrics import PoolMetrics
+from app.replicas import AsyncReplicaSet, Replica, wrote_recently
+
+_ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def to_async_url(url: str) -> str:
+    """Map a sync DATABASE_URL onto the matching asyncio driver (asyncpg, aiosqlite)."""
+    parsed = make_url(url)
+    drivername = _ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if drivername is None:
+        raise ValueError(f"No async driver configured for {parsed.drivername}")
+    return parsed.set(drivername=drivername).render_as_string(hide_password=False)
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or to_async_url(DATABASE_URL)
+
+async_pool_metrics = PoolMetrics()
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL, **pool_options(ASYNC_DATABASE_URL, async_pool_metrics, AsyncAdaptedQueuePool)
+)
+async_pool_metrics.listen(async_engine.sync_engine)
+request_timing.listen(async_engine.sync_engine)
+
+# Lazy loads are not possible on an AsyncSession, so objects must not expire on commit.
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def _replica(url: str) -> Replica:
+    async_url = to_async_url(url)
+    metrics = PoolMetrics()
+    replica_engine = create_async_engine(async_url, **pool_options(async_url, metrics, AsyncAdaptedQueuePool))
+    metrics.listen(replica_engine.sync_engine)
+    request_timing.listen(replica_engine.sync_engine)
+    session_factory = async_sessionmaker(replica_engine, autoflush=False, expire_on_commit=False)
+    return Replica(make_url(url).render_as_string(hide_password=True), replica_engine, session_factory, metrics)
+
+async_replica_set: Optional[AsyncReplicaSet] = (
+    AsyncReplicaSet(
+        [_replica(url) for url in config.DATABASE_REPLICA_URLS],
+        config.REPLICA_CHECK_SECONDS,
+        config.REPLICA_RETRY_SECONDS,
+    )
+    if config.DATABASE_REPLICA_URLS
+    else None
+)
+
+async def get_async_read_db(request: Request, primary: AsyncSession = Depends(get_async_db)):
+    """Async counterpart of app.database.get_read_db."""
+    db = None
+    if async_replica_set is not None and not wrote_recently(request):
+        db = await async_replica_set.connect()
+    if db is None:
+        yield primary
+        return
+    try:
+        yield db
+    finally:
+        await db.close()
@@ -0,0 +1,202 @@
+from fastapi import APIRouter, Body, Depends, Query, Response, status, HTTPException
+from fastapi.routing import APIRoute
+from contextlib import nullcontext
+from typing import Annotated, List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import ValidationError
+
+from app import cache, config, events, schemas
+from app.admission import AdmittedRoute
+from app.async_database import AsyncSessionLocal, get_async_db, get_async_read_db
+from app.pagination import MAX_PAGE_SIZE, DEFAULT_PAGE_SIZE
+from app.responses import TodoListResponse, todo_changes_response
+from app.repositories.async_todo_repository import AsyncTodoRepository
+from app.routes import (
+    BatchAborted,
+    batch_aborted_response,
+    batch_call,
+    batch_error,
+    batch_result,
+    bulk_create_results,
+    bulk_delete_results,
+    bulk_update_results,
+)
+from app.services.async_todo_service import AsyncTodoService
+from app.write_coalescer import AsyncWriteCoalescer
+
+router = APIRouter(route_class=AdmittedRoute)
+
+def get_async_todo_service(db: AsyncSession = Depends(get_async_db)) -> AsyncTodoService:
+    repository = AsyncTodoRepository(db, counts=config.STATS_COUNTERS_ENABLED)
+    return AsyncTodoService(repository, cache.todo_cache, events.todo_events)
+
+def get_async_read_todo_service(db: AsyncSession = Depends(get_async_read_db)) -> AsyncTodoService:
+    repository = AsyncTodoRepository(db, counts=config.STATS_COUNTERS_ENABLED)
+    return AsyncTodoService(repository, cache.todo_cache, events.todo_events)
+
+async_write_coalescer: Optional[AsyncWriteCoalescer] = (
+    AsyncWriteCoalescer(
+        AsyncSessionLocal,
+        get_async_todo_service,
+        config.WRITE_COALESCE_WINDOW_MS / 1000,
+        config.WRITE_COALESCE_MAX_BATCH,
+        config.WRITE_COALESCE_TIMEOUT_SECONDS,
+    )
+    if config.WRITE_COALESCE_ENABLED
+    else None
+)
+
+def get_async_single_write_service(service: AsyncTodoService = Depends(get_async_todo_service)):
+    return service if async_write_coalescer is None else async_write_coalescer
+
+def overlay(sync_router: APIRouter) -> APIRouter:
+    """Return ``sync_router`` with every route that has an async implementation swapped for it.
+
+    Route order is taken from the sync router so static paths keep matching
+    before ``/todos/{todo_id}``; endpoints without an async version stay sync.
+    """
+    async_routes = {
+        (route.path, frozenset(route.methods)): route
+        for route in router.routes
+        if isinstance(route, APIRoute)
+    }
+    merged = APIRouter()
+    for route in sync_router.routes:
+        key = (route.path, frozenset(route.methods)) if isinstance(route, APIRoute) else None
+        merged.routes.append(async_routes.get(key, route))
+    return merged
+
+@router.get("/todos", response_model=List[schemas.Todo])
+async def list_todos(
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    status: Optional[schemas.TodoStatusFilter] = None,
+    sort: schemas.TodoSort = "created_at",
+    include_archived: bool = False,
+    service: AsyncTodoService = Depends(get_async_read_todo_service),
+):
+    if limit is None and cursor is None:
+        return TodoListResponse(await service.get_all_todos(status, sort, include_archived))
+    try:
+        todos, next_cursor = await service.get_todo_page(
+            limit or DEFAULT_PAGE_SIZE, cursor, status, sort, include_archived
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    return TodoListResponse(todos, headers=headers)
+
+@router.get("/todos/search", response_model=List[schemas.Todo])
+async def search_todos(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    service: AsyncTodoService = Depends(get_async_read_todo_service),
+):
+    try:
+        todos, next_cursor = await service.search_todos(q, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    return TodoListResponse(todos, headers=headers)
+
+@router.get("/todos/stats", response_model=schemas.TodoStats)
+async def get_stats(include_archived: bool = False, service: AsyncTodoService = Depends(get_async_read_todo_service)):
+    return await service.get_stats(include_archived=include_archived)
+
+# Always the primary: the committed watermark needs its view of the writes in flight.
+@router.get("/todos/changes", response_model=schemas.TodoChanges)
+async def get_changes(since: Optional[str] = None, service: AsyncTodoService = Depends(get_async_todo_service)):
+    try:
+        changes, cursor = await service.get_changes(since)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return todo_changes_response(changes, cursor)
+
+@router.post("/todos/bulk", response_model=List[schemas.TodoBulkResult])
+async def create_todos(todos: schemas.TodoBulkCreateRequest, service: AsyncTodoService = Depends(get_async_todo_service)):
+    try:
+        created = await service.create_todos(todos)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return bulk_create_results(created)
+
+@router.patch("/todos/bulk", response_model=List[schemas.TodoBulkResult])
+async def update_todos(updates: schemas.TodoBulkUpdateRequest, service: AsyncTodoService = Depends(get_async_todo_service)):
+    return bulk_update_results(updates, await service.update_todos(updates))
+
+@router.delete("/todos/bulk", response_model=List[schemas.TodoBulkResult])
+async def delete_todos(todo_ids: Annotated[schemas.TodoBulkDeleteRequest, Body()], service: AsyncTodoService = Depends(get_async_todo_service)):
+    return bulk_delete_results(todo_ids, await service.delete_todos(todo_ids))
+
+@router.post("/batch", response_model=schemas.BatchResponse)
+async def run_batch(batch: schemas.BatchRequest, service: AsyncTodoService = Depends(get_async_todo_service)):
+    results: List[schemas.TodoBulkResult] = []
+    try:
+        async with service.transaction():
+            for operation in batch.operations:
+                try:
+                    async with nullcontext() if batch.atomic else service.savepoint():
+                        results.append(batch_result(operation, await batch_call(service, operation)))
+                except Exception as e:
+                    error = batch_error(operation, e)
+                    if error is None:
+                        raise
+                    results.append(error)
+                    if batch.atomic:
+                        raise BatchAborted from e
+    except BatchAborted:
+        return batch_aborted_response(batch.operations, results)
+    return schemas.BatchResponse(committed=True, results=results)
+
+@router.get("/todos/{todo_id}", response_model=schemas.Todo)
+async def get_todo(todo_id: int, service: AsyncTodoService = Depends(get_async_read_todo_service)):
+    try:
+        return await service.get_todo(todo_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@router.post("/todos", response_model=schemas.Todo)
+async def create_todo(todo: schemas.TodoCreate, service: AsyncTodoService = Depends(get_async_single_write_service)):
+    try:
+        return await service.create_todo(todo)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.put("/todos/{todo_id}", response_model=schemas.Todo)
+async def update_todo(todo_id: int, todo: schemas.TodoUpdate, service: AsyncTodoService = Depends(get_async_single_write_service)):
+    try:
+        return await service.update_todo(todo_id, todo)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@router.delete("/todos/{todo_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_todo(todo_id: int, service: AsyncTodoService = Depends(get_async_todo_service)):
+    try:
+        await service.delete_todo(todo_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+@router.delete("/todos", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_all_todos(service: AsyncTodoService = Depends(get_async_todo_service)):
+    await service.delete_all_todos()
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+@router.patch("/todos/{todo_id}/complete", response_model=schemas.Todo)
+async def complete_todo(todo_id: int, service: AsyncTodoService = Depends(get_async_single_write_service)):
+    try:
+        return await service.complete_todo(todo_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@router.patch("/todos/{todo_id}/incomplete", response_model=schemas.Todo)
+async def incomplete_todo(todo_id: int, service: AsyncTodoService = Depends(get_async_single_write_service)):
+    try:
+        return await service.incomplete_todo(todo_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
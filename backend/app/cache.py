@@ -0,0 +1,146 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Generic, Hashable, Iterable, Optional, TypeVar
+
+from app import config
+from app.schemas import Todo as TodoSnapshot
+
+V = TypeVar("V")
+
+class LRUCache(Generic[V]):
+    """Thread-safe, bounded LRU cache with a per-entry TTL.
+
+    Fills from the database go through ``generation``/``fill`` so a reader
+    that loaded a row before a concurrent write cannot store the stale copy:
+    every invalidation bumps the generation and ``fill`` refuses values loaded
+    under an older one.
+
+    A read that started after the write can still be stale when it came from
+    a lagging replica. So an invalidation given the write's version also
+    keeps it as that key's floor for ``floor_seconds``, and ``fill`` refuses
+    values older than the floor.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, floor_seconds: float = 0.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.floor_seconds = floor_seconds
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        # Key -> (expires_at, version), oldest first; None is the floor of every key, set by clear.
+        self._floors: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.stale_fills = 0
+
+    def get(self, key: Hashable) -> Optional[V]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def generation(self) -> int:
+        with self._lock:
+            return self._generation
+
+    def fill(self, key: Hashable, value: V, generation: int, version: Optional[int] = None) -> bool:
+        """Store a value read from the database unless a write happened since ``generation``.
+
+        A ``version`` below the key's floor is refused too: the value was read
+        from a replica that had not caught up with the write.
+        """
+        now = time.monotonic()
+        expires_at = now + self.ttl_seconds if self.ttl_seconds > 0 else None
+        with self._lock:
+            if generation != self._generation:
+                return False
+            if version is not None and version < self._floor(key, now):
+                self.stale_fills += 1
+                return False
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            return True
+
+    def invalidate(self, keys: Iterable[Hashable], version: Optional[int] = None) -> None:
+        """Drop ``keys`` after a write; with the write's ``version``, refuse older fills of them for a while."""
+        with self._lock:
+            self._generation += 1
+            for key in keys:
+                if self._entries.pop(key, None) is not None:
+                    self.invalidations += 1
+                self._raise_floor(key, version)
+
+    def clear(self, version: Optional[int] = None) -> None:
+        with self._lock:
+            self._generation += 1
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self._raise_floor(None, version)
+
+    def _raise_floor(self, key: Optional[Hashable], version: Optional[int]) -> None:
+        if version is None or self.floor_seconds <= 0:
+            return
+        now = time.monotonic()
+        while self._floors:
+            oldest = next(iter(self._floors))
+            if self._floors[oldest][0] > now:
+                break
+            del self._floors[oldest]
+        previous = self._floors.pop(key, (0.0, version))[1]
+        self._floors[key] = (now + self.floor_seconds, max(previous, version))
+
+    def _floor(self, key: Hashable, now: float) -> int:
+        floor = 0
+        for entry in (self._floors.get(key), self._floors.get(None)):
+            if entry is not None and entry[0] > now:
+                floor = max(floor, entry[1])
+        return floor
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "stale_fills": self.stale_fills,
+            }
+
+TodoCache = LRUCache[TodoSnapshot]
+
+# Process-wide cache of single todos by id; None when TODO_CACHE_ENABLED is off.
+# With replicas, writes keep floors for the read-your-writes window, the lag
+# replicas are assumed to stay within.
+todo_cache: Optional[TodoCache] = (
+    LRUCache(
+        config.TODO_CACHE_MAX_ENTRIES,
+        config.TODO_CACHE_TTL_SECONDS,
+        config.READ_YOUR_WRITES_SECONDS if config.DATABASE_REPLICA_URLS else 0.0,
+    )
+    if config.TODO_CACHE_ENABLED
+    else None
+)
@@ -0,0 +1,160 @@
+import os
+
+def env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+def env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+def env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+# Debug mode returns exception details and tracebacks to clients; never
+# enable it in production.
+DEBUG = env_bool("DEBUG", False)
+
+# Logging goes through a bounded queue to a background thread. LOG_FORMAT is
+# "json" (one object per line) or "text". Records that carry an exception
+# are rate limited per exception type: ERROR_LOG_BURST at once, then
+# ERROR_LOG_RATE_PER_SECOND (0 disables the limit).
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+LOG_QUEUE_SIZE = env_int("LOG_QUEUE_SIZE", 10000)
+ERROR_LOG_RATE_PER_SECOND = env_float("ERROR_LOG_RATE_PER_SECOND", 1.0)
+ERROR_LOG_BURST = env_int("ERROR_LOG_BURST", 10)
+
+DATABASE_URL = os.getenv(
+    "DATABASE_URL",
+    "postgresql+psycopg2://todo:todo@db:5432/tododb"
+)
+
+# "sync" serves requests from the threadpool with psycopg2; "async" uses async
+# route handlers on an asyncpg/aiosqlite engine.
+DB_MODE = os.getenv("DB_MODE", "sync").lower()
+
+# Connection pool sizing; see the SQLAlchemy QueuePool documentation.
+DB_POOL_SIZE = env_int("DB_POOL_SIZE", 5)
+DB_MAX_OVERFLOW = env_int("DB_MAX_OVERFLOW", 10)
+DB_POOL_TIMEOUT = env_float("DB_POOL_TIMEOUT", 30.0)
+DB_POOL_RECYCLE = env_int("DB_POOL_RECYCLE", -1)
+DB_POOL_PRE_PING = env_bool("DB_POOL_PRE_PING", False)
+
+# Read replicas: comma-separated URLs that read-only routes use in turn.
+# A replica is health checked at most every REPLICA_CHECK_SECONDS and skipped
+# for REPLICA_RETRY_SECONDS after failing; reads fall back to the primary when
+# none is up. A client that wrote in the last READ_YOUR_WRITES_SECONDS reads
+# from the primary.
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+REPLICA_CHECK_SECONDS = env_float("REPLICA_CHECK_SECONDS", 5.0)
+REPLICA_RETRY_SECONDS = env_float("REPLICA_RETRY_SECONDS", 30.0)
+READ_YOUR_WRITES_SECONDS = env_float("READ_YOUR_WRITES_SECONDS", 5.0)
+
+# The schema is migrated by `python -m app.migrate`; DB_CREATE_SCHEMA applies
+# the migrations at startup instead. Before serving, each worker opens
+# DB_WARMUP_CONNECTIONS pool connections (at most DB_POOL_SIZE) and runs the
+# hot queries once; 0 skips the warm-up.
+DB_CREATE_SCHEMA = env_bool("DB_CREATE_SCHEMA", False)
+DB_WARMUP_CONNECTIONS = env_int("DB_WARMUP_CONNECTIONS", DB_POOL_SIZE)
+
+# Archival: todos completed and unchanged for ARCHIVE_AFTER_DAYS move to
+# todos_archive, ARCHIVE_BATCH_SIZE per transaction, when `python -m
+# app.archive` runs, and every ARCHIVE_INTERVAL_SECONDS in each worker when
+# that is above 0.
+ARCHIVE_AFTER_DAYS = env_int("ARCHIVE_AFTER_DAYS", 90)
+ARCHIVE_BATCH_SIZE = env_int("ARCHIVE_BATCH_SIZE", 1000)
+ARCHIVE_INTERVAL_SECONDS = env_float("ARCHIVE_INTERVAL_SECONDS", 0.0)
+
+# The change feed keeps tombstones and its change log for
+# CHANGES_RETENTION_DAYS; the archive job prunes older ones, and clients that
+# last synced before that get a reset. 0 keeps them forever.
+CHANGES_RETENTION_DAYS = env_int("CHANGES_RETENTION_DAYS", 30)
+
+# Group commit for single-todo writes (create, update, complete and
+# incomplete): writes arriving within WRITE_COALESCE_WINDOW_MS of the first
+# share one transaction and commit, up to WRITE_COALESCE_MAX_BATCH at a time.
+# Every such write waits out the window; see app/write_coalescer.py.
+WRITE_COALESCE_ENABLED = env_bool("WRITE_COALESCE_ENABLED", False)
+WRITE_COALESCE_WINDOW_MS = env_float("WRITE_COALESCE_WINDOW_MS", 2.0)
+WRITE_COALESCE_MAX_BATCH = env_int("WRITE_COALESCE_MAX_BATCH", 100)
+# A queued write fails after WRITE_COALESCE_TIMEOUT_SECONDS without an
+# outcome: by default, time to wait for a pool connection and as long again
+# for the batch to run.
+WRITE_COALESCE_TIMEOUT_SECONDS = env_float("WRITE_COALESCE_TIMEOUT_SECONDS", 2 * DB_POOL_TIMEOUT)
+
+# Admission control for the todo routes, per worker: at most
+# ADMISSION_MAX_IN_FLIGHT requests run at once (0 disables the limit) and up
+# to ADMISSION_MAX_QUEUE more wait, each for at most
+# ADMISSION_QUEUE_TIMEOUT_MS; the rest get 503 with Retry-After:
+# ADMISSION_RETRY_AFTER_SECONDS. RATE_LIMIT_PER_SECOND (0 disables) and
+# RATE_LIMIT_BURST size a token bucket per client address; requests over it
+# get 429. See app/admission.py.
+ADMISSION_MAX_IN_FLIGHT = env_int("ADMISSION_MAX_IN_FLIGHT", 0)
+ADMISSION_MAX_QUEUE = env_int("ADMISSION_MAX_QUEUE", 100)
+ADMISSION_QUEUE_TIMEOUT_MS = env_float("ADMISSION_QUEUE_TIMEOUT_MS", 1000.0)
+ADMISSION_RETRY_AFTER_SECONDS = env_float("ADMISSION_RETRY_AFTER_SECONDS", 1.0)
+RATE_LIMIT_PER_SECOND = env_float("RATE_LIMIT_PER_SECOND", 0.0)
+RATE_LIMIT_BURST = env_int("RATE_LIMIT_BURST", 20)
+
+# In-process read-through cache for GET /todos/{id}. Each worker has its own
+# copy, so other workers may serve an entry for up to the TTL after a write.
+# Replica reads are cached unless older than a write this worker made in the
+# last READ_YOUR_WRITES_SECONDS; see app/cache.py.
+TODO_CACHE_ENABLED = env_bool("TODO_CACHE_ENABLED", False)
+TODO_CACHE_MAX_ENTRIES = env_int("TODO_CACHE_MAX_ENTRIES", 10000)
+TODO_CACHE_TTL_SECONDS = env_float("TODO_CACHE_TTL_SECONDS", 30.0)
+
+# Responses of at least COMPRESSION_MIN_BYTES are compressed with zstd,
+# brotli or gzip, whichever the client's Accept-Encoding prefers (zstd and
+# brotli when installed). Levels are set per route in
+# app/middleware/compression.py.
+COMPRESSION_ENABLED = env_bool("COMPRESSION_ENABLED", True)
+COMPRESSION_MIN_BYTES = env_int("COMPRESSION_MIN_BYTES", 1024)
+
+# Per-request timing: a Server-Timing header on every response, and a log of
+# requests slower than the threshold with their SQL (0 disables the log).
+SERVER_TIMING_ENABLED = env_bool("SERVER_TIMING_ENABLED", True)
+SLOW_REQUEST_THRESHOLD_MS = env_float("SLOW_REQUEST_THRESHOLD_MS", 500.0)
+
+# Prometheus metrics at /metrics. Multi-worker deployments also need
+# PROMETHEUS_MULTIPROC_DIR; see app/metrics.py.
+METRICS_ENABLED = env_bool("METRICS_ENABLED", True)
+
+# Server-sent events at GET /todos/stream. Each subscriber may fall
+# STREAM_QUEUE_SIZE events behind before it is disconnected; the last
+# STREAM_HISTORY_SIZE events are kept for resuming with Last-Event-ID.
+STREAM_ENABLED = env_bool("STREAM_ENABLED", True)
+STREAM_QUEUE_SIZE = env_int("STREAM_QUEUE_SIZE", 100)
+STREAM_HISTORY_SIZE = env_int("STREAM_HISTORY_SIZE", 1000)
+STREAM_HEARTBEAT_SECONDS = env_float("STREAM_HEARTBEAT_SECONDS", 15.0)
+STREAM_MAX_SUBSCRIBERS = env_int("STREAM_MAX_SUBSCRIBERS", 10000)
+# While a worker has subscribers it checks the change log every
+# STREAM_POLL_SECONDS for other workers' writes; 0 turns that off, for a
+# single worker.
+STREAM_POLL_SECONDS = env_float("STREAM_POLL_SECONDS", 1.0)
+
+# Keep per-due-date todo counts up to date on every write, so GET
+# /todos/stats does not scan the todos table. Enable it on every worker or
+# none: the counts are recomputed at startup and by app.migrate, but a
+# writer with it off leaves them stale until the next restart.
+STATS_COUNTERS_ENABLED = env_bool("STATS_COUNTERS_ENABLED", False)
+
+# Production server, python -m app.serve. WEB_CONCURRENCY worker processes
+# (default: one per CPU) share one listening socket. A worker is replaced
+# after SERVER_MAX_REQUESTS requests plus a random share of
+# SERVER_MAX_REQUESTS_JITTER, so they do not all restart at once (0 never
+# recycles). On SIGTERM workers stop accepting connections and get
+# SERVER_GRACEFUL_TIMEOUT seconds to finish the requests in flight.
+SERVER_HOST = os.getenv("SERVER_HOST", "0.0.0.0")
+SERVER_PORT = env_int("SERVER_PORT", 8001)
+WEB_CONCURRENCY = env_int("WEB_CONCURRENCY", os.cpu_count() or 1)
+SERVER_PRELOAD = env_bool("SERVER_PRELOAD", True)
+SERVER_MAX_REQUESTS = env_int("SERVER_MAX_REQUESTS", 0)
+SERVER_MAX_REQUESTS_JITTER = env_int("SERVER_MAX_REQUESTS_JITTER", 0)
+SERVER_GRACEFUL_TIMEOUT = env_int("SERVER_GRACEFUL_TIMEOUT", 30)
+SERVER_KEEPALIVE_SECONDS = env_int("SERVER_KEEPALIVE_SECONDS", 5)
+SERVER_BACKLOG = env_int("SERVER_BACKLOG", 2048)
@@ -1,15 +1,55 @@
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
-import os
+from sqlalchemy.engine import make_url
+from fastapi import Depends, Request
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from sqlalchemy.pool import Pool, QueuePool
+from typing import Optional, Type
+from app import config, request_timing
+from app.config import DATABASE_URL
+from app.pool_metrics import PoolMetrics
+from app.replicas import Replica, ReplicaSet, wrote_recently
 
-DATABASE_URL = os.getenv(
-    "DATABASE_URL",
-    "postgresql+psycopg2://todo:todo@db:5432/tododb"
-)
+def pool_options(url: str, metrics: PoolMetrics, poolclass: Type[Pool] = QueuePool) -> dict:
+    """Engine keyword arguments for a configured, instrumented connection pool."""
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        # In-memory SQLite has no connection pool to size.
+        return {}
+    return {
+        "poolclass": metrics.pool_class(poolclass),
+        "pool_size": config.DB_POOL_SIZE,
+        "max_overflow": config.DB_MAX_OVERFLOW,
+        "pool_timeout": config.DB_POOL_TIMEOUT,
+        "pool_recycle": config.DB_POOL_RECYCLE,
+        "pool_pre_ping": config.DB_POOL_PRE_PING,
+    }
+
+pool_metrics = PoolMetrics()
+engine = create_engine(DATABASE_URL, **pool_options(DATABASE_URL, pool_metrics))
+pool_metrics.listen(engine)
+request_timing.listen(engine)
 
-engine = create_engine(DATABASE_URL)
+# Objects stay loaded after commit so returning them does not cost another SELECT.
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def _replica(url: str) -> Replica:
+    metrics = PoolMetrics()
+    replica_engine = create_engine(url, **pool_options(url, metrics))
+    metrics.listen(replica_engine)
+    request_timing.listen(replica_engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=replica_engine)
+    return Replica(make_url(url).render_as_string(hide_password=True), replica_engine, session_factory, metrics)
+
+# Read-only routes round-robin over these; None without DATABASE_REPLICA_URLS.
+replica_set: Optional[ReplicaSet] = (
+    ReplicaSet(
+        [_replica(url) for url in config.DATABASE_REPLICA_URLS],
+        config.REPLICA_CHECK_SECONDS,
+        config.REPLICA_RETRY_SECONDS,
+    )
+    if config.DATABASE_REPLICA_URLS
+    else None
+)
 
 Base = declarative_base()
 
@@ -19,3 +59,19 @@ def get_db():
         yield db
     finally:
         db.close()
+
+def get_read_db(request: Request, primary: Session = Depends(get_db)):
+    """Session for read-only routes: a replica when one is up and the client has not written recently.
+
+    Otherwise the primary session, which stays unused (and unconnected) when a replica serves.
+    """
+    db = None
+    if replica_set is not None and not wrote_recently(request):
+        db = replica_set.connect()
+    if db is None:
+        yield primary
+        return
+    try:
+        yield db
+    finally:
+        db.close()
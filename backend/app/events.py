@@ -0,0 +1,230 @@
+"""In-process fan-out of committed todo changes to GET /todos/stream subscribers.
+
+Services publish after commit, from the event loop or a threadpool thread.
+Each event is serialized into an SSE frame once and the same bytes are put
+on every subscriber's bounded queue, so a write costs one ``put_nowait`` per
+subscriber. A subscriber whose queue is full is disconnected; it resumes
+with ``Last-Event-ID``. One timer per process sends heartbeats, so idle
+subscribers cost nothing but their queue.
+
+Event ids are the change versions from GET /todos/changes. A client that
+resumes from an id no longer in the replay history gets a ``resync`` event
+with the change feed cursor for that id.
+
+Services only publish the writes their own worker served. So while a
+worker has subscribers, ``watch_changes`` reads the committed versions in
+todo_changes every STREAM_POLL_SECONDS; when some were not published here,
+another worker wrote them, and subscribers get a ``resync`` event with the
+cursor to fetch them from GET /todos/changes.
+"""
+import asyncio
+import logging
+import threading
+from collections import deque
+from typing import Any, AsyncIterator, Callable, Deque, List, Optional, Set, Tuple
+
+import orjson
+from sqlalchemy.exc import SQLAlchemyError
+from starlette.concurrency import run_in_threadpool
+
+from app import config
+from app.pagination import encode_version_cursor
+from app.repositories.todo_repository import TodoRepository
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT = b": keep-alive\n\n"
+# Put on a dropped subscriber's queue to end its stream.
+_CLOSE = object()
+
+def format_event(event_id: Optional[int], event: str, data: Any) -> bytes:
+    """One SSE frame; ``data`` is JSON encoded on a single line."""
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event}\ndata: ".encode() + orjson.dumps(data) + b"\n\n"
+
+class Subscription:
+    __slots__ = ("queue",)
+
+    def __init__(self, max_queued: int):
+        self.queue: asyncio.Queue = asyncio.Queue(max_queued)
+
+class EventBroadcaster:
+    def __init__(self, max_queued: int, history: int, heartbeat_seconds: float, max_subscribers: int):
+        self.max_queued = max_queued
+        self.heartbeat_seconds = heartbeat_seconds
+        self.max_subscribers = max_subscribers
+        self._history: Deque[Tuple[int, bytes]] = deque(maxlen=history)
+        self._lock = threading.Lock()
+        self._subscribers: Set[Subscription] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._heartbeat: Optional[asyncio.Task] = None
+        # Set by reconcile: every committed version up to it has reached the
+        # subscribers, and the versions published here since then.
+        self._covered: Optional[int] = None
+        self._published_since: Set[int] = set()
+        self.published = 0
+        self.dropped = 0
+        self.resyncs = 0
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscribers)
+
+    def full(self) -> bool:
+        return len(self._subscribers) >= self.max_subscribers
+
+    def publish(self, event_id: int, event: str, data: Any) -> None:
+        """Record an event and deliver it to every subscriber; safe to call from any thread."""
+        frame = format_event(event_id, event, data)
+        loop = self._loop
+        if loop is not None and loop.is_closed():
+            # Its subscribers went with it.
+            self._loop, self._subscribers = None, set()
+            loop = None
+        if loop is None:
+            self._dispatch(event_id, frame)
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._dispatch(event_id, frame)
+        else:
+            try:
+                loop.call_soon_threadsafe(self._dispatch, event_id, frame)
+            except RuntimeError:
+                # The loop closed in between; only record the event.
+                with self._lock:
+                    self._history.append((event_id, frame))
+
+    async def stream(self, last_event_id: Optional[int] = None) -> AsyncIterator[bytes]:
+        """SSE frames for one subscriber, starting with any replay after ``last_event_id``."""
+        subscription = self._subscribe(last_event_id)
+        try:
+            while True:
+                frame = await subscription.queue.get()
+                if frame is _CLOSE:
+                    return
+                yield frame
+        finally:
+            self._subscribers.discard(subscription)
+
+    def _subscribe(self, last_event_id: Optional[int]) -> Subscription:
+        # Runs on the event loop, like _dispatch, so no event can slip in
+        # between the replay and joining the subscriber set.
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._subscribers = set()
+            self._heartbeat = None
+        subscription = Subscription(self.max_queued)
+        for frame in self._replay(last_event_id):
+            subscription.queue.put_nowait(frame)
+        self._subscribers.add(subscription)
+        if self._heartbeat is None or self._heartbeat.done():
+            self._heartbeat = loop.create_task(self._send_heartbeats())
+        return subscription
+
+    def reconcile(self, upto: int, committed: List[int]) -> None:
+        """Send a ``resync`` if any of the ``committed`` versions up to ``upto`` was not published here.
+
+        ``committed`` are the versions logged after ``covered()``; runs on
+        the event loop, like ``_dispatch``.
+        """
+        with self._lock:
+            covered, self._covered = self._covered, upto
+            published = self._published_since
+            self._published_since = {version for version in published if version > upto}
+        if covered is None or all(version in published for version in committed):
+            return
+        self.resyncs += 1
+        self._dispatch(upto, format_event(upto, "resync", {"cursor": encode_version_cursor(covered)}))
+
+    def covered(self) -> Optional[int]:
+        return self._covered
+
+    def forget(self) -> None:
+        """Stop tracking versions, e.g. while there are no subscribers to reconcile for."""
+        with self._lock:
+            self._covered = None
+            self._published_since = set()
+
+    def _replay(self, last_event_id: Optional[int]) -> list:
+        if last_event_id is None:
+            return []
+        with self._lock:
+            history = list(self._history)
+            covered = self._covered
+        for index, (event_id, _) in enumerate(history):
+            if event_id == last_event_id:
+                # Never more than fits in the queue; beyond that, resync is cheaper.
+                missed = [frame for _, frame in history[index + 1:]]
+                if len(missed) <= self.max_queued:
+                    return missed
+                break
+        # Another worker's writes below the id may not have reached this one yet.
+        cursor = last_event_id if covered is None else min(last_event_id, covered)
+        return [format_event(None, "resync", {"cursor": encode_version_cursor(cursor)})]
+
+    def _dispatch(self, event_id: int, frame: bytes) -> None:
+        with self._lock:
+            self._history.append((event_id, frame))
+            if self._covered is not None and event_id > self._covered:
+                self._published_since.add(event_id)
+        self.published += 1
+        for subscription in list(self._subscribers):
+            try:
+                subscription.queue.put_nowait(frame)
+            except asyncio.QueueFull:
+                self._drop(subscription)
+
+    def _drop(self, subscription: Subscription) -> None:
+        """Disconnect a subscriber that fell ``max_queued`` events behind."""
+        self._subscribers.discard(subscription)
+        self.dropped += 1
+        queue = subscription.queue
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(_CLOSE)
+
+    async def _send_heartbeats(self) -> None:
+        while self._subscribers:
+            await asyncio.sleep(self.heartbeat_seconds)
+            for subscription in list(self._subscribers):
+                # A non-empty queue is about to send data anyway.
+                if subscription.queue.empty():
+                    subscription.queue.put_nowait(HEARTBEAT)
+
+def read_committed(session_factory: Callable, after: Optional[int]) -> Tuple[int, List[int]]:
+    """The committed watermark, and the versions logged in ``(after, watermark]``."""
+    with session_factory() as db:
+        repository = TodoRepository(db)
+        upto = repository.current_version()
+        return upto, [] if after is None else repository.logged_versions(after, upto)
+
+async def watch_changes(broadcaster: EventBroadcaster, session_factory: Callable, interval: float) -> None:
+    """Reconcile ``broadcaster`` with the change log every ``interval`` seconds until cancelled."""
+    while True:
+        await asyncio.sleep(interval)
+        if not broadcaster.subscribers:
+            broadcaster.forget()
+            continue
+        try:
+            upto, committed = await run_in_threadpool(read_committed, session_factory, broadcaster.covered())
+        except SQLAlchemyError as e:
+            logger.warning("Reading the change log for the event stream failed: %s", e)
+            continue
+        broadcaster.reconcile(upto, committed)
+
+# Process-wide broadcaster; None when STREAM_ENABLED is off.
+todo_events: Optional[EventBroadcaster] = (
+    EventBroadcaster(
+        config.STREAM_QUEUE_SIZE,
+        config.STREAM_HISTORY_SIZE,
+        config.STREAM_HEARTBEAT_SECONDS,
+        config.STREAM_MAX_SUBSCRIBERS,
+    )
+    if config.STREAM_ENABLED
+    else None
+)
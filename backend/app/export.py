@@ -0,0 +1,47 @@
+import csv
+import io
+from datetime import date
+from typing import Iterable, Iterator, List
+
+import orjson
+
+from app.models import Todo
+from app.responses import TODO_FIELDS, todo_rows
+
+EXPORT_BATCH_SIZE = 1000
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+def ndjson_chunks(batches: Iterable[List[Todo]]) -> Iterator[bytes]:
+    """One JSON document per line; each batch is sent as a single chunk."""
+    for batch in batches:
+        yield b"".join(orjson.dumps(row) + b"\n" for row in todo_rows(batch))
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+def csv_chunks(batches: Iterable[List[Todo]]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(TODO_FIELDS)
+    for batch in batches:
+        for row in todo_rows(batch):
+            writer.writerow([_csv_value(row[field]) for field in TODO_FIELDS])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # An empty export still sends the header row.
+    if buffer.tell():
+        yield buffer.getvalue()
+
+EXPORT_FORMATTERS = {
+    "ndjson": ndjson_chunks,
+    "csv": csv_chunks,
+}
@@ -0,0 +1,59 @@
+import sys
+from fastapi import APIRouter, Response
+
+from app import admission, cache, config, database, metrics
+from app.database import engine, pool_metrics
+
+# Operational endpoints; kept out of the public OpenAPI schema.
+router = APIRouter(prefix="/internal", include_in_schema=False)
+# Prometheus scrapes /metrics by default, so it sits outside /internal.
+metrics_router = APIRouter(include_in_schema=False)
+
+@router.get("/pool")
+def pool_stats():
+    stats = {
+        "config": {
+            "pool_size": config.DB_POOL_SIZE,
+            "max_overflow": config.DB_MAX_OVERFLOW,
+            "pool_timeout": config.DB_POOL_TIMEOUT,
+            "pool_recycle": config.DB_POOL_RECYCLE,
+            "pool_pre_ping": config.DB_POOL_PRE_PING,
+        },
+        "primary": pool_metrics.snapshot(engine.pool),
+    }
+    if database.replica_set is not None:
+        stats["replicas"] = database.replica_set.status()
+    # Only report the async engine when the async stack has been loaded.
+    async_database = sys.modules.get("app.async_database")
+    if async_database is not None:
+        stats["async"] = async_database.async_pool_metrics.snapshot(async_database.async_engine.pool)
+        if async_database.async_replica_set is not None:
+            stats["async_replicas"] = async_database.async_replica_set.status()
+    return stats
+
+@router.get("/cache")
+def cache_stats():
+    if cache.todo_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.todo_cache.stats()}
+
+@router.get("/write-coalescer")
+def write_coalescer_stats():
+    if config.DB_MODE == "async":
+        from app.async_routes import async_write_coalescer as coalescer
+    else:
+        from app.routes import write_coalescer as coalescer
+    if coalescer is None:
+        return {"enabled": False}
+    return {"enabled": True, **coalescer.stats()}
+
+@router.get("/admission")
+def admission_stats():
+    if admission.admission_controller is None:
+        return {"enabled": False}
+    return {"enabled": True, **admission.admission_controller.stats()}
+
+@metrics_router.get("/metrics")
+def prometheus_metrics():
+    body, content_type = metrics.render()
+    return Response(body, media_type=content_type)
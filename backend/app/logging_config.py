@@ -0,0 +1,148 @@
+"""Non-blocking logging: records are queued by the caller and written by a background thread.
+
+Request handlers only pay for building the record and a ``put_nowait``;
+formatting (including tracebacks) and stream I/O happen on the listener
+thread. When the queue is full, records are dropped and counted rather
+than blocking the event loop.
+"""
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional, Tuple
+
+# Attributes every LogRecord has; anything else was passed via ``extra``.
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+# uvicorn installs its own synchronous handlers; route these through the queue.
+UVICORN_LOGGERS = ("uvicorn", "uvicorn.error", "uvicorn.access")
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line with the record's ``extra`` fields inlined."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        document = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                document[key] = value
+        if record.exc_info:
+            # Cached on the record, so any other handler reuses the same text.
+            if not record.exc_text:
+                record.exc_text = self.formatException(record.exc_info)
+            document["exc_type"] = record.exc_info[0].__name__
+            document["traceback"] = record.exc_text
+        return json.dumps(document, default=str)
+
+class NonBlockingQueueHandler(QueueHandler):
+    """QueueHandler that defers formatting to the listener and never blocks on a full queue."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The base class formats the record (traceback included) in the
+        # calling thread; the listener is in-process, so the record can be
+        # handed over as is. Arguments are merged now in case they mutate.
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+class ExceptionRateLimitFilter(logging.Filter):
+    """Token bucket per exception type for records carrying ``exc_info``.
+
+    Each type may log ``burst`` records at once and ``rate`` per second
+    after that; the rest are dropped, and the next record that gets through
+    carries the number dropped since as ``suppressed``. Records without an
+    exception are never limited.
+    """
+
+    def __init__(self, rate: float, burst: int):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self._lock = threading.Lock()
+        # exception type -> (tokens, last refill, suppressed since last pass)
+        self._buckets: Dict[type, Tuple[float, float, int]] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not record.exc_info or self.rate <= 0:
+            return True
+        exc_type = record.exc_info[0]
+        now = time.monotonic()
+        with self._lock:
+            tokens, last, suppressed = self._buckets.get(exc_type, (self.burst, now, 0))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            if tokens < 1:
+                self._buckets[exc_type] = (tokens, now, suppressed + 1)
+                return False
+            self._buckets[exc_type] = (tokens - 1, now, 0)
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+_listener: Optional[QueueListener] = None
+_handler: Optional[NonBlockingQueueHandler] = None
+
+def configure_logging(level: str, fmt: str, queue_size: int, error_rate: float, error_burst: int) -> QueueListener:
+    """Install the queue handler on the root logger and start the listener thread (once per process)."""
+    global _listener, _handler
+    if _listener is not None:
+        return _listener
+
+    stream = logging.StreamHandler()
+    if fmt == "json":
+        stream.setFormatter(JSONFormatter())
+    else:
+        stream.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
+
+    log_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+    handler = NonBlockingQueueHandler(log_queue)
+    handler.addFilter(ExceptionRateLimitFilter(error_rate, error_burst))
+
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    _handler = handler
+    root.setLevel(level.upper())
+    for name in UVICORN_LOGGERS:
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers.clear()
+        uvicorn_logger.propagate = True
+
+    _listener = QueueListener(log_queue, stream, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+    return _listener
+
+def _restart_in_child() -> None:
+    """Give a forked worker its own listener thread; only the forking thread survives fork()."""
+    global _listener
+    if _listener is None:
+        return
+    atexit.unregister(_listener.stop)
+    # A fresh queue, too: the parent's may be locked by its listener thread.
+    log_queue: queue.Queue = queue.Queue(maxsize=_listener.queue.maxsize)
+    _handler.queue = log_queue
+    _listener = QueueListener(log_queue, *_listener.handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+os.register_at_fork(after_in_child=_restart_in_child)
@@ -1,18 +1,26 @@
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from app import routes
-from app.database import Base, engine
+from app import config, internal_routes, routes
+from app.responses import NegotiatedResponse
+from app.startup import lifespan
+from .middleware.compression import CompressionMiddleware
+from .middleware.content_negotiation import MessagePackMiddleware
 from .middleware.error_handler import ErrorHandler
-import logging
+from .middleware.metrics import MetricsMiddleware
+from .middleware.read_your_writes import ReadYourWritesMiddleware
+from .middleware.timing import TimingMiddleware
+from .logging_config import configure_logging
 
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+configure_logging(
+    config.LOG_LEVEL,
+    config.LOG_FORMAT,
+    config.LOG_QUEUE_SIZE,
+    config.ERROR_LOG_RATE_PER_SECOND,
+    config.ERROR_LOG_BURST,
 )
 
-Base.metadata.create_all(bind=engine)
-
-app = FastAPI(debug=True)
+# Nothing here touches the database; see app/startup.py.
+app = FastAPI(debug=config.DEBUG, default_response_class=NegotiatedResponse, lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -20,10 +28,29 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Server-Timing"],
 )
+app.add_middleware(MessagePackMiddleware)
+if config.DATABASE_REPLICA_URLS:
+    app.add_middleware(ReadYourWritesMiddleware)
+if config.COMPRESSION_ENABLED:
+    # Inside the metrics and timing middleware, so they include compression.
+    app.add_middleware(CompressionMiddleware, minimum_size=config.COMPRESSION_MIN_BYTES)
+if config.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+if config.SERVER_TIMING_ENABLED:
+    # Added last so it is the outermost middleware and times CORS handling too.
+    app.add_middleware(TimingMiddleware, slow_request_ms=config.SLOW_REQUEST_THRESHOLD_MS)
 
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     return await ErrorHandler.handle_exception(request, exc)
 
-app.include_router(routes.router)
+if config.DB_MODE == "async":
+    from app import async_routes
+    app.include_router(async_routes.overlay(routes.router))
+else:
+    app.include_router(routes.router)
+app.include_router(internal_routes.router)
+if config.METRICS_ENABLED:
+    app.include_router(internal_routes.metrics_router)
@@ -0,0 +1,90 @@
+"""Prometheus metrics for HTTP requests and the SQL they run.
+
+With several worker processes, set PROMETHEUS_MULTIPROC_DIR to an empty,
+writable directory shared by the workers before they start: every process
+then writes its samples to memory-mapped files there and ``/metrics``
+aggregates all of them, whichever worker serves the scrape.
+"""
+import os
+from typing import Dict, Tuple
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram
+from prometheus_client import generate_latest, multiprocess
+
+# Upper bounds (seconds) of the request and DB time histogram buckets.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+
+# Route label for requests that matched no route, so raw paths (and their
+# unbounded cardinality) never become label values.
+UNMATCHED_ROUTE = "<unmatched>"
+
+REQUESTS = Counter(
+    "http_requests_total", "HTTP requests by route template, method and status code.",
+    ["method", "route", "status"],
+)
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds", "HTTP request latency.",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS,
+)
+IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "HTTP requests currently being served.",
+    ["method"], multiprocess_mode="livesum",
+)
+DB_QUERIES = Histogram(
+    "http_request_db_queries", "SQL statements executed per HTTP request.",
+    ["method", "route"], buckets=QUERY_COUNT_BUCKETS,
+)
+DB_DURATION = Histogram(
+    "http_request_db_duration_seconds", "Time per HTTP request spent executing SQL.",
+    ["method", "route"], buckets=LATENCY_BUCKETS,
+)
+ADMISSION_SHED = Counter(
+    "http_requests_shed_total", "Requests rejected by admission control, by reason.",
+    ["reason"],
+)
+ADMISSION_QUEUE_DEPTH = Gauge(
+    "http_admission_queue_depth", "Requests waiting for admission.",
+    multiprocess_mode="livesum",
+)
+ADMISSION_WAIT = Histogram(
+    "http_admission_wait_seconds", "Time admitted requests spent waiting in the admission queue.",
+    buckets=LATENCY_BUCKETS,
+)
+
+# labels() takes a lock and builds a key on every call; the label sets are
+# few and fixed, so resolve each one once and reuse the children.
+_request_children: Dict[Tuple[str, str, int], tuple] = {}
+
+def observe_request(method: str, route: str, status: int, seconds: float, queries: int, db_seconds: float) -> None:
+    key = (method, route, status)
+    children = _request_children.get(key)
+    if children is None:
+        children = _request_children[key] = (
+            REQUESTS.labels(method, route, status),
+            REQUEST_DURATION.labels(method, route, status),
+            DB_QUERIES.labels(method, route),
+            DB_DURATION.labels(method, route),
+        )
+    requests, duration, db_queries, db_duration = children
+    requests.inc()
+    duration.observe(seconds)
+    db_queries.observe(queries)
+    db_duration.observe(db_seconds)
+
+def multiprocess_enabled() -> bool:
+    return bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+def render() -> Tuple[bytes, str]:
+    """The current metrics in the Prometheus text format, summed over all workers in multiprocess mode."""
+    if multiprocess_enabled():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+def mark_worker_dead(pid: int) -> None:
+    """Drop a stopped worker's live gauges; call from the process manager when a worker exits."""
+    if multiprocess_enabled():
+        multiprocess.mark_process_dead(pid)
@@ -0,0 +1,170 @@
+import zlib
+from typing import Dict, Iterable, Mapping, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.middleware.content_negotiation import accept_qualities
+
+try:
+    import brotli
+except ImportError:  # Optional: pip install -e .[compression]
+    brotli = None
+try:
+    import zstandard
+except ImportError:  # Optional: pip install -e .[compression]
+    zstandard = None
+
+class _Gzip:
+    def __init__(self, level: int):
+        # wbits 31: a gzip header and trailer around the deflate stream.
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush()
+
+class _Brotli:
+    def __init__(self, level: int):
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self, data: bytes) -> bytes:
+        return self._compressor.process(data) + self._compressor.finish()
+
+class _Zstd:
+    def __init__(self, level: int):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush()
+
+# Content-Encoding tokens in order of preference when the client accepts
+# several equally: zstd and brotli compress JSON smaller than gzip and, at
+# these levels, no slower.
+ENCODERS = {
+    name: encoder
+    for name, encoder, available in (
+        ("zstd", _Zstd, zstandard is not None),
+        ("br", _Brotli, brotli is not None),
+        ("gzip", _Gzip, True),
+    )
+    if available
+}
+
+DEFAULT_LEVELS = {"zstd": 3, "br": 4, "gzip": 6}
+
+# Levels by route template, for routes that can return the whole table.
+# At level 1 a 10k-todo list compresses 4-7 times faster than at the
+# defaults for 10-30% more bytes; see benchmarks/bench_compression.py.
+ROUTE_LEVELS: Dict[str, Dict[str, int]] = {
+    "/todos": {"zstd": 1, "br": 1, "gzip": 1},
+    "/todos/changes": {"zstd": 1, "br": 1, "gzip": 1},
+    "/todos/export": {"zstd": 1, "br": 1, "gzip": 1},
+}
+
+def choose_encoding(accept_encoding: str, encodings: Iterable[str]) -> Optional[str]:
+    """The content coding to use for an Accept-Encoding header, or None for identity."""
+    qualities = accept_qualities(accept_encoding)
+    chosen, best = None, 0.0
+    for encoding in encodings:
+        quality = qualities.get(encoding, qualities.get("*", 0.0))
+        if quality > best:
+            chosen, best = encoding, quality
+    return chosen
+
+def _compressible(message: Message) -> bool:
+    headers = Headers(raw=message["headers"])
+    # Event streams have to reach the client event by event, not in compressed blocks.
+    return "content-encoding" not in headers and not headers.get("content-type", "").startswith("text/event-stream")
+
+class CompressionMiddleware:
+    """Compress responses with zstd, brotli or gzip, as the client's Accept-Encoding allows.
+
+    Responses whose body is a single message smaller than ``minimum_size``
+    bytes are sent as they are: compressing them saves less than it costs.
+    Streamed responses are compressed chunk by chunk, each chunk flushed so
+    the client can decode it on arrival. Levels come from ``route_levels``
+    for the route template the request matched, else from ``levels``.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 1024,
+        levels: Optional[Mapping[str, int]] = None,
+        route_levels: Optional[Mapping[str, Mapping[str, int]]] = None,
+        encodings: Optional[Iterable[str]] = None,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.levels = DEFAULT_LEVELS if levels is None else levels
+        self.route_levels = ROUTE_LEVELS if route_levels is None else route_levels
+        self.encodings = tuple(ENCODERS if encodings is None else encodings)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""), self.encodings)
+        # Held back until the first body chunk shows whether to compress.
+        start: Optional[Message] = None
+        encoder = None
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start, encoder
+            if message["type"] == "http.response.start":
+                if _compressible(message):
+                    start = message
+                else:
+                    await send(message)
+                return
+            if message["type"] != "http.response.body" or (start is None and encoder is None):
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if encoder is not None:
+                if more_body and not body:
+                    await send(message)
+                    return
+                body = encoder.compress(body) if more_body else encoder.finish(body)
+                if not more_body:
+                    encoder = None
+                await send({"type": "http.response.body", "body": body, "more_body": more_body})
+                return
+
+            first, start = start, None
+            headers = MutableHeaders(scope=first)
+            headers.add_vary_header("Accept-Encoding")
+            if encoding is None or (not more_body and len(body) < self.minimum_size):
+                await send(first)
+                await send(message)
+                return
+            encoder = ENCODERS[encoding](self._level(scope, encoding))
+            headers["Content-Encoding"] = encoding
+            if more_body:
+                del headers["Content-Length"]
+                body = encoder.compress(body)
+            else:
+                body = encoder.finish(body)
+                headers["Content-Length"] = str(len(body))
+                encoder = None
+            await send(first)
+            await send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
+
+    def _level(self, scope: Scope, encoding: str) -> int:
+        route = scope.get("route")
+        levels = self.route_levels.get(getattr(route, "path", None), {})
+        return levels.get(encoding, self.levels[encoding])
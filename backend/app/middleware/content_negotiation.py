@@ -0,0 +1,107 @@
+from typing import Dict
+
+import msgpack
+import orjson
+from fastapi.responses import ORJSONResponse
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.responses import MSGPACK_MEDIA_TYPE, msgpack_requested
+
+MSGPACK_MEDIA_TYPES = (MSGPACK_MEDIA_TYPE, "application/x-msgpack")
+
+def accept_qualities(header: str) -> Dict[str, float]:
+    """Quality value of each item of an Accept or Accept-Encoding header, lowercased."""
+    qualities = {}
+    for item in header.split(","):
+        value, _, params = item.partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, q = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(q)
+                except ValueError:
+                    quality = 0.0
+        if value.strip():
+            qualities[value.strip().lower()] = quality
+    return qualities
+
+def prefers_msgpack(accept: str) -> bool:
+    """Whether an Accept header asks for MessagePack at least as much as for JSON."""
+    if "msgpack" not in accept:
+        return False
+    qualities = accept_qualities(accept)
+    quality = max(qualities.get(media_type, 0.0) for media_type in MSGPACK_MEDIA_TYPES)
+    return quality > 0 and quality >= qualities.get("application/json", 0.0)
+
+async def _read_body(receive: Receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    return b"".join(chunks)
+
+class MessagePackMiddleware:
+    """MessagePack as a binary alternative to JSON, for request and response bodies.
+
+    A request whose Accept header prefers ``application/msgpack`` to
+    ``application/json`` gets its response rendered as MessagePack by
+    NegotiatedResponse. A request body sent with that Content-Type is decoded
+    and handed on as JSON, so routes validate it as usual. Errors raised as
+    HTTPException and validation errors are still JSON.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        content_type = headers.get("content-type", "").partition(";")[0].strip().lower()
+        if content_type in MSGPACK_MEDIA_TYPES:
+            body = await _read_body(receive)
+            if body:
+                try:
+                    body = orjson.dumps(msgpack.unpackb(body))
+                except (ValueError, TypeError, msgpack.UnpackException):
+                    response = ORJSONResponse({"detail": "Request body is not valid MessagePack"}, status_code=400)
+                    await response(scope, receive, send)
+                    return
+                # Changed in place: outer middleware reads the matched route from this scope.
+                scope["headers"] = [
+                    (name, value) for name, value in scope["headers"] if name not in (b"content-type", b"content-length")
+                ] + [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+            receive = _replay(body, receive)
+
+        async def send_with_vary(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                response_headers = MutableHeaders(scope=message)
+                if response_headers.get("content-type", "").startswith(("application/json", MSGPACK_MEDIA_TYPE)):
+                    response_headers.add_vary_header("Accept")
+            await send(message)
+
+        token = msgpack_requested.set(prefers_msgpack(headers.get("accept", "")))
+        try:
+            await self.app(scope, receive, send_with_vary)
+        finally:
+            msgpack_requested.reset(token)
+
+def _replay(body: bytes, receive: Receive) -> Receive:
+    replayed = False
+
+    async def receive_body() -> Message:
+        nonlocal replayed
+        if replayed:
+            return await receive()
+        replayed = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    return receive_body
@@ -10,8 +10,14 @@ logger = logging.getLogger(__name__)
 class ErrorHandler:
     @staticmethod
     async def handle_exception(request: Request, exc: Exception) -> JSONResponse:
-        logger.error(f"Unhandled exception: {str(exc)}")
-        logger.error(traceback.format_exc())
+        # One record per failure; the traceback is formatted once, by the
+        # logging thread, and repeated failures of one type are rate limited.
+        logger.error(
+            "Unhandled exception: %s",
+            exc,
+            exc_info=exc,
+            extra={"method": request.method, "path": request.url.path},
+        )
 
         status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
         error_message = "An unexpected error occurred"
@@ -23,6 +29,7 @@ class ErrorHandler:
             status_code = status.HTTP_500_INTERNAL_SERVER_ERROR
             error_message = "Database error"
 
+        # Internals are only ever returned to clients in debug mode.
         if request.app.debug:
             return JSONResponse(
                 status_code=status_code,
@@ -30,7 +37,7 @@ class ErrorHandler:
                     "error": error_message,
                     "detail": str(exc),
                     "type": exc.__class__.__name__,
-                    "traceback": traceback.format_exc()
+                    "traceback": "".join(traceback.format_exception(exc))
                 }
             )
 
@@ -39,4 +46,4 @@ class ErrorHandler:
             content={
                 "error": error_message
             }
-        ) 
+        )
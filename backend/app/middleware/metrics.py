@@ -0,0 +1,48 @@
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app import metrics, request_timing
+
+class MetricsMiddleware:
+    """Record request count, latency, in-flight requests and SQL per request.
+
+    Requests are labeled with the route template FastAPI matched (e.g.
+    ``/todos/{todo_id}``), read from the scope after the app has run.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self._in_flight = {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        in_flight = self._in_flight.get(method)
+        if in_flight is None:
+            in_flight = self._in_flight[method] = metrics.IN_FLIGHT.labels(method)
+        # An exception escaping the app is turned into a 500 further out.
+        status_code = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        in_flight.inc()
+        with request_timing.request_scope() as timing:
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                in_flight.dec()
+                route = scope.get("route")
+                metrics.observe_request(
+                    method,
+                    getattr(route, "path", metrics.UNMATCHED_ROUTE),
+                    status_code,
+                    timing.elapsed(),
+                    timing.queries,
+                    timing.db_seconds,
+                )
@@ -0,0 +1,36 @@
+import time
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app import config
+from app.replicas import WROTE_AT_COOKIE
+
+SAFE_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+class ReadYourWritesMiddleware:
+    """Mark clients that just wrote, so their reads skip the replicas for a while.
+
+    Successful unsafe requests get a cookie with the time of the write; see
+    app.replicas.wrote_recently.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.max_age = max(1, round(config.READ_YOUR_WRITES_SECONDS))
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message: Message) -> None:
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "set-cookie",
+                    f"{WROTE_AT_COOKIE}={time.time():.3f}; Max-Age={self.max_age}; Path=/; HttpOnly; SameSite=Lax",
+                )
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
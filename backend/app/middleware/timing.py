@@ -0,0 +1,109 @@
+import asyncio
+import functools
+import logging
+import time
+
+from fastapi.routing import APIRoute
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app import request_timing
+
+slow_request_logger = logging.getLogger("app.slow_requests")
+
+class TimingMiddleware:
+    """Time every HTTP request and report it in a Server-Timing header.
+
+    Requests slower than ``slow_request_ms`` (0 disables) are logged to the
+    ``app.slow_requests`` logger together with the SQL they ran. The header
+    is sent with the response start, so for streamed responses it only covers
+    the work done before the first body chunk; the slow-request log covers
+    the whole request, except for event streams, which are long-lived by design.
+    """
+
+    def __init__(self, app: ASGIApp, slow_request_ms: float = 0):
+        self.app = app
+        self.slow_request_ms = slow_request_ms
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = None
+        event_stream = False
+        with request_timing.request_scope() as timing:
+
+            async def send_with_timing(message: Message) -> None:
+                nonlocal status_code, event_stream
+                if message["type"] == "http.response.start":
+                    status_code = message["status"]
+                    headers = MutableHeaders(scope=message)
+                    headers.append("Server-Timing", timing.server_timing())
+                    event_stream = headers.get("content-type", "").startswith("text/event-stream")
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_with_timing)
+            finally:
+                elapsed_ms = timing.elapsed() * 1000
+                if self.slow_request_ms and elapsed_ms >= self.slow_request_ms and not event_stream:
+                    self._log_slow_request(scope, status_code, elapsed_ms, timing)
+
+    def _log_slow_request(self, scope: Scope, status_code, elapsed_ms: float, timing) -> None:
+        statements = "\n".join(
+            f"  [{seconds * 1000:.2f} ms] {statement}" for statement, seconds in timing.statements
+        )
+        slow_request_logger.warning(
+            "Slow request %s %s -> %s in %.1f ms (%s)\n%s",
+            scope["method"],
+            scope["path"],
+            status_code,
+            elapsed_ms,
+            timing.server_timing(),
+            statements,
+        )
+
+class TimedRoute(APIRoute):
+    """APIRoute that splits the request's time into handler and serialization.
+
+    Handler time is the endpoint call itself; serialization is everything
+    after it until the route returns its response (response_model
+    validation and rendering).
+    """
+
+    def get_route_handler(self):
+        call = self.dependant.call
+        if asyncio.iscoroutinefunction(call):
+            @functools.wraps(call)
+            async def timed_call(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await call(*args, **kwargs)
+                finally:
+                    _record_handler(start)
+        else:
+            @functools.wraps(call)
+            def timed_call(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return call(*args, **kwargs)
+                finally:
+                    _record_handler(start)
+        self.dependant.call = timed_call
+        handler = super().get_route_handler()
+
+        async def timed_handler(request):
+            response = await handler(request)
+            timing = request_timing.current()
+            if timing is not None and timing.handler_end is not None:
+                timing.serialization_seconds += time.perf_counter() - timing.handler_end
+            return response
+
+        return timed_handler
+
+def _record_handler(start: float) -> None:
+    timing = request_timing.current()
+    if timing is not None:
+        timing.handler_end = time.perf_counter()
+        timing.handler_seconds += timing.handler_end - start
@@ -0,0 +1,21 @@
+"""Apply the schema migrations: python -m app.migrate
+
+Run once per deployment before starting workers. It applies the revisions
+in app.migrations that the database does not have yet, creating a new
+database outright, and recomputes the stats counts when
+STATS_COUNTERS_ENABLED is set.
+"""
+from app import config
+from app.database import SessionLocal, engine
+from app.migrations import migrate
+from app.startup import rebuild_counts
+
+def main() -> None:
+    applied = migrate(engine)
+    if config.STATS_COUNTERS_ENABLED:
+        rebuild_counts(SessionLocal)
+    url = engine.url.render_as_string(hide_password=True)
+    print(f"Applied {len(applied)} migrations; schema up to date on {url}")
+
+if __name__ == "__main__":
+    main()
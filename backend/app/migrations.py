@@ -0,0 +1,287 @@
+"""Versioned schema migrations, applied by ``python -m app.migrate``.
+
+Each revision is explicit DDL against the schema the previous ones left,
+and ``schema_migrations`` records the revisions a database has. ``migrate``
+applies the missing ones in order, one transaction per revision, while
+holding a lock that concurrent deployments wait on: a transaction-level
+advisory lock on PostgreSQL, the write lock (``BEGIN IMMEDIATE``) on
+SQLite. A new database is created from the models instead and recorded as
+having every revision.
+
+Revisions never change once released; a schema change adds a revision at
+the end of MIGRATIONS, next to its change to app.models.
+"""
+from datetime import datetime
+from typing import Callable, List, NamedTuple
+
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    Column,
+    Date,
+    DateTime,
+    Index,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    func,
+    insert,
+    inspect,
+    select,
+    update,
+)
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from app.database import Base
+from app.models import ADVISORY_LOCK_SPACE, MIGRATION_LOCK, NO_DUE_DATE, SEARCH_DDL
+
+schema_migrations = Table(
+    "schema_migrations",
+    MetaData(),
+    Column("revision", String(64), primary_key=True),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+def _todos(name: str = "todos", versioned: bool = False, **kwargs) -> Table:
+    """The baseline todos columns, plus those of 0004_change_feed when ``versioned``, for DDL against todos."""
+    columns = [
+        Column("id", Integer, primary_key=True),
+        Column("title", String, nullable=False),
+        Column("description", String, nullable=True),
+        Column("due_date", Date, nullable=True),
+        Column("is_completed", Boolean, nullable=False),
+        Column("created_at", DateTime, nullable=False),
+    ]
+    if versioned:
+        columns += [Column("updated_at", DateTime, nullable=False), Column("version", BigInteger, nullable=False)]
+    return Table(name, MetaData(), *columns, **kwargs)
+
+def _create_indexes(connection: Connection, *indexes: Index) -> None:
+    for index in indexes:
+        connection.execute(CreateIndex(index, if_not_exists=True))
+
+def _add_column(connection: Connection, table: str, column: Column, default: str) -> bool:
+    """Add a NOT NULL column, filled with the SQL ``default`` on existing rows; False if it exists.
+
+    PostgreSQL then drops the default, as the models have none. SQLite
+    cannot drop it, and only rejects a NOT NULL column without one.
+    """
+    if column.name in {existing["name"] for existing in inspect(connection).get_columns(table)}:
+        return False
+    column_type = column.type.compile(dialect=connection.dialect)
+    connection.exec_driver_sql(
+        f"ALTER TABLE {table} ADD COLUMN {column.name} {column_type} NOT NULL DEFAULT {default}"
+    )
+    if connection.dialect.name == "postgresql":
+        connection.exec_driver_sql(f"ALTER TABLE {table} ALTER COLUMN {column.name} DROP DEFAULT")
+    return True
+
+def baseline(connection: Connection) -> None:
+    """The schema before versioned migrations: the todos table."""
+    todos = _todos()
+    Index("ix_todos_id", todos.c.id)
+    todos.create(connection, checkfirst=True)
+
+def listing_indexes(connection: Connection) -> None:
+    """Indexes behind the keyset-paginated, filtered and sorted listings."""
+    todos = _todos()
+    _create_indexes(
+        connection,
+        Index("ix_todos_created_at_id", todos.c.created_at, todos.c.id),
+        Index("ix_todos_title_id", todos.c.title, todos.c.id),
+        Index("ix_todos_is_completed_due_date", todos.c.is_completed, todos.c.due_date),
+        Index(
+            "ix_todos_open_due_date",
+            todos.c.due_date,
+            todos.c.id,
+            postgresql_where=(todos.c.is_completed == False),
+            sqlite_where=(todos.c.is_completed == False),
+        ),
+    )
+
+def search(connection: Connection) -> None:
+    """Full-text search: the search_vector column or the todos_fts table, indexing existing todos."""
+    for statement in SEARCH_DDL.get(connection.dialect.name, []):
+        connection.exec_driver_sql(statement)
+
+def change_feed(connection: Connection) -> None:
+    """Change versions and tombstones for GET /todos/changes.
+
+    Existing todos get ``updated_at = created_at`` and version 1, the
+    counter's starting value, so a full sync returns them.
+    """
+    todos = _todos(versioned=True)
+    if _add_column(connection, "todos", todos.c.updated_at, "'1970-01-01 00:00:00'"):
+        connection.execute(update(todos).values(updated_at=todos.c.created_at))
+    if _add_column(connection, "todos", todos.c.version, "0"):
+        connection.execute(update(todos).values(version=1))
+    _create_indexes(connection, Index("ix_todos_version", todos.c.version))
+
+    metadata = MetaData()
+    counter = Table(
+        "todo_change_counter",
+        metadata,
+        Column("id", Integer, primary_key=True),
+        Column("version", BigInteger, nullable=False),
+    )
+    Table(
+        "todo_tombstones",
+        metadata,
+        Column("id", Integer, primary_key=True),
+        Column("todo_id", Integer, nullable=True),
+        Column("version", BigInteger, nullable=False, index=True),
+        Column("deleted_at", DateTime, nullable=False),
+    )
+    metadata.create_all(connection)
+    if connection.scalar(select(func.count()).select_from(counter)) == 0:
+        connection.execute(insert(counter).values(id=1, version=1))
+
+def stats_counts(connection: Connection) -> None:
+    """todo_counts, the per (due date, completion) totals behind STATS_COUNTERS_ENABLED, counted from todos."""
+    counts = Table(
+        "todo_counts",
+        MetaData(),
+        Column("due_date", Date, primary_key=True),
+        Column("is_completed", Boolean, primary_key=True),
+        Column("todos", BigInteger, nullable=False),
+    )
+    if inspect(connection).has_table("todo_counts"):
+        return
+    counts.create(connection)
+    todos = _todos()
+    rows = [
+        {"due_date": due_date or NO_DUE_DATE, "is_completed": is_completed, "todos": total}
+        for due_date, is_completed, total in connection.execute(
+            select(todos.c.due_date, todos.c.is_completed, func.count()).group_by(
+                todos.c.due_date, todos.c.is_completed
+            )
+        )
+    ]
+    if rows:
+        connection.execute(insert(counts), rows)
+
+def _sqlite_autoincrement(connection: Connection) -> None:
+    """Rebuild SQLite's todos with AUTOINCREMENT, keeping its rows, indexes and triggers."""
+    schema = connection.exec_driver_sql(
+        "SELECT type, sql FROM sqlite_master WHERE tbl_name = 'todos' AND sql IS NOT NULL"
+    ).all()
+    if any(kind == "table" and "AUTOINCREMENT" in sql.upper() for kind, sql in schema):
+        return
+    rebuilt = _todos("todos_rebuilt", versioned=True, sqlite_autoincrement=True)
+    connection.execute(CreateTable(rebuilt))
+    connection.execute(insert(rebuilt).from_select(list(rebuilt.c.keys()), select(*_todos(versioned=True).c)))
+    # Dropping todos drops its indexes and triggers too; they are recreated as they were.
+    connection.exec_driver_sql("DROP TABLE todos")
+    connection.exec_driver_sql("ALTER TABLE todos_rebuilt RENAME TO todos")
+    for kind, sql in schema:
+        if kind != "table":
+            connection.exec_driver_sql(sql)
+
+def archive(connection: Connection) -> None:
+    """todos_archive, and the index the archival scan reads.
+
+    On SQLite todos also stops reusing the ids of deleted todos, so an
+    archived todo can always move back under its id.
+    """
+    if connection.dialect.name == "sqlite":
+        _sqlite_autoincrement(connection)
+    todos = _todos(versioned=True)
+    _create_indexes(
+        connection,
+        Index(
+            "ix_todos_completed_updated_at",
+            todos.c.updated_at,
+            todos.c.id,
+            postgresql_where=(todos.c.is_completed == True),
+            sqlite_where=(todos.c.is_completed == True),
+        ),
+    )
+    archived = Table(
+        "todos_archive",
+        MetaData(),
+        Column("id", Integer, primary_key=True, autoincrement=False),
+        Column("title", String, nullable=False),
+        Column("description", String, nullable=True),
+        Column("due_date", Date, nullable=True),
+        Column("is_completed", Boolean, nullable=False),
+        Column("created_at", DateTime, nullable=False),
+        Column("updated_at", DateTime, nullable=False),
+        Column("version", BigInteger, nullable=False),
+        Column("archived_at", DateTime, nullable=False),
+    )
+    Index("ix_todos_archive_created_at_id", archived.c.created_at, archived.c.id)
+    Index("ix_todos_archive_title_id", archived.c.title, archived.c.id)
+    Index("ix_todos_archive_due_date_id", archived.c.due_date, archived.c.id)
+    archived.create(connection, checkfirst=True)
+
+def change_log(connection: Connection) -> None:
+    """todo_changes, whose autoincrement id replaces todo_change_counter as the change version.
+
+    Numbering carries on from the counter, so existing cursors stay valid.
+    """
+    changes = Table(
+        "todo_changes",
+        MetaData(),
+        Column("version", BigInteger().with_variant(Integer, "sqlite"), primary_key=True),
+        Column("changed_at", DateTime, nullable=False),
+        sqlite_autoincrement=True,
+    )
+    changes.create(connection, checkfirst=True)
+    if not inspect(connection).has_table("todo_change_counter"):
+        return
+    version = connection.exec_driver_sql("SELECT version FROM todo_change_counter WHERE id = 1").scalar()
+    if version and connection.scalar(select(func.count()).select_from(changes)) == 0:
+        connection.execute(insert(changes).values(version=version, changed_at=datetime.utcnow()))
+        if connection.dialect.name == "postgresql":
+            connection.execute(select(func.setval(func.pg_get_serial_sequence("todo_changes", "version"), version)))
+    connection.exec_driver_sql("DROP TABLE todo_change_counter")
+
+class Migration(NamedTuple):
+    revision: str
+    apply: Callable[[Connection], None]
+
+MIGRATIONS: List[Migration] = [
+    Migration("0001_baseline", baseline),
+    Migration("0002_listing_indexes", listing_indexes),
+    Migration("0003_search", search),
+    Migration("0004_change_feed", change_feed),
+    Migration("0005_stats_counts", stats_counts),
+    Migration("0006_archive", archive),
+    Migration("0007_change_log", change_log),
+]
+
+def _lock(connection: Connection) -> None:
+    """Begin a transaction that holds the migration lock until it ends."""
+    dialect = connection.dialect.name
+    if dialect == "postgresql":
+        connection.execute(select(func.pg_advisory_xact_lock(ADVISORY_LOCK_SPACE, MIGRATION_LOCK)))
+    elif dialect == "sqlite":
+        # pysqlite would only begin at the first write, leaving earlier DDL outside the transaction.
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+def migrate(bind: Engine) -> List[str]:
+    """Bring the schema up to date; returns the revisions recorded by this call, in order."""
+    recorded: List[str] = []
+    with bind.connect() as connection:
+        while True:
+            _lock(connection)
+            schema_migrations.create(connection, checkfirst=True)
+            applied = set(connection.scalars(select(schema_migrations.c.revision)))
+            pending = [migration for migration in MIGRATIONS if migration.revision not in applied]
+            if not pending:
+                connection.commit()
+                return recorded
+            if not applied and not inspect(connection).has_table("todos"):
+                # A new database: the models already are the latest revision.
+                Base.metadata.create_all(connection)
+            else:
+                pending = pending[:1]
+                pending[0].apply(connection)
+            connection.execute(
+                insert(schema_migrations),
+                [{"revision": migration.revision, "applied_at": datetime.utcnow()} for migration in pending],
+            )
+            connection.commit()
+            recorded.extend(migration.revision for migration in pending)
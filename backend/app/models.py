@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Date
-from datetime import datetime
+from sqlalchemy import BigInteger, Column, DDL, Integer, String, Boolean, DateTime, Date, Index, event
+from datetime import date, datetime
 from app.database import Base
 
 class Todo(Base):
@@ -11,10 +11,159 @@ class Todo(Base):
     due_date = Column(Date, nullable=True)
     is_completed = Column(Boolean, nullable=False, default=False)
     created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Change-feed version of the last write; see TodoChange.
+    version = Column(BigInteger, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("ix_todos_version", version),
+        Index("ix_todos_created_at_id", created_at, id),
+        Index("ix_todos_title_id", title, id),
+        Index("ix_todos_is_completed_due_date", is_completed, due_date),
+        # Completed todos by last change: the archival scan.
+        Index(
+            "ix_todos_completed_updated_at",
+            updated_at,
+            id,
+            postgresql_where=(is_completed == True),
+            sqlite_where=(is_completed == True),
+        ),
+        # Open todos by due date: serves the overdue filter and the default due-date view.
+        Index(
+            "ix_todos_open_due_date",
+            due_date,
+            id,
+            postgresql_where=(is_completed == False),
+            sqlite_where=(is_completed == False),
+        ),
+        # Never reuse the id of a deleted or archived todo, so an archived todo can be restored under its id.
+        {"sqlite_autoincrement": True},
+    )
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         if 'created_at' not in kwargs:
             self.created_at = datetime.utcnow()
+        if 'updated_at' not in kwargs:
+            self.updated_at = self.created_at
         if 'is_completed' not in kwargs:
             self.is_completed = False
+
+# Full-text search over title and description, outside the ORM model since
+# each dialect stores it differently. PostgreSQL: a generated tsvector column
+# (title weighted above description) with a GIN index. SQLite: an external
+# content FTS5 table with the porter stemmer, kept in sync by triggers and
+# ranked by bm25 with a similar weighting. Every statement can be rerun, so
+# the search migration also applies it to an existing todos table.
+SEARCH_DDL = {
+    "postgresql": [
+        """ALTER TABLE todos ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('english', coalesce(title, '')), 'A')
+            || setweight(to_tsvector('english', coalesce(description, '')), 'B')
+        ) STORED""",
+        "CREATE INDEX IF NOT EXISTS ix_todos_search_vector ON todos USING GIN (search_vector)",
+    ],
+    "sqlite": [
+        """CREATE VIRTUAL TABLE IF NOT EXISTS todos_fts USING fts5(
+            title, description, content='todos', content_rowid='id', tokenize='porter unicode61'
+        )""",
+        "INSERT INTO todos_fts (todos_fts) VALUES ('rebuild')",
+        """CREATE TRIGGER IF NOT EXISTS todos_fts_insert AFTER INSERT ON todos BEGIN
+            INSERT INTO todos_fts (rowid, title, description) VALUES (new.id, new.title, new.description);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS todos_fts_delete AFTER DELETE ON todos BEGIN
+            INSERT INTO todos_fts (todos_fts, rowid, title, description)
+            VALUES ('delete', old.id, old.title, old.description);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS todos_fts_update AFTER UPDATE OF title, description ON todos BEGIN
+            INSERT INTO todos_fts (todos_fts, rowid, title, description)
+            VALUES ('delete', old.id, old.title, old.description);
+            INSERT INTO todos_fts (rowid, title, description) VALUES (new.id, new.title, new.description);
+        END""",
+    ],
+}
+
+for dialect, statements in SEARCH_DDL.items():
+    for statement in statements:
+        event.listen(Todo.__table__, "after_create", DDL(statement).execute_if(dialect=dialect))
+event.listen(Todo.__table__, "before_drop", DDL("DROP TABLE IF EXISTS todos_fts").execute_if(dialect="sqlite"))
+
+class ArchivedTodo(Base):
+    """A completed todo moved out of ``todos`` by app.archive, under the same id.
+
+    Listings only read it with ``include_archived``; reopening the todo moves
+    it back. Its indexes mirror the listing indexes on todos.
+    """
+    __tablename__ = "todos_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    title = Column(String, nullable=False)
+    description = Column(String, nullable=True)
+    due_date = Column(Date, nullable=True)
+    is_completed = Column(Boolean, nullable=False)
+    created_at = Column(DateTime, nullable=False)
+    updated_at = Column(DateTime, nullable=False)
+    version = Column(BigInteger, nullable=False)
+    archived_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_todos_archive_created_at_id", created_at, id),
+        Index("ix_todos_archive_title_id", title, id),
+        Index("ix_todos_archive_due_date_id", due_date, id),
+    )
+
+# Columns copied between todos and todos_archive, in the same order in both.
+TODO_COLUMNS = ("id", "title", "description", "due_date", "is_completed", "created_at", "updated_at", "version")
+
+# PostgreSQL advisory locks. A write holds one keyed by its change version
+# (the single bigint key form) until it ends; the app's other advisory locks
+# use the two-key form, with this first key and one of the second keys below.
+ADVISORY_LOCK_SPACE = 1_953_459_311
+TAKING_VERSION_LOCK = 0
+MIGRATION_LOCK = 1
+
+class TodoChange(Base):
+    """One row per write to todos, whose autoincrement id is the write's change version.
+
+    Inserting a row takes the next version from a sequence (AUTOINCREMENT
+    on SQLite), so concurrent writers never wait for each other. Versions
+    can therefore commit out of order; the change feed only reads up to the
+    committed watermark, below which no version is still in flight. See
+    TodoRepository.current_version.
+    """
+    __tablename__ = "todo_changes"
+
+    version = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    changed_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = ({"sqlite_autoincrement": True},)
+
+class TodoTombstone(Base):
+    """A deleted todo, kept so incremental sync can report the deletion.
+
+    ``todo_id`` is NULL for a delete-all, or where older tombstones were
+    pruned: clients that have not synced up to ``version`` must drop their
+    local copy.
+    """
+    __tablename__ = "todo_tombstones"
+
+    id = Column(Integer, primary_key=True)
+    todo_id = Column(Integer, nullable=True)
+    version = Column(BigInteger, nullable=False, index=True)
+    deleted_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+# Key of undated todos in TodoCount, which cannot use NULL in its primary key.
+NO_DUE_DATE = date.min
+
+class TodoCount(Base):
+    """Number of todos per (due date, completion), kept current by every write.
+
+    Only maintained with STATS_COUNTERS_ENABLED; it lets GET /todos/stats
+    add up one row per distinct due date instead of scanning todos. Todos
+    without a due date are counted under NO_DUE_DATE.
+    """
+    __tablename__ = "todo_counts"
+
+    due_date = Column(Date, primary_key=True)
+    is_completed = Column(Boolean, primary_key=True)
+    todos = Column(BigInteger, nullable=False)
@@ -0,0 +1,53 @@
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from typing import Any, Optional, Tuple
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+class InvalidCursorError(ValueError):
+    pass
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+_DECODERS = {
+    "created_at": datetime.fromisoformat,
+    "due_date": date.fromisoformat,
+    "title": str,
+    # Search relevance; see TodoRepository.search.
+    "rank": float,
+}
+
+def encode_cursor(sort: str, value: Any, last_id: int) -> str:
+    payload = json.dumps([sort, _encode_value(value), last_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, sort: str) -> Tuple[Optional[Any], int]:
+    """Return the (sort value, id) keyset position stored in ``cursor``.
+
+    Cursors are only valid for the sort order they were issued for.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort, value, last_id = json.loads(base64.urlsafe_b64decode(padded))
+        if cursor_sort != sort or not isinstance(last_id, int):
+            raise InvalidCursorError("Cursor does not match the requested sort order")
+        if value is not None:
+            value = _DECODERS[sort](value)
+        return value, last_id
+    except InvalidCursorError:
+        raise
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise InvalidCursorError("Invalid pagination cursor")
+
+def encode_version_cursor(version: int) -> str:
+    """Cursor for GET /todos/changes: the last change version the client has applied."""
+    return encode_cursor("changes", None, version)
+
+def decode_version_cursor(cursor: str) -> int:
+    return decode_cursor(cursor, "changes")[1]
@@ -0,0 +1,129 @@
+import threading
+import time
+from typing import Dict, Type
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import Pool
+
+from app import request_timing
+
+# Upper bounds (seconds) of the checkout wait histogram buckets.
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+class PoolMetrics:
+    """Counters for one engine's connection pool.
+
+    Checkout wait time is measured by the pool class returned from
+    ``pool_class``; everything else comes from pool events registered by
+    ``listen``.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.checkins = 0
+        self.connects = 0
+        self.invalidations = 0
+        self.soft_invalidations = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.wait_buckets = [0] * (len(WAIT_BUCKETS) + 1)
+        self.peak_checked_out = 0
+        self.peak_overflow = 0
+        self._checked_out = 0
+
+    def pool_class(self, base: Type[Pool]) -> Type[Pool]:
+        """Subclass ``base`` so every checkout reports how long it waited for a connection."""
+        metrics = self
+
+        class InstrumentedPool(base):
+            def connect(self):
+                start = time.perf_counter()
+                try:
+                    return super().connect()
+                except PoolTimeoutError:
+                    metrics.record_timeout()
+                    raise
+                finally:
+                    waited = time.perf_counter() - start
+                    metrics.record_wait(waited, self)
+                    request_timing.record_pool_wait(waited)
+
+        InstrumentedPool.__name__ = f"Instrumented{base.__name__}"
+        return InstrumentedPool
+
+    def listen(self, engine: Engine) -> None:
+        event.listen(engine, "connect", self._on_connect)
+        event.listen(engine, "checkout", self._on_checkout)
+        event.listen(engine, "checkin", self._on_checkin)
+        event.listen(engine, "invalidate", self._on_invalidate)
+        event.listen(engine, "soft_invalidate", self._on_soft_invalidate)
+
+    def record_wait(self, seconds: float, pool: Pool) -> None:
+        bucket = next((i for i, bound in enumerate(WAIT_BUCKETS) if seconds <= bound), len(WAIT_BUCKETS))
+        overflow = pool.overflow() if hasattr(pool, "overflow") else 0
+        with self._lock:
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+            self.wait_buckets[bucket] += 1
+            self.peak_overflow = max(self.peak_overflow, overflow)
+
+    def record_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+    def _on_connect(self, dbapi_connection, connection_record) -> None:
+        with self._lock:
+            self.connects += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self._checked_out += 1
+            self.peak_checked_out = max(self.peak_checked_out, self._checked_out)
+
+    def _on_checkin(self, dbapi_connection, connection_record) -> None:
+        with self._lock:
+            self.checkins += 1
+            self._checked_out = max(self._checked_out - 1, 0)
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception) -> None:
+        with self._lock:
+            self.invalidations += 1
+
+    def _on_soft_invalidate(self, dbapi_connection, connection_record, exception) -> None:
+        with self._lock:
+            self.soft_invalidations += 1
+
+    def snapshot(self, pool: Pool) -> Dict:
+        """Current pool occupancy plus the counters collected since startup."""
+        with self._lock:
+            waits = sum(self.wait_buckets)
+            stats = {
+                "pool_class": type(pool).__name__,
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "connects": self.connects,
+                "invalidations": self.invalidations,
+                "soft_invalidations": self.soft_invalidations,
+                "timeouts": self.timeouts,
+                "peak_checked_out": self.peak_checked_out,
+                "peak_overflow": self.peak_overflow,
+                "wait_seconds": {
+                    "count": waits,
+                    "total": self.wait_seconds_total,
+                    "mean": self.wait_seconds_total / waits if waits else 0.0,
+                    "max": self.wait_seconds_max,
+                    "buckets": {
+                        **{str(bound): count for bound, count in zip(WAIT_BUCKETS, self.wait_buckets)},
+                        "+Inf": self.wait_buckets[-1],
+                    },
+                },
+            }
+        for name in ("size", "checkedout", "checkedin", "overflow"):
+            if hasattr(pool, name):
+                stats[name] = getattr(pool, name)()
+        return stats
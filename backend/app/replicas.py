@@ -0,0 +1,119 @@
+"""Round-robin routing of read-only requests across read replicas.
+
+Read-only routes take a session from the next replica that is up. A replica
+is health checked with ``SELECT 1`` when a session is taken from it, at most
+once per check interval. A replica that fails is skipped until the retry
+interval has passed, and reads fall back to the primary when no replica is
+up. Replication lag is not measured.
+
+Read-your-writes is per client: a successful write sets a cookie holding the
+time of the write, and requests carrying one that is less than
+READ_YOUR_WRITES_SECONDS old read from the primary.
+"""
+import itertools
+import logging
+import time
+from typing import Iterator, List
+
+from sqlalchemy.exc import DBAPIError
+from starlette.requests import Request
+
+from app import config
+from app.pool_metrics import PoolMetrics
+
+logger = logging.getLogger(__name__)
+
+WROTE_AT_COOKIE = "todo_wrote_at"
+
+class Replica:
+    def __init__(self, name: str, engine, session_factory, pool_metrics: PoolMetrics):
+        self.name = name
+        self.engine = engine
+        self.session_factory = session_factory
+        self.pool_metrics = pool_metrics
+        self.checked_at = float("-inf")
+        self.down_until = 0.0
+
+class ReplicaSet:
+    def __init__(self, replicas: List[Replica], check_seconds: float, retry_seconds: float):
+        self.replicas = replicas
+        self.check_seconds = check_seconds
+        self.retry_seconds = retry_seconds
+        self._turn = itertools.count()
+        self.fallbacks = 0
+
+    def connect(self):
+        """A session holding a live connection to the next replica that is up, or None."""
+        for replica, now in self._candidates():
+            db = replica.session_factory()
+            try:
+                connection = db.connection()
+                if now - replica.checked_at >= self.check_seconds:
+                    connection.exec_driver_sql("SELECT 1")
+                    replica.checked_at = now
+            except DBAPIError as e:
+                db.close()
+                self._mark_down(replica, now, e)
+                continue
+            db.info["replica"] = replica.name
+            return db
+        self.fallbacks += 1
+        return None
+
+    def status(self) -> dict:
+        now = time.monotonic()
+        return {
+            "fallbacks": self.fallbacks,
+            "replicas": [
+                {
+                    "name": replica.name,
+                    "up": replica.down_until <= now,
+                    **replica.pool_metrics.snapshot(replica.engine.pool),
+                }
+                for replica in self.replicas
+            ],
+        }
+
+    def _candidates(self) -> Iterator[tuple]:
+        now = time.monotonic()
+        start = next(self._turn)
+        for offset in range(len(self.replicas)):
+            replica = self.replicas[(start + offset) % len(self.replicas)]
+            if replica.down_until <= now:
+                yield replica, now
+
+    def _mark_down(self, replica: Replica, now: float, error: Exception) -> None:
+        replica.down_until = now + self.retry_seconds
+        # Check again as soon as it is retried.
+        replica.checked_at = float("-inf")
+        logger.warning(
+            "Replica %s failed its health check; skipping it for %.0fs: %s", replica.name, self.retry_seconds, error
+        )
+
+class AsyncReplicaSet(ReplicaSet):
+    async def connect(self):
+        for replica, now in self._candidates():
+            db = replica.session_factory()
+            try:
+                connection = await db.connection()
+                if now - replica.checked_at >= self.check_seconds:
+                    await connection.exec_driver_sql("SELECT 1")
+                    replica.checked_at = now
+            except DBAPIError as e:
+                await db.close()
+                self._mark_down(replica, now, e)
+                continue
+            db.info["replica"] = replica.name
+            return db
+        self.fallbacks += 1
+        return None
+
+def wrote_recently(request: Request) -> bool:
+    """Whether the client wrote within the read-your-writes window."""
+    wrote_at = request.cookies.get(WROTE_AT_COOKIE)
+    if not wrote_at:
+        return False
+    try:
+        return time.time() - float(wrote_at) < config.READ_YOUR_WRITES_SECONDS
+    except ValueError:
+        return False
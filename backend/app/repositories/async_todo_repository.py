@@ -0,0 +1,115 @@
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import ArchivedTodo, Todo
+from app.repositories.todo_repository import ChangeSet, TodoRepository
+from app.schemas import TodoCreate, TodoUpdate
+
+def _call(session, method: Callable, *args) -> Any:
+    return method(*args)
+
+class AsyncTodoRepository:
+    """Asyncio counterpart of TodoRepository, on an AsyncSession.
+
+    Each method runs the TodoRepository method of the same name on the
+    session's underlying Session through ``AsyncSession.run_sync``, so the
+    statements and the version, tombstone and count bookkeeping are written
+    once; they still execute on the asyncio driver. ``sync`` is that
+    TodoRepository.
+    """
+
+    def __init__(self, db: AsyncSession, returning: Optional[bool] = None, counts: bool = False):
+        self.db = db
+        self.sync = TodoRepository(db.sync_session, returning, counts)
+
+    @property
+    def counts(self) -> bool:
+        return self.sync.counts
+
+    @property
+    def last_version(self) -> Optional[int]:
+        return self.sync.last_version
+
+    async def run(self, method: Callable, *args) -> Any:
+        """Call ``method(*args)``, which uses ``self.db.sync_session``, from inside ``run_sync``."""
+        return await self.db.run_sync(_call, method, *args)
+
+    async def create(self, todo: TodoCreate) -> Todo:
+        return await self.run(self.sync.create, todo)
+
+    async def create_many(self, todos: List[TodoCreate]) -> List[Todo]:
+        return await self.run(self.sync.create_many, todos)
+
+    async def get_by_id(self, todo_id: int) -> Optional[Todo]:
+        return await self.run(self.sync.get_by_id, todo_id)
+
+    async def get_archived(self, todo_id: int) -> Optional[ArchivedTodo]:
+        return await self.run(self.sync.get_archived, todo_id)
+
+    async def get_many(self, todo_ids: Iterable[int]) -> Dict[int, Todo]:
+        return await self.run(self.sync.get_many, todo_ids)
+
+    async def get_all(
+        self, status: Optional[str] = None, sort: str = "created_at", include_archived: bool = False
+    ) -> List[Todo]:
+        return await self.run(self.sync.get_all, status, sort, include_archived)
+
+    async def get_page(
+        self,
+        limit: Optional[int] = None,
+        after: Optional[Tuple[Any, int]] = None,
+        status: Optional[str] = None,
+        sort: str = "created_at",
+        include_archived: bool = False,
+    ) -> List[Todo]:
+        return await self.run(self.sync.get_page, limit, after, status, sort, include_archived)
+
+    async def search(
+        self, text: str, limit: Optional[int] = None, after: Optional[Tuple[float, int]] = None
+    ) -> List[Tuple[Todo, float]]:
+        return await self.run(self.sync.search, text, limit, after)
+
+    async def update(self, todo_id: int, todo: TodoUpdate) -> Optional[Todo]:
+        return await self.run(self.sync.update, todo_id, todo)
+
+    async def update_many(self, updates: Dict[int, Dict[str, Any]]) -> Dict[int, Todo]:
+        return await self.run(self.sync.update_many, updates)
+
+    async def delete_many(self, todo_ids: Iterable[int]) -> Set[int]:
+        return await self.run(self.sync.delete_many, todo_ids)
+
+    async def delete(self, todo_id: int) -> bool:
+        return await self.run(self.sync.delete, todo_id)
+
+    async def delete_all(self) -> int:
+        return await self.run(self.sync.delete_all)
+
+    async def complete(self, todo_id: int) -> Optional[Todo]:
+        return await self.run(self.sync.complete, todo_id)
+
+    async def incomplete(self, todo_id: int) -> Optional[Todo]:
+        return await self.run(self.sync.incomplete, todo_id)
+
+    async def archive(self, cutoff: datetime, limit: int) -> List[int]:
+        return await self.run(self.sync.archive, cutoff, limit)
+
+    async def prune_changes(self, cutoff: datetime) -> int:
+        return await self.run(self.sync.prune_changes, cutoff)
+
+    async def current_version(self) -> int:
+        return await self.run(self.sync.current_version)
+
+    async def logged_versions(self, after: int, upto: int) -> List[int]:
+        return await self.run(self.sync.logged_versions, after, upto)
+
+    async def get_stats(self, today: date, include_archived: bool = False) -> Dict[str, int]:
+        return await self.run(self.sync.get_stats, today, include_archived)
+
+    async def rebuild_counts(self) -> None:
+        await self.run(self.sync.rebuild_counts)
+
+    async def get_changes(self, since: Optional[int]) -> ChangeSet:
+        return await self.run(self.sync.get_changes, since)
+
+    async def begin(self) -> None:
+        await self.run(self.sync.begin)
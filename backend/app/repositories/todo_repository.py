@@ -1,54 +1,764 @@
-from typing import List, Optional
-from sqlalchemy.orm import Session
-from app.models import Todo
+import re
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+from sqlalchemy import (
+    DateTime,
+    Select,
+    and_,
+    cast,
+    column,
+    delete,
+    func,
+    insert,
+    literal,
+    literal_column,
+    or_,
+    select,
+    table,
+    text,
+    tuple_,
+    update,
+)
+from sqlalchemy.dialects.postgresql import REGCLASS, insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session, aliased
+from app.models import (
+    ADVISORY_LOCK_SPACE,
+    NO_DUE_DATE,
+    TAKING_VERSION_LOCK,
+    TODO_COLUMNS,
+    ArchivedTodo,
+    Todo,
+    TodoChange,
+    TodoCount,
+    TodoTombstone,
+)
 from app.schemas import TodoCreate, TodoUpdate
 
+SORT_COLUMNS = {
+    "created_at": Todo.created_at,
+    "due_date": Todo.due_date,
+    "title": Todo.title,
+}
+
+def _status_filter(status: str, todo=Todo):
+    if status == "completed":
+        return todo.is_completed == True
+    if status == "incomplete":
+        return todo.is_completed == False
+    if status == "overdue":
+        return and_(todo.is_completed == False, todo.due_date < date.today())
+    raise ValueError(f"Unknown status filter: {status}")
+
+def _after_filter(sort: str, after: Tuple[Any, int], todo=Todo):
+    value, last_id = after
+    column = getattr(todo, SORT_COLUMNS[sort].key)
+    if sort != "due_date":
+        return tuple_(column, todo.id) > tuple_(value, last_id)
+    # due_date is nullable and sorts NULLS LAST, so undated rows form the tail of the keyset.
+    if value is None:
+        return and_(todo.due_date.is_(None), todo.id > last_id)
+    return or_(tuple_(todo.due_date, todo.id) > tuple_(value, last_id), todo.due_date.is_(None))
+
+def _with_archived():
+    """Todo mapped over ``todos UNION ALL todos_archive``."""
+    hot = select(*(getattr(Todo, name) for name in TODO_COLUMNS))
+    archived = select(*(getattr(ArchivedTodo, name) for name in TODO_COLUMNS))
+    return aliased(Todo, hot.union_all(archived).subquery("todos_with_archived"))
+
+def list_statement(
+    status: Optional[str] = None,
+    sort: str = "created_at",
+    after: Optional[Tuple[Any, int]] = None,
+    limit: Optional[int] = None,
+    include_archived: bool = False,
+) -> Select:
+    """Build the SELECT behind todo listings: filtered, keyset-positioned and ordered by (sort, id)."""
+    todo = _with_archived() if include_archived else Todo
+    stmt = select(todo)
+    if status is not None:
+        stmt = stmt.where(_status_filter(status, todo))
+    if after is not None:
+        stmt = stmt.where(_after_filter(sort, after, todo))
+    column = getattr(todo, SORT_COLUMNS[sort].key)
+    if sort == "due_date":
+        column = column.asc().nulls_last()
+    stmt = stmt.order_by(column, todo.id)
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return stmt
+
+def create_many_statement():
+    """Multi-row ``INSERT ... RETURNING`` whose rows come back in parameter order."""
+    return insert(Todo).returning(Todo, sort_by_parameter_order=True)
+
+def update_statement(todo_id: int, values: Dict[str, Any], *criteria):
+    """Build ``UPDATE todos SET ... WHERE id = :id [AND criteria] RETURNING *``."""
+    return (
+        update(Todo)
+        .where(Todo.id == todo_id, *criteria)
+        .values(**values)
+        .returning(Todo)
+        .execution_options(populate_existing=True)
+    )
+
+def next_version_statement(dialect: str):
+    """``INSERT INTO todo_changes``, taking the next change version from its sequence.
+
+    On PostgreSQL the writer also shows the version as in flight, for
+    ``TodoRepository.current_version``: it holds a shared TAKING_VERSION_LOCK
+    from before the sequence is read, then a lock keyed by the version, both
+    until its transaction ends.
+    """
+    if dialect != "postgresql":
+        return insert(TodoChange)
+    writer = select(func.pg_advisory_xact_lock_shared(ADVISORY_LOCK_SPACE, TAKING_VERSION_LOCK)).cte("writer")
+    return (
+        insert(TodoChange)
+        .from_select(["changed_at"], select(literal(datetime.utcnow(), DateTime)).select_from(writer))
+        .returning(TodoChange.version, func.pg_advisory_xact_lock_shared(TodoChange.version))
+    )
+
+def archivable_statement(cutoff: datetime, limit: int) -> Select:
+    """Id and due date of up to ``limit`` todos completed and unchanged since before ``cutoff``, oldest first."""
+    return (
+        select(Todo.id, Todo.due_date)
+        .where(Todo.is_completed == True, Todo.updated_at < cutoff)
+        .order_by(Todo.updated_at, Todo.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+
+def archive_statement(todo_ids: List[int]):
+    """Copy the given todos into todos_archive."""
+    columns = [getattr(Todo, name) for name in TODO_COLUMNS]
+    rows = select(*columns, literal(datetime.utcnow())).where(Todo.id.in_(todo_ids))
+    return insert(ArchivedTodo).from_select([*TODO_COLUMNS, "archived_at"], rows)
+
+def restore_statement(todo_ids: Iterable[int], values: Dict[str, Any]):
+    """Copy archived todos back into todos, with ``values`` in place of their archived columns."""
+    columns = [literal(values[name]) if name in values else getattr(ArchivedTodo, name) for name in TODO_COLUMNS]
+    return insert(Todo).from_select(list(TODO_COLUMNS), select(*columns).where(ArchivedTodo.id.in_(todo_ids)))
+
+def committed_version_statement() -> Select:
+    return select(func.coalesce(func.max(TodoChange.version), 0))
+
+def logged_versions_statement(after: int, upto: int) -> Select:
+    return (
+        select(TodoChange.version)
+        .where(TodoChange.version > after, TodoChange.version <= upto)
+        .order_by(TodoChange.version)
+    )
+
+def taken_version_statement() -> Select:
+    """The last version PostgreSQL's sequence handed out, committed or not."""
+    sequence = cast(func.pg_get_serial_sequence(TodoChange.__tablename__, "version"), REGCLASS)
+    return select(func.coalesce(func.pg_sequence_last_value(sequence), 0))
+
+# The lowest version still in flight, and whether a writer is between taking
+# its version and locking it. pg_locks is read once: a CTE used more than
+# once is materialized.
+IN_FLIGHT_STATEMENT = text(
+    """
+    WITH locks AS (
+        SELECT pid, classid, objid, objsubid FROM pg_locks
+        WHERE locktype = 'advisory'
+        AND database = (SELECT oid FROM pg_database WHERE datname = current_database())
+    )
+    SELECT
+        (SELECT min((classid::bigint << 32) | objid::bigint) FROM locks WHERE objsubid = 1),
+        EXISTS (
+            SELECT 1 FROM locks taking
+            WHERE taking.objsubid = 2 AND taking.classid = :space AND taking.objid = :taking
+            AND NOT EXISTS (SELECT 1 FROM locks held WHERE held.objsubid = 1 AND held.pid = taking.pid)
+        )
+    """
+).bindparams(space=ADVISORY_LOCK_SPACE, taking=TAKING_VERSION_LOCK)
+
+# How often current_version re-reads pg_locks while a writer is taking a version.
+WATERMARK_ATTEMPTS = 50
+
+def stamp(values: Dict[str, Any], version: int) -> Dict[str, Any]:
+    """``values`` plus the change version and modification time of the write."""
+    return {**values, "version": version, "updated_at": datetime.utcnow()}
+
+def tombstone_rows(todo_ids: Iterable[Optional[int]], version: int) -> List[Dict[str, Any]]:
+    return [{"todo_id": todo_id, "version": version} for todo_id in todo_ids]
+
+def changed_todos_statement(since: Optional[int], upto: int) -> Select:
+    """Todos written in the version window ``(since, upto]``; all live todos when ``since`` is None."""
+    stmt = select(Todo).where(Todo.version <= upto).order_by(Todo.version, Todo.id)
+    if since is not None:
+        stmt = stmt.where(Todo.version > since)
+    return stmt
+
+def tombstones_statement(since: Optional[int], upto: int) -> Select:
+    stmt = (
+        select(TodoTombstone.todo_id, TodoTombstone.version)
+        .where(TodoTombstone.version <= upto)
+        .order_by(TodoTombstone.version, TodoTombstone.id)
+    )
+    if since is not None:
+        stmt = stmt.where(TodoTombstone.version > since)
+    return stmt
+
+_SEARCH_TERM = re.compile(r"\w+")
+_FTS = table("todos_fts", column("rowid"))
+
+def fts5_query(text: str) -> str:
+    """The words of ``text`` as an FTS5 query matching all of them; FTS5 syntax in the input is not interpreted."""
+    return " ".join(f'"{term}"' for term in _SEARCH_TERM.findall(text))
+
+def search_statement(
+    dialect: str, text: str, after: Optional[Tuple[float, int]] = None, limit: Optional[int] = None
+) -> Select:
+    """Todos matching every word of ``text``, best match first, as ``(Todo, rank)`` rows.
+
+    Lower ranks are better on both dialects, so pages are keyset-positioned
+    on ``(rank, id)`` like the listings.
+    """
+    if dialect == "postgresql":
+        query = func.websearch_to_tsquery("english", text)
+        vector = literal_column("todos.search_vector")
+        rank = -func.ts_rank(vector, query)
+        stmt = select(Todo, rank.label("rank")).where(vector.op("@@")(query))
+    else:
+        # Weights per column (title, description), as setweight does on PostgreSQL.
+        rank = func.bm25(literal_column("todos_fts"), 2.0, 1.0)
+        stmt = (
+            select(Todo, rank.label("rank"))
+            .join(_FTS, _FTS.c.rowid == Todo.id)
+            .where(literal_column("todos_fts").op("MATCH")(fts5_query(text)))
+        )
+    if after is not None:
+        stmt = stmt.where(tuple_(rank, Todo.id) > tuple_(*after))
+    stmt = stmt.order_by(rank, Todo.id)
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return stmt
+
+class ChangeSet(NamedTuple):
+    upserts: List[Todo]
+    deleted: List[int]
+    reset: bool
+    version: int
+
+def needs_reset(since: Optional[int], tombstones: List[Tuple[Optional[int], int]]) -> bool:
+    """A full sync, or a window containing a delete-all, makes the client start over."""
+    return since is None or any(todo_id is None for todo_id, _ in tombstones)
+
+def change_set(
+    upto: int, tombstones: List[Tuple[Optional[int], int]], upserts: List[Todo], reset: bool
+) -> ChangeSet:
+    """Combine a window's tombstones and upserts.
+
+    On ``reset`` the upserts are every live todo, and only deletions after
+    the last delete-all are still news.
+    """
+    resets = [version for todo_id, version in tombstones if todo_id is None]
+    if resets:
+        tombstones = [(todo_id, version) for todo_id, version in tombstones if version > resets[-1]]
+    live = {todo.id for todo in upserts}
+    # Ids can be reused (SQLite), so a tombstone may belong to a todo that exists again.
+    deleted = list(dict.fromkeys(todo_id for todo_id, _ in tombstones if todo_id not in live))
+    return ChangeSet(upserts, deleted, reset, upto)
+
+def _stats_columns(tally: Callable, due_date, is_completed, dated, today: date) -> tuple:
+    """The TodoStats aggregates, where ``tally(*criteria)`` counts the todos matching ``criteria``."""
+    is_open = is_completed == False
+    return (
+        tally().label("total"),
+        tally(is_completed == True).label("completed"),
+        tally(is_open, dated, due_date < today).label("overdue"),
+        tally(is_open, due_date == today).label("due_today"),
+        tally(is_open, due_date >= today, due_date < today + timedelta(days=7)).label("due_this_week"),
+    )
+
+def stats_statement(today: date) -> Select:
+    """All stats in one pass over todos, as ``count(*) FILTER (WHERE ...)`` aggregates."""
+    tally = lambda *criteria: func.count().filter(*criteria) if criteria else func.count()
+    return select(*_stats_columns(tally, Todo.due_date, Todo.is_completed, Todo.due_date.is_not(None), today))
+
+def counted_stats_statement(today: date) -> Select:
+    """The same stats added up from TodoCount, one row per distinct (due date, completion)."""
+    def tally(*criteria):
+        total = func.sum(TodoCount.todos)
+        return func.coalesce(total.filter(*criteria) if criteria else total, 0)
+    dated = TodoCount.due_date != NO_DUE_DATE
+    return select(*_stats_columns(tally, TodoCount.due_date, TodoCount.is_completed, dated, today))
+
+CountKey = Tuple[Optional[date], bool]
+
+def count_rows(removed: Iterable[CountKey], added: Iterable[CountKey]) -> List[Dict[str, Any]]:
+    """TodoCount deltas for todos leaving the ``removed`` (due_date, is_completed) keys and entering ``added``.
+
+    Sorted by key, so concurrent writers lock the rows they share in the same order.
+    """
+    deltas: Dict[Tuple[date, bool], int] = {}
+    for keys, step in ((removed, -1), (added, 1)):
+        for due_date, is_completed in keys:
+            key = (due_date or NO_DUE_DATE, bool(is_completed))
+            deltas[key] = deltas.get(key, 0) + step
+    return [
+        {"due_date": due_date, "is_completed": is_completed, "todos": todos}
+        for (due_date, is_completed), todos in sorted(deltas.items())
+        if todos
+    ]
+
+def upsert_counts_statement(dialect: str):
+    """``INSERT ... ON CONFLICT DO UPDATE`` adding each row's ``todos`` to its TodoCount (PostgreSQL, SQLite)."""
+    stmt = (postgresql_insert if dialect == "postgresql" else sqlite_insert)(TodoCount)
+    return stmt.on_conflict_do_update(
+        index_elements=[TodoCount.due_date, TodoCount.is_completed],
+        set_={"todos": TodoCount.todos + stmt.excluded.todos},
+    )
+
+def archived_count_statement() -> Select:
+    return select(func.count()).select_from(ArchivedTodo)
+
+def recount_statement() -> Select:
+    return select(Todo.due_date, Todo.is_completed, func.count()).group_by(Todo.due_date, Todo.is_completed)
+
+def stats_from_row(row) -> Dict[str, int]:
+    # SUM over a BIGINT is NUMERIC on PostgreSQL.
+    return {name: int(value) for name, value in row._mapping.items()}
+
 class TodoRepository:
-    def __init__(self, db: Session):
+    """Data access for todos.
+
+    When the database supports ``UPDATE/DELETE ... RETURNING`` (PostgreSQL,
+    SQLite 3.35+) mutations run as one conditional statement instead of a
+    SELECT, a flush and a refresh. Pass ``returning=False`` to force the
+    read-modify-write path, whose reads lock the rows they are about to
+    write (``SELECT ... FOR UPDATE`` on PostgreSQL).
+
+    With ``counts=True`` every write also keeps TodoCount current, in the
+    same transaction, so ``get_stats`` does not scan todos. All writers must
+    then agree on it; ``rebuild_counts`` recomputes the table.
+    """
+
+    def __init__(self, db: Session, returning: Optional[bool] = None, counts: bool = False):
         self.db = db
+        self.counts = counts
+        dialect = db.get_bind().dialect
+        self.dialect = dialect.name
+        if returning is None:
+            returning = dialect.update_returning
+        self.returning = returning
+        # Version taken by the most recent write, used as its event id.
+        self.last_version: Optional[int] = None
+        # False inside a service transaction: writes are flushed, and the
+        # caller commits or rolls back.
+        self.autocommit = True
 
     def create(self, todo: TodoCreate) -> Todo:
-        db_todo = Todo(**todo.model_dump())
+        db_todo = Todo(**todo.model_dump(), version=self._next_version())
         self.db.add(db_todo)
-        self.db.commit()
+        self._count([], [(db_todo.due_date, db_todo.is_completed)])
+        self._commit()
         self.db.refresh(db_todo)
         return db_todo
 
+    def create_many(self, todos: List[TodoCreate]) -> List[Todo]:
+        """Insert all todos in one multi-row INSERT and one transaction, preserving input order."""
+        version = self._next_version()
+        rows = [{**todo.model_dump(), "version": version} for todo in todos]
+        if self.returning:
+            db_todos = list(self.db.scalars(create_many_statement(), rows))
+        else:
+            db_todos = [Todo(**row) for row in rows]
+            self.db.add_all(db_todos)
+            self.db.flush()
+        self._count([], [(row["due_date"], False) for row in rows])
+        self._commit()
+        return db_todos
+
     def get_by_id(self, todo_id: int) -> Optional[Todo]:
         return self.db.query(Todo).filter(Todo.id == todo_id).first()
 
-    def get_all(self) -> List[Todo]:
-        return self.db.query(Todo).all()
+    def get_archived(self, todo_id: int) -> Optional[ArchivedTodo]:
+        return self.db.get(ArchivedTodo, todo_id)
+
+    def get_many(self, todo_ids: Iterable[int]) -> Dict[int, Todo]:
+        stmt = select(Todo).where(Todo.id.in_(set(todo_ids))).execution_options(populate_existing=True)
+        return {todo.id: todo for todo in self.db.scalars(stmt)}
+
+    def get_all(
+        self, status: Optional[str] = None, sort: str = "created_at", include_archived: bool = False
+    ) -> List[Todo]:
+        return self.get_page(status=status, sort=sort, include_archived=include_archived)
+
+    def get_page(
+        self,
+        limit: Optional[int] = None,
+        after: Optional[Tuple[Any, int]] = None,
+        status: Optional[str] = None,
+        sort: str = "created_at",
+        include_archived: bool = False,
+    ) -> List[Todo]:
+        return list(self.db.scalars(list_statement(status, sort, after, limit, include_archived)))
+
+    def search(
+        self, text: str, limit: Optional[int] = None, after: Optional[Tuple[float, int]] = None
+    ) -> List[Tuple[Todo, float]]:
+        """Full-text search over title and description; see ``search_statement``."""
+        if not fts5_query(text):
+            # Nothing to match, and FTS5 rejects an empty query.
+            return []
+        stmt = search_statement(self.dialect, text, after, limit)
+        return [tuple(row) for row in self.db.execute(stmt)]
+
+    def iter_batches(
+        self, batch_size: int, status: Optional[str] = None, sort: str = "created_at"
+    ) -> Iterator[List[Todo]]:
+        """Stream every matching todo in batches of ``batch_size``.
+
+        ``yield_per`` turns on server-side cursors (psycopg2 named cursors), so
+        only one batch is held in memory however large the table is.
+        """
+        stmt = list_statement(status, sort).execution_options(yield_per=batch_size)
+        yield from self.db.scalars(stmt).partitions()
 
     def update(self, todo_id: int, todo: TodoUpdate) -> Optional[Todo]:
-        db_todo = self.get_by_id(todo_id)
-        if db_todo:
-            for key, value in todo.model_dump(exclude_unset=True).items():
-                setattr(db_todo, key, value)
-            self.db.commit()
-            self.db.refresh(db_todo)
+        """Apply a partial update, moving the todo back first if it was archived; returns None if it is missing."""
+        values = todo.model_dump(exclude_unset=True)
+        if not values:
+            # Nothing to write: unless it has to be restored, no version is taken.
+            self.last_version = None
+            return self.get_by_id(todo_id) or self._restore(todo_id, stamp({}, self._next_version()))
+        values = stamp(values, self._next_version())
+        if self.returning:
+            moved = self.counts and ("due_date" in values or "is_completed" in values)
+            removed = self._count_keys(todo_id) if moved else []
+            db_todo = self._update_returning(todo_id, values)
+            if db_todo is None:
+                return self._restore(todo_id, values)
+            if moved:
+                self._count(removed, [(db_todo.due_date, db_todo.is_completed)])
+            self._commit()
+            return db_todo
+        db_todo = self._get_for_update(todo_id)
+        if db_todo is None:
+            return self._restore(todo_id, values)
+        removed = [(db_todo.due_date, db_todo.is_completed)]
+        for key, value in values.items():
+            setattr(db_todo, key, value)
+        self._count(removed, [(db_todo.due_date, db_todo.is_completed)])
+        self._commit()
+        self.db.refresh(db_todo)
         return db_todo
 
+    def update_many(self, updates: Dict[int, Dict[str, Any]]) -> Dict[int, Todo]:
+        """Apply per-id partial updates in one transaction; returns the updated todos by id.
+
+        Archived todos are moved back first. Ids that do not exist are left
+        out of the result.
+        """
+        version = self._next_version()
+        existing = {
+            todo_id: (due_date, is_completed)
+            for todo_id, due_date, is_completed in self.db.execute(
+                select(Todo.id, Todo.due_date, Todo.is_completed)
+                .where(Todo.id.in_(updates))
+                .order_by(Todo.id)
+                .with_for_update()
+            )
+        }
+        restored = self._unarchive(set(updates) - set(existing), stamp({}, version))
+        if not existing and not restored:
+            self._discard()
+            return {}
+        rows = [
+            {"id": todo_id, **stamp(values, version)}
+            for todo_id, values in sorted(updates.items())
+            if (todo_id in existing or todo_id in restored) and values
+        ]
+        if rows:
+            # ORM bulk UPDATE by primary key: one executemany per distinct set of updated columns.
+            self.db.execute(update(Todo), rows)
+        updated = self.get_many([*existing, *restored])
+        self._count(existing.values(), [(todo.due_date, todo.is_completed) for todo in updated.values()])
+        self._commit()
+        return updated
+
+    def delete_many(self, todo_ids: Iterable[int]) -> Set[int]:
+        """Delete the given ids in one statement; returns the ids that existed."""
+        todo_ids = set(todo_ids)
+        version = self._next_version()
+        columns = (Todo.id, Todo.due_date, Todo.is_completed)
+        if self.returning:
+            rows = self.db.execute(delete(Todo).where(Todo.id.in_(todo_ids)).returning(*columns)).all()
+        else:
+            rows = self.db.execute(
+                select(*columns).where(Todo.id.in_(todo_ids)).order_by(Todo.id).with_for_update()
+            ).all()
+            self.db.execute(delete(Todo).where(Todo.id.in_([row.id for row in rows])))
+        deleted = {row.id for row in rows}
+        self._count([(row.due_date, row.is_completed) for row in rows], [])
+        deleted |= self._delete_archived(todo_ids - deleted)
+        if not deleted:
+            self._discard()
+            return deleted
+        self.db.execute(insert(TodoTombstone), tombstone_rows(deleted, version))
+        self._commit()
+        return deleted
+
     def delete(self, todo_id: int) -> bool:
-        db_todo = self.get_by_id(todo_id)
-        if db_todo:
-            self.db.delete(db_todo)
-            self.db.commit()
-            return True
-        return False
+        version = self._next_version()
+        if self.returning:
+            result = self.db.execute(
+                delete(Todo).where(Todo.id == todo_id).returning(Todo.due_date, Todo.is_completed)
+            )
+            removed = [tuple(row) for row in result]
+        else:
+            db_todo = self._get_for_update(todo_id)
+            removed = [(db_todo.due_date, db_todo.is_completed)] if db_todo is not None else []
+            if db_todo is not None:
+                self.db.delete(db_todo)
+        self._count(removed, [])
+        if not removed and not self._delete_archived([todo_id]):
+            self._discard()
+            return False
+        self.db.execute(insert(TodoTombstone), tombstone_rows([todo_id], version))
+        self._commit()
+        return True
+
+    def delete_all(self) -> int:
+        version = self._next_version()
+        result = self.db.execute(delete(Todo))
+        archived = self.db.execute(delete(ArchivedTodo))
+        # One reset marker instead of a tombstone per row.
+        self.db.execute(insert(TodoTombstone), tombstone_rows([None], version))
+        if self.counts:
+            self.db.execute(delete(TodoCount))
+        self._commit()
+        return result.rowcount + archived.rowcount
 
     def complete(self, todo_id: int) -> Optional[Todo]:
-        db_todo = self.get_by_id(todo_id)
-        if db_todo:
-            db_todo.is_completed = True
-            self.db.commit()
+        """Mark an open todo as completed; returns None if it is missing or already completed."""
+        return self._set_completed(todo_id, True)
+
+    def incomplete(self, todo_id: int) -> Optional[Todo]:
+        """Reopen a completed todo, moving it back if it was archived; returns None if it is missing or already incomplete."""
+        return self._set_completed(todo_id, False) or self._restore(
+            todo_id, stamp({"is_completed": False}, self._next_version())
+        )
+
+    def archive(self, cutoff: datetime, limit: int) -> List[int]:
+        """Move up to ``limit`` todos completed before ``cutoff`` to todos_archive; returns their ids.
+
+        To change-feed clients archiving is a deletion: each archived todo
+        gets a tombstone, and reopening it later sends it again. The batch is
+        locked as it is read, skipping todos another archiver or a writer
+        holds, so concurrent runs never move a todo twice.
+        """
+        version = self._next_version()
+        rows = self.db.execute(archivable_statement(cutoff, limit)).all()
+        if not rows:
+            self._discard()
+            return []
+        todo_ids = [row.id for row in rows]
+        self.db.execute(archive_statement(todo_ids))
+        self.db.execute(delete(Todo).where(Todo.id.in_(todo_ids)))
+        self.db.execute(insert(TodoTombstone), tombstone_rows(todo_ids, version))
+        self._count([(row.due_date, True) for row in rows], [])
+        self._commit()
+        return todo_ids
+
+    def prune_changes(self, cutoff: datetime) -> int:
+        """Drop the tombstones and todo_changes rows written before ``cutoff``; returns how many tombstones went.
+
+        The pruned tombstones are replaced by one reset marker at the newest
+        of their versions, so a client whose cursor is older than that gets
+        ``reset`` instead of missing the deletions. The last todo_changes row
+        always stays: SQLite reads its watermark from it.
+        """
+        pruned = self.db.scalar(
+            select(func.max(TodoTombstone.version)).where(
+                TodoTombstone.deleted_at < cutoff, TodoTombstone.todo_id.is_not(None)
+            )
+        )
+        removed = 0
+        if pruned is not None:
+            removed = self.db.execute(delete(TodoTombstone).where(TodoTombstone.version <= pruned)).rowcount
+            self.db.execute(insert(TodoTombstone), tombstone_rows([None], pruned))
+        last = select(func.max(TodoChange.version)).scalar_subquery()
+        self.db.execute(delete(TodoChange).where(TodoChange.changed_at < cutoff, TodoChange.version < last))
+        self._commit()
+        return removed
+
+    def _restore(self, todo_id: int, values: Dict[str, Any]) -> Optional[Todo]:
+        """Move an archived todo back into todos with the stamped ``values``; returns None if it is not archived."""
+        if not self._lock_archived([todo_id]):
+            self._discard()
+            return None
+        self.db.execute(restore_statement([todo_id], values))
+        self.db.execute(delete(ArchivedTodo).where(ArchivedTodo.id == todo_id))
+        db_todo = self.get_many([todo_id])[todo_id]
+        self._count([], [(db_todo.due_date, db_todo.is_completed)])
+        self._commit()
+        return db_todo
+
+    def _unarchive(self, todo_ids: Iterable[int], values: Dict[str, Any]) -> Set[int]:
+        """Move those of ``todo_ids`` that are archived back into todos with ``values``; the caller commits."""
+        archived = self._lock_archived(todo_ids)
+        if archived:
+            self.db.execute(restore_statement(archived, values))
+            self.db.execute(delete(ArchivedTodo).where(ArchivedTodo.id.in_(archived)))
+        return archived
+
+    def _delete_archived(self, todo_ids: Iterable[int]) -> Set[int]:
+        archived = self._lock_archived(todo_ids)
+        if archived:
+            self.db.execute(delete(ArchivedTodo).where(ArchivedTodo.id.in_(archived)))
+        return archived
+
+    def _lock_archived(self, todo_ids: Iterable[int]) -> Set[int]:
+        """Those of ``todo_ids`` that are archived, locked until this transaction ends."""
+        todo_ids = set(todo_ids)
+        if not todo_ids:
+            return set()
+        stmt = select(ArchivedTodo.id).where(ArchivedTodo.id.in_(todo_ids)).order_by(ArchivedTodo.id).with_for_update()
+        return set(self.db.scalars(stmt))
+
+    def _get_for_update(self, todo_id: int) -> Optional[Todo]:
+        """The todo, locked until this transaction ends, for the read-modify-write path."""
+        stmt = select(Todo).where(Todo.id == todo_id).with_for_update().execution_options(populate_existing=True)
+        return self.db.scalars(stmt).one_or_none()
+
+    def _set_completed(self, todo_id: int, completed: bool) -> Optional[Todo]:
+        values = stamp({"is_completed": completed}, self._next_version())
+        if self.returning:
+            db_todo = self._update_returning(todo_id, values, Todo.is_completed == (not completed))
+            if db_todo is None:
+                self._discard()
+                return None
+        else:
+            db_todo = self._get_for_update(todo_id)
+            if db_todo is None or db_todo.is_completed == completed:
+                self._discard()
+                return None
+            for key, value in values.items():
+                setattr(db_todo, key, value)
+        self._count([(db_todo.due_date, not completed)], [(db_todo.due_date, completed)])
+        self._commit()
+        if not self.returning:
             self.db.refresh(db_todo)
         return db_todo
 
-    def incomplete(self, todo_id: int) -> Optional[Todo]:
-        db_todo = self.get_by_id(todo_id)
-        if db_todo:
-            db_todo.is_completed = False
+    def _update_returning(self, todo_id: int, values: Dict[str, Any], *criteria) -> Optional[Todo]:
+        """Run the UPDATE ... RETURNING; the caller commits."""
+        return self.db.scalars(update_statement(todo_id, values, *criteria)).one_or_none()
+
+    def current_version(self) -> int:
+        """The committed watermark: every change version up to it has committed or rolled back.
+
+        On SQLite it is the last version taken, since one writer at a time
+        holds the write lock from taking its version until it commits. On
+        PostgreSQL writers run concurrently, so it is the sequence's last
+        value capped below the lowest version still in flight. That takes
+        the primary's locks, and READ COMMITTED, so that each later read sees
+        every version up to it.
+        """
+        if self.dialect != "postgresql":
+            return self.db.scalar(committed_version_statement())
+        # Read before the locks: a version taken after this is above the result anyway.
+        taken = self.db.scalar(taken_version_statement())
+        for _ in range(WATERMARK_ATTEMPTS):
+            in_flight, taking = self.db.execute(IN_FLIGHT_STATEMENT).one()
+            if not taking:
+                return taken if in_flight is None else min(taken, in_flight - 1)
+            # Its version is unknown until it is locked, within the same statement.
+            time.sleep(0.001)
+        raise RuntimeError("Could not find the committed change version: writers kept taking versions")
+
+    def logged_versions(self, after: int, upto: int) -> List[int]:
+        """The committed change versions in ``(after, upto]``; rolled-back writes leave gaps."""
+        return list(self.db.scalars(logged_versions_statement(after, upto)))
+
+    def get_stats(self, today: date, include_archived: bool = False) -> Dict[str, int]:
+        """The TodoStats counts other than ``incomplete``, from TodoCount when counts are kept."""
+        stmt = counted_stats_statement(today) if self.counts else stats_statement(today)
+        stats = stats_from_row(self.db.execute(stmt).one())
+        if include_archived:
+            # Archived todos are all completed, so they only add to these two.
+            archived = self.db.scalar(archived_count_statement())
+            stats["total"] += archived
+            stats["completed"] += archived
+        return stats
+
+    def rebuild_counts(self) -> None:
+        """Recompute TodoCount from todos, e.g. after writes made with ``counts`` off."""
+        # Writers wait until the new counts are committed. On SQLite the
+        # DELETE takes the write lock before todos is read.
+        if self.dialect == "postgresql":
+            self.db.execute(text("LOCK TABLE todos IN SHARE MODE"))
+        self.db.execute(delete(TodoCount))
+        rows = [
+            {"due_date": due_date or NO_DUE_DATE, "is_completed": is_completed, "todos": todos}
+            for due_date, is_completed, todos in self.db.execute(recount_statement())
+        ]
+        if rows:
+            self.db.execute(insert(TodoCount), rows)
+        self._commit()
+
+    def get_changes(self, since: Optional[int]) -> ChangeSet:
+        """Everything written after version ``since`` (``None`` for a full sync)."""
+        # Read the watermark first: versions up to it are all committed, so
+        # bounding both queries by it neither misses nor half-reports a write.
+        upto = self.current_version()
+        tombstones = [tuple(row) for row in self.db.execute(tombstones_statement(since, upto))]
+        reset = needs_reset(since, tombstones)
+        upserts = list(self.db.scalars(changed_todos_statement(None if reset else since, upto)))
+        return change_set(upto, tombstones, upserts, reset)
+
+    def _next_version(self) -> int:
+        """Take the next change version by logging this write in todo_changes.
+
+        Only the new row is written, so concurrent writers do not wait for
+        each other; on SQLite it takes the write lock the write needs anyway.
+        A write that turns out to change nothing rolls it back with ``_discard``.
+        """
+        result = self.db.execute(next_version_statement(self.dialect))
+        self.last_version = result.scalar() if self.dialect == "postgresql" else result.inserted_primary_key[0]
+        return self.last_version
+
+    def _count_keys(self, todo_id: int) -> List[CountKey]:
+        stmt = select(Todo.due_date, Todo.is_completed).where(Todo.id == todo_id).with_for_update()
+        return [tuple(row) for row in self.db.execute(stmt)]
+
+    def _count(self, removed: Iterable[CountKey], added: Iterable[CountKey]) -> None:
+        """Apply TodoCount deltas in the current transaction; a no-op unless counts are kept."""
+        if not self.counts:
+            return
+        rows = count_rows(removed, added)
+        if rows:
+            self.db.execute(upsert_counts_statement(self.dialect), rows)
+
+    def begin(self) -> None:
+        """Open the transaction now, so savepoints nest inside it.
+
+        pysqlite would only begin a transaction at the first write, after
+        the first savepoint; on SQLite this takes the write lock up front,
+        as that first write would.
+        """
+        if self.dialect == "sqlite":
+            self.db.execute(text("BEGIN IMMEDIATE"))
+        else:
+            self.db.connection()
+
+    def _commit(self) -> None:
+        if self.autocommit:
             self.db.commit()
-            self.db.refresh(db_todo)
-        return db_todo 
\ No newline at end of file
+        else:
+            self.db.flush()
+
+    def _rollback(self) -> None:
+        if self.autocommit:
+            self.db.rollback()
+
+    def _discard(self) -> None:
+        """End a write that changed nothing: release its version instead of committing it."""
+        self.last_version = None
+        self._rollback()
@@ -0,0 +1,98 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Iterator, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Statements kept per request for the slow-request log; counting and timing
+# continue past the limit.
+MAX_RECORDED_STATEMENTS = 100
+
+class RequestTiming:
+    """Where one request spent its time.
+
+    Filled in by the engine events registered with ``listen``, the pool
+    checkout timer in ``app.pool_metrics`` and ``TimedRoute``; the timing
+    middleware activates one per request and reports it.
+    """
+
+    __slots__ = (
+        "start", "queries", "db_seconds", "pool_wait_seconds",
+        "handler_seconds", "handler_end", "serialization_seconds", "statements",
+    )
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.pool_wait_seconds = 0.0
+        self.handler_seconds = 0.0
+        self.handler_end: Optional[float] = None
+        self.serialization_seconds = 0.0
+        self.statements: List[Tuple[str, float]] = []
+
+    def record_query(self, statement: str, seconds: float) -> None:
+        self.queries += 1
+        self.db_seconds += seconds
+        if len(self.statements) < MAX_RECORDED_STATEMENTS:
+            self.statements.append((statement, seconds))
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+    def server_timing(self) -> str:
+        """Value for the Server-Timing response header, durations in milliseconds."""
+        return ", ".join((
+            f'db;dur={self.db_seconds * 1000:.2f};desc="{self.queries} queries"',
+            f"pool;dur={self.pool_wait_seconds * 1000:.2f}",
+            f"handler;dur={self.handler_seconds * 1000:.2f}",
+            f"serialize;dur={self.serialization_seconds * 1000:.2f}",
+            f"total;dur={self.elapsed() * 1000:.2f}",
+        ))
+
+_current: ContextVar[Optional[RequestTiming]] = ContextVar("request_timing", default=None)
+
+def activate(timing: RequestTiming) -> Token:
+    return _current.set(timing)
+
+def deactivate(token: Token) -> None:
+    _current.reset(token)
+
+def current() -> Optional[RequestTiming]:
+    return _current.get()
+
+@contextmanager
+def request_scope() -> Iterator[RequestTiming]:
+    """Activate a RequestTiming for this request, or join the one an outer middleware started."""
+    timing = _current.get()
+    if timing is not None:
+        yield timing
+        return
+    timing = RequestTiming()
+    token = activate(timing)
+    try:
+        yield timing
+    finally:
+        deactivate(token)
+
+def record_pool_wait(seconds: float) -> None:
+    timing = _current.get()
+    if timing is not None:
+        timing.pool_wait_seconds += seconds
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    if _current.get() is not None:
+        conn.info.setdefault("request_timing_start", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    timing = _current.get()
+    starts = conn.info.get("request_timing_start")
+    if timing is not None and starts:
+        timing.record_query(statement, time.perf_counter() - starts.pop())
+
+def listen(engine: Engine) -> None:
+    """Attribute every statement run on ``engine`` to the current request, if any."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
@@ -0,0 +1,66 @@
+from contextvars import ContextVar
+from datetime import date, datetime
+from typing import Any, Iterable, List
+
+import msgpack
+import orjson
+from fastapi.responses import ORJSONResponse
+
+from app import schemas
+
+TODO_FIELDS = tuple(schemas.Todo.model_fields)
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+
+# Set for each request by MessagePackMiddleware from its Accept header.
+msgpack_requested: ContextVar[bool] = ContextVar("msgpack_requested", default=False)
+
+def todo_rows(todos: Iterable[Any]) -> List[dict]:
+    """Plain dicts of the output fields read straight off ORM objects, without validation."""
+    return [{field: getattr(todo, field) for field in TODO_FIELDS} for todo in todos]
+
+def _msgpack_default(value: Any) -> Any:
+    # The same ISO 8601 strings the JSON responses carry.
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__} to MessagePack")
+
+def render_msgpack(content: Any) -> bytes:
+    return msgpack.packb(content, default=_msgpack_default)
+
+class NegotiatedResponse(ORJSONResponse):
+    """ORJSONResponse that renders MessagePack instead when the client asked for it.
+
+    The app's default response class; see app/middleware/content_negotiation.py.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if msgpack_requested.get():
+            # Response.__init__ sets the Content-Type header after rendering.
+            self.media_type = MSGPACK_MEDIA_TYPE
+            return render_msgpack(content)
+        return super().render(content)
+
+class TodoListResponse(NegotiatedResponse):
+    """Renders a list of todos with orjson, or MessagePack.
+
+    Returning this from a route bypasses response_model validation, which
+    dominates the cost of large list responses; the route's response_model is
+    still used for the OpenAPI schema.
+    """
+
+    def render(self, content: Iterable[Any]) -> bytes:
+        rows = todo_rows(content)
+        if msgpack_requested.get():
+            self.media_type = MSGPACK_MEDIA_TYPE
+            return render_msgpack(rows)
+        return orjson.dumps(rows)
+
+def todo_changes_response(changes: Any, cursor: str) -> NegotiatedResponse:
+    """Body of GET /todos/changes (schemas.TodoChanges), upserts serialized like list responses."""
+    return NegotiatedResponse({
+        "upserts": todo_rows(changes.upserts),
+        "deleted": changes.deleted,
+        "reset": changes.reset,
+        "cursor": cursor,
+    })
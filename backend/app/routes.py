@@ -1,32 +1,240 @@
-from fastapi import APIRouter, Depends, Response, status, HTTPException
-from typing import List
+from fastapi import APIRouter, Body, Depends, Header, Query, Response, status, HTTPException
+from fastapi.responses import StreamingResponse
+from contextlib import nullcontext
+from typing import Annotated, Any, Dict, List, Optional, Set
 from sqlalchemy.orm import Session
 from pydantic import ValidationError
 
-from app import schemas
-from app.database import get_db
+from app import cache, config, events, schemas
+from app.admission import AdmittedRoute
+from app.database import SessionLocal, get_db, get_read_db
+from app.export import EXPORT_BATCH_SIZE, EXPORT_FORMATTERS, EXPORT_MEDIA_TYPES
+from app.models import Todo
+from app.pagination import MAX_PAGE_SIZE, DEFAULT_PAGE_SIZE
+from app.responses import TodoListResponse, todo_changes_response
 from app.services.todo_service import TodoService
 from app.repositories.todo_repository import TodoRepository
+from app.write_coalescer import WriteCoalescer
 
-router = APIRouter()
+router = APIRouter(route_class=AdmittedRoute)
 
 def get_todo_service(db: Session = Depends(get_db)) -> TodoService:
-    repository = TodoRepository(db)
-    return TodoService(repository)
+    repository = TodoRepository(db, counts=config.STATS_COUNTERS_ENABLED)
+    return TodoService(repository, cache.todo_cache, events.todo_events)
+
+def get_read_todo_service(db: Session = Depends(get_read_db)) -> TodoService:
+    """TodoService for read-only routes, which may be reading from a replica."""
+    repository = TodoRepository(db, counts=config.STATS_COUNTERS_ENABLED)
+    return TodoService(repository, cache.todo_cache, events.todo_events)
+
+# Single-todo writes share transactions through this; None when WRITE_COALESCE_ENABLED is off.
+write_coalescer: Optional[WriteCoalescer] = (
+    WriteCoalescer(
+        SessionLocal,
+        get_todo_service,
+        config.WRITE_COALESCE_WINDOW_MS / 1000,
+        config.WRITE_COALESCE_MAX_BATCH,
+        config.WRITE_COALESCE_TIMEOUT_SECONDS,
+    )
+    if config.WRITE_COALESCE_ENABLED
+    else None
+)
+
+def get_single_write_service(service: TodoService = Depends(get_todo_service)):
+    """The service for single-todo writes: the write coalescer when it is enabled."""
+    return service if write_coalescer is None else write_coalescer
+
+def _not_found_result(todo_id: int) -> schemas.TodoBulkResult:
+    return schemas.TodoBulkResult(
+        id=todo_id, status=status.HTTP_404_NOT_FOUND, detail=f"Todo with id {todo_id} not found"
+    )
+
+def bulk_create_results(created: List[Todo]) -> List[schemas.TodoBulkResult]:
+    return [schemas.TodoBulkResult(id=todo.id, status=status.HTTP_200_OK, todo=todo) for todo in created]
+
+def bulk_update_results(
+    updates: List[schemas.TodoBulkUpdate], updated: Dict[int, Todo]
+) -> List[schemas.TodoBulkResult]:
+    return [
+        schemas.TodoBulkResult(id=item.id, status=status.HTTP_200_OK, todo=updated[item.id])
+        if item.id in updated
+        else _not_found_result(item.id)
+        for item in updates
+    ]
+
+def bulk_delete_results(todo_ids: List[int], deleted: Set[int]) -> List[schemas.TodoBulkResult]:
+    return [
+        schemas.TodoBulkResult(id=todo_id, status=status.HTTP_204_NO_CONTENT)
+        if todo_id in deleted
+        else _not_found_result(todo_id)
+        for todo_id in todo_ids
+    ]
+
+# Error statuses for each batch operation, as its single-todo endpoint maps
+# them; ValidationError is a ValueError, so it has to come first.
+BATCH_ERRORS = {
+    "create": ((ValidationError, status.HTTP_422_UNPROCESSABLE_ENTITY), (ValueError, status.HTTP_400_BAD_REQUEST)),
+    "update": ((ValidationError, status.HTTP_422_UNPROCESSABLE_ENTITY), (ValueError, status.HTTP_404_NOT_FOUND)),
+    "complete": ((ValueError, status.HTTP_404_NOT_FOUND),),
+    "incomplete": ((ValueError, status.HTTP_404_NOT_FOUND),),
+    "delete": ((ValueError, status.HTTP_404_NOT_FOUND),),
+}
+
+class BatchAborted(Exception):
+    """Raised inside an atomic batch to roll it back after an operation failed."""
+
+def batch_call(service: Any, operation: schemas.BatchOperation) -> Any:
+    """Run one batch operation through the service; async services return an awaitable."""
+    if operation.op == "create":
+        return service.create_todo(operation.todo)
+    if operation.op == "update":
+        return service.update_todo(operation.id, operation.todo)
+    return getattr(service, f"{operation.op}_todo")(operation.id)
+
+def batch_result(operation: schemas.BatchOperation, result: Any) -> schemas.TodoBulkResult:
+    # Built straight away: the todo must be read before a later savepoint rollback expires it.
+    if operation.op == "delete":
+        return schemas.TodoBulkResult(id=operation.id, status=status.HTTP_204_NO_CONTENT)
+    return schemas.TodoBulkResult(id=result.id, status=status.HTTP_200_OK, todo=result)
+
+def batch_error(operation: schemas.BatchOperation, error: Exception) -> Optional[schemas.TodoBulkResult]:
+    """The result for a failed operation, or None when the error is not one its endpoint maps."""
+    for kind, status_code in BATCH_ERRORS[operation.op]:
+        if isinstance(error, kind):
+            return schemas.TodoBulkResult(id=getattr(operation, "id", None), status=status_code, detail=str(error))
+    return None
+
+def batch_aborted_response(
+    operations: List[schemas.BatchOperation], results: List[schemas.TodoBulkResult]
+) -> schemas.BatchResponse:
+    """Every operation of a rolled back atomic batch fails: the last result is the cause, the rest get 424."""
+    failed = len(results) - 1
+    detail = f"Not applied: operation {failed} failed"
+    skipped = [
+        schemas.TodoBulkResult(id=getattr(operation, "id", None), status=status.HTTP_424_FAILED_DEPENDENCY, detail=detail)
+        for operation in operations
+    ]
+    return schemas.BatchResponse(committed=False, results=skipped[:failed] + results[failed:] + skipped[failed + 1:])
 
 @router.get("/todos", response_model=List[schemas.Todo])
-def list_todos(service: TodoService = Depends(get_todo_service)):
-    return service.get_all_todos()
+def list_todos(
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    status: Optional[schemas.TodoStatusFilter] = None,
+    sort: schemas.TodoSort = "created_at",
+    include_archived: bool = False,
+    service: TodoService = Depends(get_read_todo_service),
+):
+    if limit is None and cursor is None:
+        return TodoListResponse(service.get_all_todos(status, sort, include_archived))
+    try:
+        todos, next_cursor = service.get_todo_page(
+            limit or DEFAULT_PAGE_SIZE, cursor, status, sort, include_archived
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    return TodoListResponse(todos, headers=headers)
+
+@router.get("/todos/export")
+def export_todos(
+    format: schemas.ExportFormat = "ndjson",
+    status: Optional[schemas.TodoStatusFilter] = None,
+    sort: schemas.TodoSort = "created_at",
+    service: TodoService = Depends(get_read_todo_service),
+):
+    batches = service.export_todos(EXPORT_BATCH_SIZE, status, sort)
+    return StreamingResponse(
+        EXPORT_FORMATTERS[format](batches),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="todos.{format}"'},
+    )
+
+@router.get("/todos/search", response_model=List[schemas.Todo])
+def search_todos(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    service: TodoService = Depends(get_read_todo_service),
+):
+    try:
+        todos, next_cursor = service.search_todos(q, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+    return TodoListResponse(todos, headers=headers)
+
+@router.get("/todos/stats", response_model=schemas.TodoStats)
+def get_stats(include_archived: bool = False, service: TodoService = Depends(get_read_todo_service)):
+    return service.get_stats(include_archived=include_archived)
+
+# Always the primary: the committed watermark needs its view of the writes in flight.
+@router.get("/todos/changes", response_model=schemas.TodoChanges)
+def get_changes(since: Optional[str] = None, service: TodoService = Depends(get_todo_service)):
+    try:
+        changes, cursor = service.get_changes(since)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return todo_changes_response(changes, cursor)
+
+@router.get("/todos/stream")
+async def stream_todos(last_event_id: Annotated[Optional[int], Header()] = None):
+    broadcaster = events.todo_events
+    if broadcaster is None:
+        raise HTTPException(status_code=404, detail="Event stream is disabled")
+    if broadcaster.full():
+        raise HTTPException(status_code=503, detail="Too many event stream subscribers")
+    return StreamingResponse(
+        broadcaster.stream(last_event_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.post("/todos/bulk", response_model=List[schemas.TodoBulkResult])
+def create_todos(todos: schemas.TodoBulkCreateRequest, service: TodoService = Depends(get_todo_service)):
+    try:
+        created = service.create_todos(todos)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return bulk_create_results(created)
+
+@router.patch("/todos/bulk", response_model=List[schemas.TodoBulkResult])
+def update_todos(updates: schemas.TodoBulkUpdateRequest, service: TodoService = Depends(get_todo_service)):
+    return bulk_update_results(updates, service.update_todos(updates))
+
+@router.delete("/todos/bulk", response_model=List[schemas.TodoBulkResult])
+def delete_todos(todo_ids: Annotated[schemas.TodoBulkDeleteRequest, Body()], service: TodoService = Depends(get_todo_service)):
+    return bulk_delete_results(todo_ids, service.delete_todos(todo_ids))
+
+@router.post("/batch", response_model=schemas.BatchResponse)
+def run_batch(batch: schemas.BatchRequest, service: TodoService = Depends(get_todo_service)):
+    results: List[schemas.TodoBulkResult] = []
+    try:
+        with service.transaction():
+            for operation in batch.operations:
+                try:
+                    with nullcontext() if batch.atomic else service.savepoint():
+                        results.append(batch_result(operation, batch_call(service, operation)))
+                except Exception as e:
+                    error = batch_error(operation, e)
+                    if error is None:
+                        raise
+                    results.append(error)
+                    if batch.atomic:
+                        raise BatchAborted from e
+    except BatchAborted:
+        return batch_aborted_response(batch.operations, results)
+    return schemas.BatchResponse(committed=True, results=results)
 
 @router.get("/todos/{todo_id}", response_model=schemas.Todo)
-def get_todo(todo_id: int, service: TodoService = Depends(get_todo_service)):
+def get_todo(todo_id: int, service: TodoService = Depends(get_read_todo_service)):
     try:
         return service.get_todo(todo_id)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
 @router.post("/todos", response_model=schemas.Todo)
-def create_todo(todo: schemas.TodoCreate, service: TodoService = Depends(get_todo_service)):
+def create_todo(todo: schemas.TodoCreate, service: TodoService = Depends(get_single_write_service)):
     try:
         return service.create_todo(todo)
     except ValidationError as e:
@@ -35,7 +243,7 @@ def create_todo(todo: schemas.TodoCreate, service: TodoService = Depends(get_tod
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.put("/todos/{todo_id}", response_model=schemas.Todo)
-def update_todo(todo_id: int, todo: schemas.TodoUpdate, service: TodoService = Depends(get_todo_service)):
+def update_todo(todo_id: int, todo: schemas.TodoUpdate, service: TodoService = Depends(get_single_write_service)):
     try:
         return service.update_todo(todo_id, todo)
     except ValidationError as e:
@@ -58,14 +266,14 @@ def delete_all_todos(service: TodoService = Depends(get_todo_service)):
     return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 @router.patch("/todos/{todo_id}/complete", response_model=schemas.Todo)
-def complete_todo(todo_id: int, service: TodoService = Depends(get_todo_service)):
+def complete_todo(todo_id: int, service: TodoService = Depends(get_single_write_service)):
     try:
         return service.complete_todo(todo_id)
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
 
 @router.patch("/todos/{todo_id}/incomplete", response_model=schemas.Todo)
-def incomplete_todo(todo_id: int, service: TodoService = Depends(get_todo_service)):
+def incomplete_todo(todo_id: int, service: TodoService = Depends(get_single_write_service)):
     try:
         return service.incomplete_todo(todo_id)
     except ValueError as e:
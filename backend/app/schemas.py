@@ -1,5 +1,6 @@
-from pydantic import BaseModel, ConfigDict, field_validator
-from typing import Optional
+from pydantic import BaseModel, ConfigDict, Field, conlist, field_validator
+from typing import List, Literal, Optional, Union
+from typing_extensions import Annotated
 from datetime import datetime, date
 
 def validate_due_date(v):
@@ -12,6 +13,12 @@ def validate_title(v):
         raise ValueError("Title cannot be empty")
     return v.strip()
 
+TodoStatusFilter = Literal["completed", "incomplete", "overdue"]
+TodoSort = Literal["due_date", "created_at", "title"]
+ExportFormat = Literal["ndjson", "csv"]
+
+BULK_MAX_ITEMS = 1000
+
 class TodoBase(BaseModel):
     title: str
     description: Optional[str] = None
@@ -28,8 +35,79 @@ class TodoUpdate(TodoBase):
     is_completed: Optional[bool] = None
     model_config = ConfigDict(from_attributes=True)
 
-class Todo(TodoBase):
+class Todo(BaseModel):
+    """Read-only output schema.
+
+    Deliberately not derived from TodoBase: stored rows are already
+    validated, so the input validators are not re-run on every response.
+    """
+    title: str
+    description: Optional[str] = None
+    due_date: Optional[date] = None
     id: int
     is_completed: bool
     created_at: datetime
     model_config = ConfigDict(from_attributes=True)
+
+class TodoBulkUpdate(TodoUpdate):
+    id: int
+
+TodoBulkCreateRequest = conlist(TodoCreate, min_length=1, max_length=BULK_MAX_ITEMS)
+TodoBulkUpdateRequest = conlist(TodoBulkUpdate, min_length=1, max_length=BULK_MAX_ITEMS)
+TodoBulkDeleteRequest = conlist(int, min_length=1, max_length=BULK_MAX_ITEMS)
+
+class TodoBulkResult(BaseModel):
+    id: Optional[int] = None
+    status: int
+    todo: Optional[Todo] = None
+    detail: Optional[str] = None
+
+class BatchCreate(BaseModel):
+    op: Literal["create"]
+    todo: TodoCreate
+
+class BatchUpdate(BaseModel):
+    op: Literal["update"]
+    id: int
+    todo: TodoUpdate
+
+class BatchTodoAction(BaseModel):
+    op: Literal["complete", "incomplete", "delete"]
+    id: int
+
+BatchOperation = Annotated[Union[BatchCreate, BatchUpdate, BatchTodoAction], Field(discriminator="op")]
+
+class BatchRequest(BaseModel):
+    """Operations run in order in one transaction.
+
+    With ``atomic`` (the default) the first failure rolls back every
+    operation; otherwise only the failed operations are undone.
+    """
+    operations: conlist(BatchOperation, min_length=1, max_length=BULK_MAX_ITEMS)
+    atomic: bool = True
+
+class BatchResponse(BaseModel):
+    committed: bool
+    results: List[TodoBulkResult]
+
+class TodoChanges(BaseModel):
+    """Changes since a sync cursor.
+
+    Clients apply them in order: drop every local todo if ``reset``, remove
+    ``deleted``, then insert or replace ``upserts``; pass ``cursor`` as
+    ``since`` next time.
+    """
+    upserts: List[Todo]
+    deleted: List[int]
+    reset: bool
+    cursor: str
+
+class TodoStats(BaseModel):
+    """Todo counts. The due-date buckets only count incomplete todos;
+    ``due_this_week`` covers today and the six days after it."""
+    total: int
+    completed: int
+    incomplete: int
+    overdue: int
+    due_today: int
+    due_this_week: int
@@ -0,0 +1,215 @@
+"""Production server: python -m app.serve [--workers N] [--no-preload] ...
+
+A supervisor process binds the listening socket and forks uvicorn workers
+that all accept from it. With preload (the default) the supervisor imports
+the app once before forking, so each worker starts without importing it
+again and shares the imported code's memory. This is safe because importing
+app.main opens no database connection; each worker warms its own pool in
+its lifespan.
+
+With DB_CREATE_SCHEMA or STATS_COUNTERS_ENABLED the supervisor prepares
+the database itself before forking, once, instead of every worker racing
+to do it.
+
+The supervisor replaces workers that exit, whether they were recycled after
+--max-requests or crashed. A worker that dies within BOOT_SECONDS of
+starting is treated as a bad deploy, and everything shuts down rather than
+respawning in a loop. On SIGTERM or SIGINT every worker drains: it stops
+accepting connections and finishes the requests in flight for up to
+--graceful-timeout seconds. uvicorn uses uvloop and httptools when they
+are installed.
+
+Linux and macOS only: workers are started with fork().
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import random
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Tuple
+
+import uvicorn
+from uvicorn.main import STARTUP_FAILURE
+
+from app import config
+from app.logging_config import configure_logging
+
+logger = logging.getLogger("app.serve")
+
+# A worker that exits sooner than this after starting failed to boot.
+BOOT_SECONDS = 5.0
+
+def _run_worker(target: Any, sock: socket.socket, options: Dict[str, Any]) -> None:
+    # Forget the supervisor's handlers until uvicorn installs its own.
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    # Connections are per process; never reuse any inherited from the supervisor.
+    database = sys.modules.get("app.database")
+    if database is not None:
+        database.engine.dispose(close=False)
+        for replica in database.replica_set.replicas if database.replica_set else ():
+            replica.engine.dispose(close=False)
+    async_database = sys.modules.get("app.async_database")
+    if async_database is not None:
+        async_database.async_engine.sync_engine.dispose(close=False)
+        for replica in async_database.async_replica_set.replicas if async_database.async_replica_set else ():
+            replica.engine.sync_engine.dispose(close=False)
+    server = uvicorn.Server(uvicorn.Config(target, **options))
+    server.run(sockets=[sock])
+    if not server.started:
+        # The lifespan failed; Server.run returns normally in that case.
+        sys.exit(STARTUP_FAILURE)
+
+class Supervisor:
+    def __init__(
+        self,
+        target: Any,
+        sock: socket.socket,
+        workers: int,
+        options: Dict[str, Any],
+        max_requests: int = 0,
+        max_requests_jitter: int = 0,
+        graceful_timeout: int = 30,
+    ):
+        self.target = target
+        self.sock = sock
+        self.workers = workers
+        self.options = options
+        self.max_requests = max_requests
+        self.max_requests_jitter = max_requests_jitter
+        self.graceful_timeout = graceful_timeout
+        self.processes: Dict[int, Tuple[multiprocessing.Process, float]] = {}
+        self.failed = False
+        self._stop = threading.Event()
+        self._context = multiprocessing.get_context("fork")
+
+    def run(self) -> int:
+        """Serve until SIGTERM or SIGINT; returns the exit status."""
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, lambda *_: self._stop.set())
+        logger.info("Supervisor %s starting %s workers", os.getpid(), self.workers)
+        for _ in range(self.workers):
+            self._spawn()
+        while not self._stop.wait(0.5):
+            self._reap()
+        self._drain()
+        return 1 if self.failed else 0
+
+    def _spawn(self) -> None:
+        options = dict(self.options)
+        if self.max_requests:
+            options["limit_max_requests"] = self.max_requests + random.randint(0, self.max_requests_jitter)
+        process = self._context.Process(target=_run_worker, args=(self.target, self.sock, options))
+        process.start()
+        self.processes[process.pid] = (process, time.monotonic())
+
+    def _reap(self) -> None:
+        for pid, (process, started) in list(self.processes.items()):
+            if process.is_alive():
+                continue
+            process.join()
+            del self.processes[pid]
+            self._forget(pid)
+            if process.exitcode != 0 and time.monotonic() - started < BOOT_SECONDS:
+                logger.error("Worker %s failed to boot (exit code %s); shutting down", pid, process.exitcode)
+                self.failed = True
+                self._stop.set()
+                return
+            logger.info("Worker %s exited (exit code %s); starting a replacement", pid, process.exitcode)
+            self._spawn()
+
+    def _drain(self) -> None:
+        for process, _ in self.processes.values():
+            if process.is_alive():
+                process.terminate()
+        # uvicorn gives requests graceful_timeout seconds, then needs a moment for the lifespan shutdown.
+        deadline = time.monotonic() + self.graceful_timeout + 5
+        for pid, (process, _) in self.processes.items():
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                logger.warning("Worker %s did not stop in time; killing it", pid)
+                process.kill()
+                process.join()
+            self._forget(pid)
+        self.processes.clear()
+        logger.info("Supervisor %s stopped", os.getpid())
+
+    def _forget(self, pid: int) -> None:
+        if config.METRICS_ENABLED:
+            from app import metrics
+            metrics.mark_worker_dead(pid)
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default=config.SERVER_HOST)
+    parser.add_argument("--port", type=int, default=config.SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=config.WEB_CONCURRENCY)
+    parser.add_argument("--preload", action=argparse.BooleanOptionalAction, default=config.SERVER_PRELOAD)
+    parser.add_argument("--max-requests", type=int, default=config.SERVER_MAX_REQUESTS)
+    parser.add_argument("--max-requests-jitter", type=int, default=config.SERVER_MAX_REQUESTS_JITTER)
+    parser.add_argument("--graceful-timeout", type=int, default=config.SERVER_GRACEFUL_TIMEOUT)
+    parser.add_argument("--keepalive", type=int, default=config.SERVER_KEEPALIVE_SECONDS)
+    parser.add_argument("--backlog", type=int, default=config.SERVER_BACKLOG)
+    return parser.parse_args(argv)
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    metrics_dir = None
+    if config.METRICS_ENABLED and args.workers > 1 and not os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        # Must be set before prometheus_client is first imported.
+        metrics_dir = os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="prometheus-")
+    configure_logging(
+        config.LOG_LEVEL,
+        config.LOG_FORMAT,
+        config.LOG_QUEUE_SIZE,
+        config.ERROR_LOG_RATE_PER_SECOND,
+        config.ERROR_LOG_BURST,
+    )
+    if config.DB_CREATE_SCHEMA or config.STATS_COUNTERS_ENABLED:
+        from app.database import engine
+        from app.startup import prepare_database
+
+        prepare_database()
+        # Workers open their own connections.
+        engine.dispose()
+    if args.preload:
+        from app.main import app as target
+    else:
+        target = "app.main:app"
+    options = {
+        "host": args.host,
+        "port": args.port,
+        "backlog": args.backlog,
+        "timeout_keep_alive": args.keepalive,
+        "timeout_graceful_shutdown": args.graceful_timeout,
+        "lifespan": "on",
+        # Logging is set up by app.logging_config, in the supervisor and on import of the app.
+        "log_config": None,
+    }
+    sock = uvicorn.Config(target, **options).bind_socket()
+    supervisor = Supervisor(
+        target,
+        sock,
+        args.workers,
+        options,
+        args.max_requests,
+        args.max_requests_jitter,
+        args.graceful_timeout,
+    )
+    try:
+        status = supervisor.run()
+    finally:
+        sock.close()
+        if metrics_dir is not None:
+            shutil.rmtree(metrics_dir, ignore_errors=True)
+    sys.exit(status)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+from contextlib import AbstractContextManager, asynccontextmanager
+from datetime import date, datetime
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Set, Tuple, Union
+from app.repositories.async_todo_repository import AsyncTodoRepository
+from app.repositories.todo_repository import ChangeSet
+from app.schemas import TodoBulkUpdate, TodoCreate, TodoStats, TodoUpdate
+from app.services.todo_service import TodoService
+from app.models import Todo
+from app.cache import TodoCache, TodoSnapshot
+from app.events import EventBroadcaster
+
+class AsyncTodoService:
+    """Asyncio counterpart of TodoService with the same errors and semantics.
+
+    Like AsyncTodoRepository, each method runs its TodoService counterpart,
+    ``sync``, through ``AsyncSession.run_sync``.
+    """
+
+    def __init__(
+        self,
+        repository: AsyncTodoRepository,
+        cache: Optional[TodoCache] = None,
+        events: Optional[EventBroadcaster] = None,
+    ):
+        self.repository = repository
+        self.sync = TodoService(repository.sync, cache, events)
+
+    async def _run(self, method: Callable, *args) -> Any:
+        return await self.repository.run(method, *args)
+
+    @asynccontextmanager
+    async def _entered(self, context: AbstractContextManager) -> AsyncIterator[None]:
+        """Hold a TodoService context manager open around an ``async with`` block."""
+        await self._run(context.__enter__)
+        try:
+            yield
+        except BaseException as e:
+            if not await self._run(context.__exit__, type(e), e, e.__traceback__):
+                raise
+        else:
+            await self._run(context.__exit__, None, None, None)
+
+    def transaction(self) -> AsyncIterator[None]:
+        """Run several service calls as one transaction; see TodoService.transaction."""
+        return self._entered(self.sync.transaction())
+
+    def savepoint(self) -> AsyncIterator[None]:
+        """Inside ``transaction()``: undo only the writes made in this block if it raises."""
+        return self._entered(self.sync.savepoint())
+
+    async def create_todo(self, todo: TodoCreate) -> Todo:
+        return await self._run(self.sync.create_todo, todo)
+
+    async def create_todos(self, todos: List[TodoCreate]) -> List[Todo]:
+        return await self._run(self.sync.create_todos, todos)
+
+    async def get_todo(self, todo_id: int) -> Union[Todo, TodoSnapshot]:
+        return await self._run(self.sync.get_todo, todo_id)
+
+    async def get_all_todos(
+        self, status: Optional[str] = None, sort: str = "created_at", include_archived: bool = False
+    ) -> List[Todo]:
+        return await self._run(self.sync.get_all_todos, status, sort, include_archived)
+
+    async def get_todo_page(
+        self,
+        limit: int,
+        cursor: Optional[str] = None,
+        status: Optional[str] = None,
+        sort: str = "created_at",
+        include_archived: bool = False,
+    ) -> Tuple[List[Todo], Optional[str]]:
+        return await self._run(self.sync.get_todo_page, limit, cursor, status, sort, include_archived)
+
+    async def search_todos(
+        self, text: str, limit: int, cursor: Optional[str] = None
+    ) -> Tuple[List[Todo], Optional[str]]:
+        return await self._run(self.sync.search_todos, text, limit, cursor)
+
+    async def get_stats(self, today: Optional[date] = None, include_archived: bool = False) -> TodoStats:
+        return await self._run(self.sync.get_stats, today, include_archived)
+
+    async def get_changes(self, since: Optional[str] = None) -> Tuple[ChangeSet, str]:
+        return await self._run(self.sync.get_changes, since)
+
+    async def update_todo(self, todo_id: int, todo: TodoUpdate) -> Todo:
+        return await self._run(self.sync.update_todo, todo_id, todo)
+
+    async def update_todos(self, updates: List[TodoBulkUpdate]) -> Dict[int, Todo]:
+        return await self._run(self.sync.update_todos, updates)
+
+    async def delete_todos(self, todo_ids: List[int]) -> Set[int]:
+        return await self._run(self.sync.delete_todos, todo_ids)
+
+    async def delete_todo(self, todo_id: int) -> bool:
+        return await self._run(self.sync.delete_todo, todo_id)
+
+    async def delete_all_todos(self) -> int:
+        return await self._run(self.sync.delete_all_todos)
+
+    async def complete_todo(self, todo_id: int) -> Todo:
+        return await self._run(self.sync.complete_todo, todo_id)
+
+    async def incomplete_todo(self, todo_id: int) -> Todo:
+        return await self._run(self.sync.incomplete_todo, todo_id)
+
+    async def archive_todos(self, cutoff: datetime, batch_size: int) -> List[int]:
+        return await self._run(self.sync.archive_todos, cutoff, batch_size)
+
+    async def prune_changes(self, cutoff: datetime) -> int:
+        return await self._run(self.sync.prune_changes, cutoff)
@@ -1,71 +1,244 @@
-from typing import List, Optional
+from contextlib import contextmanager
+from datetime import date, datetime
+from functools import partial
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
 from pydantic import ValidationError
-from app.repositories.todo_repository import TodoRepository
-from app.schemas import TodoCreate, TodoUpdate
+from app.pagination import decode_cursor, decode_version_cursor, encode_cursor, encode_version_cursor
+from app.repositories.todo_repository import ChangeSet, TodoRepository
+from app.schemas import TodoBulkUpdate, TodoCreate, TodoStats, TodoUpdate
 from app.models import Todo
+from app.cache import TodoCache, TodoSnapshot
+from app.events import EventBroadcaster
+from app.responses import todo_rows
+
+def paginate(todos: List[Todo], limit: int, sort: str) -> Tuple[List[Todo], Optional[str]]:
+    """Trim a ``limit + 1`` row fetch to one page and build the cursor for the next one."""
+    if len(todos) <= limit:
+        return todos, None
+    todos = todos[:limit]
+    last = todos[-1]
+    return todos, encode_cursor(sort, getattr(last, sort), last.id)
+
+def merge_bulk_updates(updates: List[TodoBulkUpdate]) -> Dict[int, dict]:
+    """Collapse bulk update items into per-id values; repeated ids are merged in order."""
+    merged: Dict[int, dict] = {}
+    for item in updates:
+        merged.setdefault(item.id, {}).update(item.model_dump(exclude_unset=True, exclude={"id"}))
+    return merged
 
 class TodoService:
-    def __init__(self, repository: TodoRepository):
+    def __init__(
+        self,
+        repository: TodoRepository,
+        cache: Optional[TodoCache] = None,
+        events: Optional[EventBroadcaster] = None,
+    ):
         self.repository = repository
+        self.cache = cache
+        self.events = events
+        # Cache invalidations and events waiting for the enclosing transaction to commit.
+        self._deferred: Optional[List[Callable[[], None]]] = None
+
+    @contextmanager
+    def transaction(self) -> Iterator[None]:
+        """Run several service calls as one transaction, committed when the block exits cleanly.
+
+        Writes inside the block are only flushed; their cache invalidations
+        and events wait for the commit and are dropped on rollback.
+        """
+        repository = self.repository
+        repository.begin()
+        repository.autocommit = False
+        self._deferred = []
+        try:
+            yield
+            repository.db.commit()
+        except BaseException:
+            repository.db.rollback()
+            self._deferred = None
+            raise
+        finally:
+            repository.autocommit = True
+        deferred, self._deferred = self._deferred, None
+        for callback in deferred:
+            callback()
+
+    @contextmanager
+    def savepoint(self) -> Iterator[None]:
+        """Inside ``transaction()``: undo only the writes made in this block if it raises."""
+        mark = len(self._deferred)
+        # Each block is one operation: it publishes only a version it took itself.
+        self.repository.last_version = None
+        try:
+            with self.repository.db.begin_nested():
+                yield
+        except BaseException:
+            del self._deferred[mark:]
+            raise
 
     def create_todo(self, todo: TodoCreate) -> Todo:
         try:
             if not todo.title.strip():
                 raise ValidationError("Title cannot be empty", model=TodoCreate)
-            return self.repository.create(todo)
+            created = self.repository.create(todo)
         except ValidationError as e:
             raise e
         except Exception as e:
             raise ValueError(str(e))
+        self._publish("created", todo_rows([created]))
+        return created
+
+    def create_todos(self, todos: List[TodoCreate]) -> List[Todo]:
+        created = self.repository.create_many(todos)
+        self._publish("created", todo_rows(created))
+        return created
 
-    def get_todo(self, todo_id: int) -> Optional[Todo]:
-        todo = self.repository.get_by_id(todo_id)
+    def get_todo(self, todo_id: int) -> Union[Todo, TodoSnapshot]:
+        if self.cache is not None:
+            cached = self.cache.get(todo_id)
+            if cached is not None:
+                return cached
+            generation = self.cache.generation()
+        todo = self.repository.get_by_id(todo_id) or self.repository.get_archived(todo_id)
         if not todo:
             raise ValueError(f"Todo with id {todo_id} not found")
+        if self.cache is not None:
+            self.cache.fill(todo_id, TodoSnapshot.model_validate(todo), generation, todo.version)
         return todo
 
-    def get_all_todos(self) -> List[Todo]:
-        return self.repository.get_all()
+    def get_all_todos(
+        self, status: Optional[str] = None, sort: str = "created_at", include_archived: bool = False
+    ) -> List[Todo]:
+        return self.repository.get_all(status, sort, include_archived)
+
+    def get_todo_page(
+        self,
+        limit: int,
+        cursor: Optional[str] = None,
+        status: Optional[str] = None,
+        sort: str = "created_at",
+        include_archived: bool = False,
+    ) -> Tuple[List[Todo], Optional[str]]:
+        after = decode_cursor(cursor, sort) if cursor else None
+        # Fetch one extra row to find out whether another page exists.
+        return paginate(self.repository.get_page(limit + 1, after, status, sort, include_archived), limit, sort)
+
+    def search_todos(
+        self, text: str, limit: int, cursor: Optional[str] = None
+    ) -> Tuple[List[Todo], Optional[str]]:
+        """One page of search results, best match first, and the cursor for the next page."""
+        after = decode_cursor(cursor, "rank") if cursor else None
+        # Fetch one extra row to find out whether another page exists.
+        rows = self.repository.search(text, limit + 1, after)
+        todos = [todo for todo, _ in rows[:limit]]
+        if len(rows) <= limit:
+            return todos, None
+        last, rank = rows[limit - 1]
+        return todos, encode_cursor("rank", rank, last.id)
+
+    def get_stats(self, today: Optional[date] = None, include_archived: bool = False) -> TodoStats:
+        counts = self.repository.get_stats(today or date.today(), include_archived)
+        return TodoStats(incomplete=counts["total"] - counts["completed"], **counts)
+
+    def get_changes(self, since: Optional[str] = None) -> Tuple[ChangeSet, str]:
+        """Changes after the ``since`` cursor (everything when omitted) and the cursor to resume from."""
+        changes = self.repository.get_changes(decode_version_cursor(since) if since else None)
+        return changes, encode_version_cursor(changes.version)
+
+    def export_todos(
+        self, batch_size: int, status: Optional[str] = None, sort: str = "created_at"
+    ) -> Iterator[List[Todo]]:
+        return self.repository.iter_batches(batch_size, status, sort)
 
     def update_todo(self, todo_id: int, todo: TodoUpdate) -> Todo:
-        if not self.repository.get_by_id(todo_id):
-            raise ValueError(f"Todo with id {todo_id} not found")
-        
         try:
             updated_todo = self.repository.update(todo_id, todo)
-            if not updated_todo:
-                raise ValueError(f"Failed to update todo with id {todo_id}")
-            return updated_todo
         except ValidationError as e:
             raise e
         except Exception as e:
             raise ValueError(str(e))
+        if not updated_todo:
+            raise ValueError(f"Todo with id {todo_id} not found")
+        self._invalidate([todo_id])
+        self._publish("updated", todo_rows([updated_todo]))
+        return updated_todo
+
+    def update_todos(self, updates: List[TodoBulkUpdate]) -> Dict[int, Todo]:
+        """Apply bulk partial updates; ids missing from the result were not found."""
+        updated = self.repository.update_many(merge_bulk_updates(updates))
+        self._invalidate(updated)
+        if updated:
+            self._publish("updated", todo_rows(updated.values()))
+        return updated
+
+    def delete_todos(self, todo_ids: List[int]) -> Set[int]:
+        deleted = self.repository.delete_many(todo_ids)
+        self._invalidate(deleted)
+        if deleted:
+            self._publish("deleted", sorted(deleted))
+        return deleted
 
     def delete_todo(self, todo_id: int) -> bool:
-        if not self.repository.get_by_id(todo_id):
+        if not self.repository.delete(todo_id):
             raise ValueError(f"Todo with id {todo_id} not found")
-        return self.repository.delete(todo_id)
+        self._invalidate([todo_id])
+        self._publish("deleted", [todo_id])
+        return True
+
+    def delete_all_todos(self) -> int:
+        deleted = self.repository.delete_all()
+        if self.cache is not None:
+            self._after_commit(partial(self.cache.clear, self.repository.last_version))
+        self._publish("cleared", {"deleted": deleted})
+        return deleted
 
     def complete_todo(self, todo_id: int) -> Todo:
-        todo = self.repository.get_by_id(todo_id)
-        if not todo:
-            raise ValueError(f"Todo with id {todo_id} not found")
-        if todo.is_completed:
-            raise ValueError(f"Todo with id {todo_id} is already completed")
-        
         completed_todo = self.repository.complete(todo_id)
-        if not completed_todo:
-            raise ValueError(f"Failed to complete todo with id {todo_id}")
-        return completed_todo
+        if completed_todo:
+            self._invalidate([todo_id])
+            self._publish("completed", todo_rows([completed_todo]))
+            return completed_todo
+        # The conditional update matched nothing: work out whether the todo is missing or already completed.
+        if not self.repository.get_by_id(todo_id) and not self.repository.get_archived(todo_id):
+            raise ValueError(f"Todo with id {todo_id} not found")
+        raise ValueError(f"Todo with id {todo_id} is already completed")
 
     def incomplete_todo(self, todo_id: int) -> Todo:
-        todo = self.repository.get_by_id(todo_id)
-        if not todo:
-            raise ValueError(f"Todo with id {todo_id} not found")
-        if not todo.is_completed:
-            raise ValueError(f"Todo with id {todo_id} is already incomplete")
-        
         incomplete_todo = self.repository.incomplete(todo_id)
-        if not incomplete_todo:
-            raise ValueError(f"Failed to mark todo with id {todo_id} as incomplete")
-        return incomplete_todo 
+        if incomplete_todo:
+            self._invalidate([todo_id])
+            self._publish("incompleted", todo_rows([incomplete_todo]))
+            return incomplete_todo
+        if not self.repository.get_by_id(todo_id):
+            raise ValueError(f"Todo with id {todo_id} not found")
+        raise ValueError(f"Todo with id {todo_id} is already incomplete")
+
+    def archive_todos(self, cutoff: datetime, batch_size: int) -> List[int]:
+        """Move one batch of todos completed before ``cutoff`` to the archive; returns their ids."""
+        archived = self.repository.archive(cutoff, batch_size)
+        # Cached copies stay valid: an archived todo is still served by get_todo.
+        if archived:
+            self._publish("archived", archived)
+        return archived
+
+    def prune_changes(self, cutoff: datetime) -> int:
+        """Forget change-feed history from before ``cutoff``; older cursors get a reset."""
+        return self.repository.prune_changes(cutoff)
+
+    def _after_commit(self, callback: Callable[[], None]) -> None:
+        if self._deferred is None:
+            callback()
+        else:
+            self._deferred.append(callback)
+
+    def _invalidate(self, todo_ids: Iterable[int]) -> None:
+        # Called after the repository has committed, so a concurrent cache fill cannot resurrect the old row,
+        # and before _publish takes the write's version, which keeps lagging replica reads out.
+        if self.cache is not None:
+            self._after_commit(partial(self.cache.invalidate, list(todo_ids), self.repository.last_version))
+
+    def _publish(self, event: str, data: Any) -> None:
+        # Also after commit; writes that changed nothing took no version and send no event.
+        version, self.repository.last_version = self.repository.last_version, None
+        if self.events is not None and version is not None:
+            self._after_commit(partial(self.events.publish, version, event, data))
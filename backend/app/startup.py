@@ -0,0 +1,120 @@
+"""Database work done once per worker, from the app lifespan rather than at import.
+
+Importing app.main opens no connection, so reloads, tests and tools that
+only need the app object stay fast. Before serving, a worker optionally
+applies the schema migrations, recomputes the stats counts, then opens its pool
+connections and runs the hot read queries once. Those queries fill the
+engine's compiled statement cache, so the first requests neither connect
+nor compile SQL. Warm-up is best effort: a failure is logged and the worker
+serves anyway, connecting on demand.
+"""
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, get_args
+
+from fastapi import FastAPI
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
+from starlette.concurrency import run_in_threadpool
+
+from app import config, events
+from app.database import SessionLocal, engine
+from app.events import watch_changes
+from app.migrations import migrate
+from app.repositories.todo_repository import TodoRepository
+from app.schemas import TodoSort
+
+logger = logging.getLogger(__name__)
+
+def rebuild_counts(session_factory: Callable) -> None:
+    with session_factory() as db:
+        TodoRepository(db, counts=True).rebuild_counts()
+
+def warm_pool(bind: Engine, connections: int) -> None:
+    """Open up to ``connections`` pooled connections at once, then return them all to the pool."""
+    opened = []
+    try:
+        for _ in range(connections):
+            opened.append(bind.connect())
+    finally:
+        for connection in opened:
+            connection.close()
+
+def warm_statements(session_factory: Callable) -> None:
+    """Run each hot read query once so its compiled form is cached."""
+    with session_factory() as db:
+        repository = TodoRepository(db, counts=config.STATS_COUNTERS_ENABLED)
+        repository.get_by_id(0)
+        for sort in get_args(TodoSort):
+            repository.get_page(1, None, None, sort)
+        repository.current_version()
+
+async def warm_async(connections: int) -> None:
+    from app.async_database import AsyncSessionLocal, async_engine
+    from app.repositories.async_todo_repository import AsyncTodoRepository
+
+    opened = []
+    try:
+        for _ in range(connections):
+            opened.append(await async_engine.connect())
+    finally:
+        await asyncio.gather(*(connection.close() for connection in opened))
+    async with AsyncSessionLocal() as db:
+        repository = AsyncTodoRepository(db, counts=config.STATS_COUNTERS_ENABLED)
+        await repository.get_by_id(0)
+        for sort in get_args(TodoSort):
+            await repository.get_page(1, None, None, sort)
+        await repository.current_version()
+
+# Set once prepare_database has run in this process; forked workers inherit it.
+_prepared = False
+
+def prepare_database() -> None:
+    """Migrate the schema and recompute the stats counts, as configured.
+
+    app.serve calls it in the supervisor before forking, so its workers do
+    not each wait their turn on the migration lock.
+    """
+    global _prepared
+    if _prepared:
+        return
+    if config.DB_CREATE_SCHEMA:
+        migrate(engine)
+    if config.STATS_COUNTERS_ENABLED:
+        rebuild_counts(SessionLocal)
+    _prepared = True
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    await run_in_threadpool(prepare_database)
+    connections = min(config.DB_WARMUP_CONNECTIONS, config.DB_POOL_SIZE)
+    if connections > 0:
+        try:
+            if config.DB_MODE == "async":
+                await warm_async(connections)
+            else:
+                await run_in_threadpool(warm_pool, engine, connections)
+                await run_in_threadpool(warm_statements, SessionLocal)
+        except SQLAlchemyError as e:
+            logger.warning("Database warm-up failed, connecting on demand: %s", e)
+    archiver = None
+    if config.ARCHIVE_INTERVAL_SECONDS > 0:
+        from app.archive import archive_periodically
+
+        archiver = asyncio.create_task(archive_periodically(config.ARCHIVE_INTERVAL_SECONDS))
+    watcher = None
+    if events.todo_events is not None and config.STREAM_POLL_SECONDS > 0:
+        watcher = asyncio.create_task(watch_changes(events.todo_events, SessionLocal, config.STREAM_POLL_SECONDS))
+    yield
+    if archiver is not None:
+        archiver.cancel()
+    if watcher is not None:
+        watcher.cancel()
+    if config.DB_MODE == "async":
+        # aiosqlite runs each connection on a non-daemon thread, so pooled ones would keep the process alive.
+        from app.async_database import async_engine, async_replica_set
+
+        await async_engine.dispose()
+        for replica in async_replica_set.replicas if async_replica_set else ():
+            await replica.engine.dispose()
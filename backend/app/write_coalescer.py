@@ -0,0 +1,259 @@
+"""Group commit: concurrent single-todo writes share one transaction.
+
+With WRITE_COALESCE_ENABLED, ``POST /todos``, ``PUT /todos/{id}`` and
+``PATCH /todos/{id}/complete`` and ``/incomplete`` hand their write to the
+worker's coalescer instead of committing it themselves. A flusher waits
+until the oldest queued write is WRITE_COALESCE_WINDOW_MS old, then takes
+every write queued by then (at most WRITE_COALESCE_MAX_BATCH) and runs each
+in its own savepoint of one transaction, so the batch pays for one commit,
+and one fsync, instead of one per write. Writes that queue up while a batch
+is being committed go out in the next one.
+
+Each caller waits for that commit and then gets its own result, or the
+error its write raised; a failed write only rolls back its savepoint. If the
+commit itself fails, every write in the batch gets that error. No response
+is sent before its write is committed, so durability is unchanged.
+
+The price is latency: a write may wait up to the window. Without concurrent
+writers there is nothing to share a commit with, so leave it off unless
+commits are the bottleneck.
+
+A caller waits at most ``timeout_seconds`` (WRITE_COALESCE_TIMEOUT_SECONDS)
+and then gets a WriteTimeout. If its write was still queued it is dropped
+and never runs; if its batch was already running, it may still commit.
+"""
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+
+from app.cache import TodoSnapshot
+
+logger = logging.getLogger(__name__)
+
+class WriteTimeout(TimeoutError):
+    """A coalesced write got no outcome within the coalescer's timeout."""
+
+    def __init__(self, timeout_seconds: float, queued: bool):
+        outcome = "it was dropped from the queue" if queued else "it may still commit"
+        super().__init__(f"Write not committed within {timeout_seconds:g}s; {outcome}")
+        self.queued = queued
+
+def _snapshot(result: Any) -> Any:
+    # Read now: rolling back a later savepoint may expire the row.
+    return TodoSnapshot.model_validate(result)
+
+def _stats(coalescer) -> dict:
+    return {
+        "window_ms": coalescer.window_seconds * 1000,
+        "max_batch": coalescer.max_batch,
+        "batches": coalescer.batches,
+        "writes": coalescer.writes,
+        "mean_batch_size": coalescer.writes / coalescer.batches if coalescer.batches else 0.0,
+    }
+
+class _Write:
+    __slots__ = ("call", "queued_at", "done", "result", "error")
+
+    def __init__(self, call: Callable[[Any], Any]):
+        self.call = call
+        self.queued_at = time.monotonic()
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+class WriteCoalescer:
+    """Runs single-todo writes from request threads in shared transactions, on one flusher thread.
+
+    ``service_factory`` builds a TodoService on a session from
+    ``session_factory``; the write methods mirror TodoService's.
+    """
+
+    def __init__(
+        self, session_factory, service_factory, window_seconds: float, max_batch: int, timeout_seconds: float = 60.0
+    ):
+        self.session_factory = session_factory
+        self.service_factory = service_factory
+        self.window_seconds = window_seconds
+        self.max_batch = max_batch
+        self.timeout_seconds = timeout_seconds
+        self.batches = 0
+        self.writes = 0
+        self._pending: List[_Write] = []
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+        self._thread: Optional[threading.Thread] = None
+
+    def stats(self) -> dict:
+        return _stats(self)
+
+    def create_todo(self, todo):
+        return self._submit(lambda service: service.create_todo(todo))
+
+    def update_todo(self, todo_id: int, todo):
+        return self._submit(lambda service: service.update_todo(todo_id, todo))
+
+    def complete_todo(self, todo_id: int):
+        return self._submit(lambda service: service.complete_todo(todo_id))
+
+    def incomplete_todo(self, todo_id: int):
+        return self._submit(lambda service: service.incomplete_todo(todo_id))
+
+    def _submit(self, call: Callable[[Any], Any]) -> Any:
+        write = _Write(call)
+        with self._lock:
+            # Started on first use, so each forked worker gets its own thread.
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="write-coalescer", daemon=True)
+                self._thread.start()
+            self._pending.append(write)
+            self._ready.notify()
+        if not write.done.wait(self.timeout_seconds):
+            with self._lock:
+                queued = write in self._pending
+                if queued:
+                    self._pending.remove(write)
+            raise WriteTimeout(self.timeout_seconds, queued)
+        if write.error is not None:
+            raise write.error
+        return write.result
+
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                while not self._pending:
+                    self._ready.wait()
+                oldest = self._pending[0].queued_at
+            # Writes that queued up during the last flush have already waited.
+            time.sleep(max(0.0, oldest + self.window_seconds - time.monotonic()))
+            with self._lock:
+                batch = self._pending[:self.max_batch]
+                del self._pending[:self.max_batch]
+            self._flush(batch)
+
+    def _flush(self, batch: List[_Write]) -> None:
+        db = None
+        try:
+            # Inside the try: failing to get a connection fails the batch, not the flusher.
+            db = self.session_factory()
+            service = self.service_factory(db)
+            with service.transaction():
+                for write in batch:
+                    try:
+                        with service.savepoint():
+                            write.result = _snapshot(write.call(service))
+                    except Exception as e:
+                        write.error = e
+        except Exception as e:
+            logger.warning("Group commit of %s writes failed: %s", len(batch), e)
+            for write in batch:
+                write.result, write.error = None, write.error or e
+        finally:
+            try:
+                if db is not None:
+                    db.close()
+            except Exception as e:
+                logger.warning("Closing the group commit session failed: %s", e)
+            self.batches += 1
+            self.writes += len(batch)
+            for write in batch:
+                if write.result is None and write.error is None:
+                    # Only reachable if something other than an Exception escaped.
+                    write.error = RuntimeError("Group commit was interrupted")
+                write.done.set()
+
+class AsyncWriteCoalescer:
+    """Asyncio counterpart of WriteCoalescer; the flusher is a task on the serving event loop."""
+
+    def __init__(
+        self, session_factory, service_factory, window_seconds: float, max_batch: int, timeout_seconds: float = 60.0
+    ):
+        self.session_factory = session_factory
+        self.service_factory = service_factory
+        self.window_seconds = window_seconds
+        self.max_batch = max_batch
+        self.timeout_seconds = timeout_seconds
+        self.batches = 0
+        self.writes = 0
+        self._pending: List[Tuple[Callable[[Any], Awaitable[Any]], asyncio.Future, float]] = []
+        self._wake: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def stats(self) -> dict:
+        return _stats(self)
+
+    async def create_todo(self, todo):
+        return await self._submit(lambda service: service.create_todo(todo))
+
+    async def update_todo(self, todo_id: int, todo):
+        return await self._submit(lambda service: service.update_todo(todo_id, todo))
+
+    async def complete_todo(self, todo_id: int):
+        return await self._submit(lambda service: service.complete_todo(todo_id))
+
+    async def incomplete_todo(self, todo_id: int):
+        return await self._submit(lambda service: service.incomplete_todo(todo_id))
+
+    async def _submit(self, call: Callable[[Any], Awaitable[Any]]) -> Any:
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._wake = asyncio.Event()
+            self._task = loop.create_task(self._run())
+        future = loop.create_future()
+        entry = (call, future, loop.time())
+        self._pending.append(entry)
+        self._wake.set()
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), self.timeout_seconds)
+        except asyncio.TimeoutError:
+            queued = entry in self._pending
+            if queued:
+                self._pending.remove(entry)
+            raise WriteTimeout(self.timeout_seconds, queued) from None
+
+    async def _run(self) -> None:
+        while True:
+            await self._wake.wait()
+            if not self._pending:
+                # Every queued write timed out and left.
+                self._wake.clear()
+                continue
+            oldest = self._pending[0][2]
+            loop = asyncio.get_running_loop()
+            await asyncio.sleep(max(0.0, oldest + self.window_seconds - loop.time()))
+            batch = self._pending[:self.max_batch]
+            del self._pending[:self.max_batch]
+            if not self._pending:
+                self._wake.clear()
+            await self._flush(batch)
+
+    async def _flush(self, batch: List[Tuple[Callable[[Any], Awaitable[Any]], asyncio.Future, float]]) -> None:
+        outcomes: List[Tuple[Any, Optional[BaseException]]] = []
+        try:
+            async with self.session_factory() as db:
+                service = self.service_factory(db)
+                async with service.transaction():
+                    for call, _, _ in batch:
+                        try:
+                            async with service.savepoint():
+                                outcomes.append((_snapshot(await call(service)), None))
+                        except Exception as e:
+                            outcomes.append((None, e))
+        except Exception as e:
+            logger.warning("Group commit of %s writes failed: %s", len(batch), e)
+            outcomes = [(None, outcome[1] or e) for outcome in outcomes]
+            outcomes += [(None, e)] * (len(batch) - len(outcomes))
+        finally:
+            self.batches += 1
+            self.writes += len(batch)
+            # Cancelled mid-batch, some writes have no outcome yet.
+            outcomes += [(None, RuntimeError("Group commit was interrupted"))] * (len(batch) - len(outcomes))
+            for (_, future, _), (result, error) in zip(batch, outcomes):
+                # The caller may have gone away; its write is committed regardless.
+                if future.done():
+                    continue
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)
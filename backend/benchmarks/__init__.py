@@ -0,0 +1 @@
+# Performance benchmarks for the backend; run modules with `python -m benchmarks.<name>`
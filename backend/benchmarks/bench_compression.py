@@ -0,0 +1,66 @@
+"""Bytes on the wire and encoding CPU of list responses: JSON vs MessagePack, by compression level.
+
+Usage: python -m benchmarks.bench_compression [--rows 100 10000 100000] [--repeat N]
+       [--levels gzip:1 gzip:6 br:1 br:4 zstd:1 zstd:3]
+
+Renders GET /todos bodies for generated todos (benchmarks/datagen.py) with
+TodoListResponse, as JSON and as MessagePack, then compresses each with the
+encoders CompressionMiddleware uses. "render ms" is serialization alone,
+"total ms" adds compression; both are medians. brotli and zstd are skipped
+when not installed.
+"""
+import argparse
+import statistics
+import time
+from typing import Callable, List
+
+from app.middleware.compression import ENCODERS
+from app.models import Todo
+from app.responses import TodoListResponse, msgpack_requested
+from benchmarks.datagen import generate_rows
+
+DEFAULT_LEVELS = ["gzip:1", "gzip:6", "gzip:9", "br:1", "br:4", "br:6", "zstd:1", "zstd:3", "zstd:9"]
+
+def median_ms(fn: Callable[[], object], repeat: int) -> float:
+    fn()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+def render(todos: List[Todo], msgpack: bool) -> bytes:
+    token = msgpack_requested.set(msgpack)
+    try:
+        return TodoListResponse(todos).body
+    finally:
+        msgpack_requested.reset(token)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--levels", nargs="+", default=DEFAULT_LEVELS)
+    args = parser.parse_args()
+    levels = [(encoding, int(level)) for encoding, level in (item.split(":") for item in args.levels)]
+
+    print(f"{'rows':>7}{'format':>9}{'encoding':>10}{'bytes':>12}{'ratio':>7}{'render ms':>11}{'total ms':>10}")
+    for rows in args.rows:
+        todos = [Todo(id=i, **row) for i, row in enumerate(generate_rows(rows), start=1)]
+        json_size = len(render(todos, msgpack=False))
+        for name, msgpack in (("json", False), ("msgpack", True)):
+            body = render(todos, msgpack)
+            render_ms = median_ms(lambda: render(todos, msgpack), args.repeat)
+            print(f"{rows:>7}{name:>9}{'identity':>10}{len(body):>12}{len(body) / json_size:>7.2f}{render_ms:>11.2f}{render_ms:>10.2f}")
+            for encoding, level in levels:
+                if encoding not in ENCODERS:
+                    continue
+                compress = lambda: ENCODERS[encoding](level).finish(body)
+                size = len(compress())
+                total_ms = render_ms + median_ms(compress, args.repeat)
+                label = f"{encoding}:{level}"
+                print(f"{rows:>7}{name:>9}{label:>10}{size:>12}{size / json_size:>7.2f}{render_ms:>11.2f}{total_ms:>10.2f}")
+
+if __name__ == "__main__":
+    main()
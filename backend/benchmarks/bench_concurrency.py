@@ -0,0 +1,104 @@
+"""Requests/sec of the sync and async stacks at increasing client concurrency.
+
+Usage: python -m benchmarks.bench_concurrency [--url DATABASE_URL] [--duration SECONDS]
+       [--concurrency 50 200 1000] [--modes sync async]
+
+Each mode starts its own uvicorn process (DB_MODE=sync|async) against the same
+database and is driven by an asyncio/httpx load generator that mixes page
+reads, single reads and completions. Point --url at PostgreSQL for meaningful
+numbers; the default temporary SQLite file serialises writes.
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def _start_server(mode: str, url: str, port: int) -> subprocess.Popen:
+    env = dict(os.environ, DB_MODE=mode, DATABASE_URL=url, DB_CREATE_SCHEMA="true")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env,
+    )
+    return wait_until_serving(server, port, mode)
+
+def wait_until_serving(server: subprocess.Popen, port: int, name: str) -> subprocess.Popen:
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/todos", params={"limit": 1}).raise_for_status()
+            return server
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError(f"{name} did not start")
+
+async def _client(http: httpx.AsyncClient, ids, stop_at: float, counts) -> None:
+    while time.monotonic() < stop_at:
+        roll = random.random()
+        try:
+            if roll < 0.6:
+                response = await http.get("/todos", params={"limit": 20})
+            elif roll < 0.9:
+                response = await http.get(f"/todos/{random.choice(ids)}")
+            else:
+                response = await http.patch(f"/todos/{random.choice(ids)}/complete")
+        except httpx.TransportError:
+            counts["error"] += 1
+            continue
+        counts["ok" if response.status_code < 500 else "error"] += 1
+
+async def _drive(port: int, concurrency: int, duration: float, ids) -> dict:
+    counts = {"ok": 0, "error": 0}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=30) as http:
+        stop_at = time.monotonic() + duration
+        await asyncio.gather(*(_client(http, ids, stop_at, counts) for _ in range(concurrency)))
+    return counts
+
+def run(url: str, modes, levels, duration: float, rows: int) -> None:
+    print(f"{'mode':<8}{'clients':>8}{'req/s':>10}{'errors':>8}")
+    for mode in modes:
+        port = _free_port()
+        server = _start_server(mode, url, port)
+        try:
+            base = f"http://127.0.0.1:{port}"
+            httpx.delete(f"{base}/todos").raise_for_status()
+            ids = []
+            for start in range(0, rows, 1000):
+                batch = [{"title": f"Todo {i}"} for i in range(start, min(start + 1000, rows))]
+                ids += [r["id"] for r in httpx.post(f"{base}/todos/bulk", json=batch, timeout=60).json()]
+            for concurrency in levels:
+                counts = asyncio.run(_drive(port, concurrency, duration, ids))
+                print(f"{mode:<8}{concurrency:>8}{counts['ok'] / duration:>10.1f}{counts['error']:>8}")
+        finally:
+            server.terminate()
+            server.wait()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default=None)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[50, 200, 1000])
+    parser.add_argument("--modes", nargs="+", default=["sync", "async"], choices=["sync", "async"])
+    args = parser.parse_args()
+    if args.url:
+        run(args.url, args.modes, args.concurrency, args.duration, args.rows)
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        run(f"sqlite:///{os.path.join(tmp, 'bench.db')}", args.modes, args.concurrency, args.duration, args.rows)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Writes/sec with and without group commit (WRITE_COALESCE_ENABLED).
+
+Usage: python -m benchmarks.bench_group_commit [--url DATABASE_URL] [--modes sync async] [--duration SECONDS]
+       [--concurrency 200] [--window-ms 2]
+
+Each mode runs a one-worker uvicorn server twice, coalescing off and on,
+against a fresh database. --concurrency clients create todos and toggle
+them complete/incomplete, each waiting for its previous response. Latency
+percentiles are per write; "batch" is the mean number of writes per
+commit, from /internal/write-coalescer. Commits are cheapest on a tmpfs or page-cached
+SQLite file; the gain grows with the cost of an fsync, so use --url with
+a database on real disks, or PostgreSQL, for numbers that reflect a
+deployment.
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.bench_concurrency import _free_port, wait_until_serving
+
+async def _writer(http: httpx.AsyncClient, stop_at: float, ids: list, latencies: list, counts: dict) -> None:
+    while time.monotonic() < stop_at:
+        started = time.perf_counter()
+        try:
+            if not ids or random.random() < 0.5:
+                response = await http.post("/todos", json={"title": "Benchmark todo"})
+                if response.status_code == 200:
+                    ids.append(response.json()["id"])
+            else:
+                action = random.choice(("complete", "incomplete"))
+                response = await http.patch(f"/todos/{random.choice(ids)}/{action}")
+        except httpx.TransportError:
+            counts["error"] += 1
+            continue
+        # Completing a completed todo is an expected 404.
+        counts["ok" if response.status_code < 500 else "error"] += 1
+        latencies.append((time.perf_counter() - started) * 1000)
+
+async def _load(port: int, concurrency: int, duration: float) -> dict:
+    ids: list = []
+    latencies: list = []
+    counts = {"ok": 0, "error": 0}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as http:
+        stop_at = time.monotonic() + duration
+        await asyncio.gather(*(_writer(http, stop_at, ids, latencies, counts) for _ in range(concurrency)))
+    return {**counts, "latencies": latencies}
+
+def _start_server(mode: str, url: str, port: int, coalesce: bool, window_ms: float) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        DB_MODE=mode,
+        DATABASE_URL=url,
+        DB_CREATE_SCHEMA="true",
+        WRITE_COALESCE_ENABLED=str(coalesce).lower(),
+        WRITE_COALESCE_WINDOW_MS=str(window_ms),
+        STREAM_ENABLED="false",
+        SLOW_REQUEST_THRESHOLD_MS="0",
+        LOG_LEVEL="WARNING",
+    )
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env,
+    )
+    return wait_until_serving(server, port, f"{mode} (coalescing {'on' if coalesce else 'off'})")
+
+def run(url_for, modes, duration: float, concurrency: int, window_ms: float) -> None:
+    print(f"{'mode':>6}{'coalescing':>12}{'writes/s':>10}{'p50 ms':>9}{'p99 ms':>9}{'errors':>8}{'batch':>7}")
+    for mode in modes:
+        for coalesce in (False, True):
+            port = _free_port()
+            server = _start_server(mode, url_for(mode, coalesce), port, coalesce, window_ms)
+            try:
+                result = asyncio.run(_load(port, concurrency, duration))
+                coalescer = httpx.get(f"http://127.0.0.1:{port}/internal/write-coalescer").json()
+            finally:
+                server.terminate()
+                server.wait()
+            latencies = sorted(result["latencies"]) or [0.0]
+            p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+            print(
+                f"{mode:>6}{'on' if coalesce else 'off':>12}{result['ok'] / duration:>10.1f}"
+                f"{statistics.median(latencies):>9.1f}{p99:>9.1f}{result['error']:>8}"
+                f"{coalescer.get('mean_batch_size', 1.0):>7.1f}"
+            )
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default=None)
+    parser.add_argument("--modes", nargs="+", choices=("sync", "async"), default=["sync", "async"])
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--window-ms", type=float, default=2.0)
+    args = parser.parse_args()
+    options = (args.modes, args.duration, args.concurrency, args.window_ms)
+    if args.url:
+        run(lambda mode, coalesce: args.url, *options)
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        run(lambda mode, coalesce: f"sqlite:///{os.path.join(tmp, f'{mode}-{coalesce}.db')}", *options)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Compare single-statement (RETURNING) mutations with the read-modify-write path.
+
+Usage: python -m benchmarks.bench_mutations [--rows N] [--url DATABASE_URL]
+
+Without --url a temporary SQLite file is used so commits hit the disk.
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.database import Base
+from app.repositories.todo_repository import TodoRepository
+from app.schemas import TodoCreate, TodoUpdate
+
+OPERATIONS = {
+    "complete": lambda repo, todo_id: repo.complete(todo_id),
+    "incomplete": lambda repo, todo_id: repo.incomplete(todo_id),
+    "update": lambda repo, todo_id: repo.update(todo_id, TodoUpdate(title=f"Renamed {todo_id}")),
+    "delete": lambda repo, todo_id: repo.delete(todo_id),
+}
+
+def run(url: str, rows: int) -> None:
+    engine = create_engine(url)
+    Session = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(1))
+
+    print(f"{'mode':<18}{'operation':<12}{'stmts/op':>10}{'mean ms':>10}{'p95 ms':>10}")
+    for returning in (False, True):
+        Base.metadata.drop_all(engine)
+        Base.metadata.create_all(engine)
+        with Session() as db:
+            ids = [TodoRepository(db).create(TodoCreate(title=f"Todo {i}")).id for i in range(rows)]
+
+        for name, operation in OPERATIONS.items():
+            timings = []
+            statements.clear()
+            for todo_id in ids:
+                with Session() as db:
+                    repository = TodoRepository(db, returning=returning)
+                    start = time.perf_counter()
+                    operation(repository, todo_id)
+                    timings.append((time.perf_counter() - start) * 1000)
+            mode = "returning" if returning else "select-then-write"
+            p95 = statistics.quantiles(timings, n=20)[-1]
+            print(f"{mode:<18}{name:<12}{len(statements) / rows:>10.1f}{statistics.mean(timings):>10.3f}{p95:>10.3f}")
+    engine.dispose()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=500)
+    parser.add_argument("--url", default=None)
+    args = parser.parse_args()
+    if args.url:
+        run(args.url, args.rows)
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        run(f"sqlite:///{os.path.join(tmp, 'bench.db')}", args.rows)
+
+if __name__ == "__main__":
+    main()
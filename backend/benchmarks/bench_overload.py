@@ -0,0 +1,136 @@
+"""Goodput of an overloaded worker with and without admission control.
+
+Usage: python -m benchmarks.bench_overload [--url DATABASE_URL] [--modes sync async] [--workload write read]
+       [--duration SECONDS] [--concurrency 100] [--deadline 2] [--max-in-flight 4] [--queue-timeout-ms 500]
+       [--rows 5000]
+
+Each mode runs a one-worker uvicorn server twice, admission control off
+and on (ADMISSION_MAX_IN_FLIGHT), against a database seeded with --rows
+todos. --concurrency clients each create a todo ("write") or read a
+100-todo page ("read") in a loop, and give up on a request after
+--deadline seconds. "good/s" counts responses that came back 200 within
+the deadline; "shed" the 503s, after which a client waits out Retry-After
+like a well-behaved caller; "late" the requests that hit the deadline or
+failed. Latency percentiles are over the good responses.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.bench_concurrency import _free_port, wait_until_serving
+
+def _request(http: httpx.AsyncClient, workload: str):
+    if workload == "write":
+        return http.post("/todos", json={"title": "Benchmark todo"})
+    return http.get("/todos", params={"limit": 100})
+
+async def _client(http: httpx.AsyncClient, workload: str, stop_at: float, deadline: float, counts: dict,
+                  latencies: list) -> None:
+    while time.monotonic() < stop_at:
+        started = time.perf_counter()
+        try:
+            response = await asyncio.wait_for(_request(http, workload), deadline)
+        except (httpx.TransportError, asyncio.TimeoutError):
+            counts["late"] += 1
+            continue
+        if response.status_code == 200:
+            counts["good"] += 1
+            latencies.append((time.perf_counter() - started) * 1000)
+        elif response.status_code == 503:
+            counts["shed"] += 1
+            await asyncio.sleep(float(response.headers.get("Retry-After", 1)))
+        else:
+            counts["late"] += 1
+
+async def _load(port: int, workload: str, concurrency: int, duration: float, deadline: float) -> dict:
+    counts = {"good": 0, "shed": 0, "late": 0}
+    latencies: list = []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=None) as http:
+        stop_at = time.monotonic() + duration
+        await asyncio.gather(*(_client(http, workload, stop_at, deadline, counts, latencies) for _ in range(concurrency)))
+    return {**counts, "latencies": latencies}
+
+def _start_server(mode: str, url: str, port: int, max_in_flight: int, queue_timeout_ms: float) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        DB_MODE=mode,
+        DATABASE_URL=url,
+        DB_CREATE_SCHEMA="true",
+        ADMISSION_MAX_IN_FLIGHT=str(max_in_flight),
+        ADMISSION_QUEUE_TIMEOUT_MS=str(queue_timeout_ms),
+        STREAM_ENABLED="false",
+        SLOW_REQUEST_THRESHOLD_MS="0",
+        LOG_LEVEL="WARNING",
+    )
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env,
+    )
+    return wait_until_serving(server, port, f"{mode} (admission {'on' if max_in_flight else 'off'})")
+
+def _seed(port: int, rows: int) -> None:
+    base = f"http://127.0.0.1:{port}"
+    for start in range(0, rows, 1000):
+        batch = [{"title": f"Todo {i}", "description": "Benchmark todo"} for i in range(start, min(start + 1000, rows))]
+        httpx.post(f"{base}/todos/bulk", json=batch, timeout=60).raise_for_status()
+
+def _stop(server: subprocess.Popen) -> None:
+    server.terminate()
+    try:
+        # Without admission control the worker may have hundreds of abandoned requests left to finish.
+        server.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        server.kill()
+        server.wait()
+
+def run(url_for, modes, workloads, duration: float, concurrency: int, deadline: float, max_in_flight: int,
+        queue_timeout_ms: float, rows: int) -> None:
+    print(f"{'mode':>6}{'workload':>10}{'admission':>11}{'good/s':>9}{'shed':>7}{'late':>7}{'p50 ms':>9}{'p99 ms':>9}")
+    for mode, workload in ((mode, workload) for mode in modes for workload in workloads):
+        for limit in (0, max_in_flight):
+            port = _free_port()
+            server = _start_server(mode, url_for(mode, workload, limit), port, limit, queue_timeout_ms)
+            try:
+                _seed(port, rows)
+                result = asyncio.run(_load(port, workload, concurrency, duration, deadline))
+            finally:
+                _stop(server)
+            latencies = sorted(result["latencies"]) or [0.0]
+            p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+            print(
+                f"{mode:>6}{workload:>10}{'on' if limit else 'off':>11}{result['good'] / duration:>9.1f}{result['shed']:>7}"
+                f"{result['late']:>7}{statistics.median(latencies):>9.1f}{p99:>9.1f}"
+            )
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default=None)
+    parser.add_argument("--modes", nargs="+", choices=("sync", "async"), default=["sync", "async"])
+    parser.add_argument("--workload", nargs="+", choices=("write", "read"), default=["write", "read"])
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--deadline", type=float, default=2.0)
+    parser.add_argument("--max-in-flight", type=int, default=4)
+    parser.add_argument("--queue-timeout-ms", type=float, default=500.0)
+    parser.add_argument("--rows", type=int, default=5000)
+    args = parser.parse_args()
+    options = (
+        args.modes, args.workload, args.duration, args.concurrency, args.deadline,
+        args.max_in_flight, args.queue_timeout_ms, args.rows,
+    )
+    if args.url:
+        run(lambda mode, workload, limit: args.url, *options)
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        run(lambda mode, workload, limit: f"sqlite:///{os.path.join(tmp, f'{mode}-{workload}-{limit}.db')}", *options)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Requests/sec of python -m app.serve from one worker up to N.
+
+Usage: python -m benchmarks.bench_scaling [--url DATABASE_URL] [--workers 1 2 4] [--duration SECONDS]
+       [--concurrency 200] [--load-processes N]
+
+Each worker count gets its own server, driven by --load-processes asyncio/httpx
+generator processes (default: one per CPU) so a single generator is not the
+bottleneck. The workload is reads only: page reads and single reads. Writes
+to SQLite serialize on the database lock, whatever the worker count. The
+workers and the generator share this machine's CPUs, so throughput levels off
+below the CPU count. Run the generator elsewhere, or against PostgreSQL
+with --url, for numbers that reflect a deployment.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.bench_concurrency import _free_port, wait_until_serving
+
+def _default_workers() -> list:
+    cpus = os.cpu_count() or 1
+    return sorted({n for n in (1, 2, 4, 8, 16, 32) if n < cpus} | {cpus})
+
+async def _reads(port: int, concurrency: int, duration: float, ids) -> dict:
+    counts = {"ok": 0, "error": 0}
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async def client(http: httpx.AsyncClient, stop_at: float) -> None:
+        while time.monotonic() < stop_at:
+            try:
+                if random.random() < 0.6:
+                    response = await http.get("/todos", params={"limit": 20})
+                else:
+                    response = await http.get(f"/todos/{random.choice(ids)}")
+            except httpx.TransportError:
+                counts["error"] += 1
+                continue
+            counts["ok" if response.status_code < 500 else "error"] += 1
+
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=30) as http:
+        stop_at = time.monotonic() + duration
+        await asyncio.gather(*(client(http, stop_at) for _ in range(concurrency)))
+    return counts
+
+def _load(port: int, concurrency: int, duration: float, ids) -> dict:
+    return asyncio.run(_reads(port, concurrency, duration, ids))
+
+def _start_server(url: str, port: int, workers: int) -> subprocess.Popen:
+    env = dict(os.environ, DATABASE_URL=url, DB_CREATE_SCHEMA="true", LOG_LEVEL="WARNING")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "app.serve", "--workers", str(workers), "--host", "127.0.0.1", "--port", str(port)],
+        env=env,
+    )
+    return wait_until_serving(server, port, f"app.serve ({workers} workers)")
+
+def _seed(port: int, rows: int) -> list:
+    base = f"http://127.0.0.1:{port}"
+    httpx.delete(f"{base}/todos").raise_for_status()
+    ids = []
+    for start in range(0, rows, 1000):
+        batch = [{"title": f"Todo {i}"} for i in range(start, min(start + 1000, rows))]
+        ids += [r["id"] for r in httpx.post(f"{base}/todos/bulk", json=batch, timeout=60).json()]
+    return ids
+
+def run(url: str, worker_counts, duration: float, concurrency: int, load_processes: int, rows: int) -> None:
+    print(f"{'workers':>8}{'req/s':>10}{'speedup':>9}{'errors':>8}")
+    ids = None
+    baseline = None
+    for workers in worker_counts:
+        port = _free_port()
+        server = _start_server(url, port, workers)
+        try:
+            if ids is None:
+                ids = _seed(port, rows)
+            per_process = max(1, concurrency // load_processes)
+            with multiprocessing.get_context("spawn").Pool(load_processes) as pool:
+                results = pool.starmap(_load, [(port, per_process, duration, ids)] * load_processes)
+            ok = sum(result["ok"] for result in results)
+            errors = sum(result["error"] for result in results)
+            throughput = ok / duration
+            baseline = baseline or throughput
+            print(f"{workers:>8}{throughput:>10.1f}{throughput / baseline:>8.2f}x{errors:>8}")
+        finally:
+            server.terminate()
+            server.wait()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default=None)
+    parser.add_argument("--workers", type=int, nargs="+", default=_default_workers())
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--load-processes", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--rows", type=int, default=5000)
+    args = parser.parse_args()
+    options = (args.workers, args.duration, args.concurrency, args.load_processes, args.rows)
+    if args.url:
+        run(args.url, *options)
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        run(f"sqlite:///{os.path.join(tmp, 'bench.db')}", *options)
+
+if __name__ == "__main__":
+    main()
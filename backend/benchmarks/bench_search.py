@@ -0,0 +1,65 @@
+"""Compare full-text search with a naive ILIKE scan over title and description.
+
+Usage: python -m benchmarks.bench_search [--rows N] [--url DATABASE_URL]
+
+Seeds --rows synthetic todos (default 1,000,000) and times the first page of
+TodoRepository.search against the same words matched with ``ILIKE '%word%'``
+(unranked, in id order) for a common word, a rarer combination and a word
+that matches nothing, which makes the scan read the whole table. Without
+--url a temporary SQLite file is used.
+"""
+import argparse
+import os
+import re
+import tempfile
+
+from sqlalchemy import or_, select
+
+from app.models import Todo
+from app.repositories.todo_repository import TodoRepository
+
+from benchmarks.harness import measure, summarize
+from benchmarks.suite import PAGE, Context, backend_name, make_engine, print_result
+
+QUERIES = ("groceries", "dentist taxes invoice", "zebra")
+
+def ilike_statement(text: str, limit: int):
+    words = re.findall(r"\w+", text)
+    return (
+        select(Todo)
+        .where(*(or_(Todo.title.ilike(f"%{word}%"), Todo.description.ilike(f"%{word}%")) for word in words))
+        .order_by(Todo.id)
+        .limit(limit)
+    )
+
+def run(url: str, rows: int, seed: int) -> None:
+    engine = make_engine(url)
+    backend = backend_name(url)
+    ctx = Context(engine, rows, seed)
+    try:
+        for text in QUERIES:
+            cases = [
+                ("search", ctx.in_session(lambda db: TodoRepository(db).search(text, PAGE))),
+                ("ilike", ctx.in_session(lambda db: list(db.scalars(ilike_statement(text, PAGE))))),
+            ]
+            for strategy, fn in cases:
+                timings = measure(fn, min_iterations=5, max_iterations=100, min_seconds=1.0)
+                print_result(summarize(backend, rows, strategy, f"{text!r}[{len(fn())}]", timings))
+    finally:
+        engine.dispose()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--url", default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    print(f"{'backend':<14}{'rows':>9}  {'strategy':<14}{'query[results]':<34}{'iters':>6}{'median ms':>11}{'p95 ms':>11}")
+    if args.url:
+        run(args.url, args.rows, args.seed)
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        run(f"sqlite:///{os.path.join(tmp, 'bench.db')}", args.rows, args.seed)
+
+if __name__ == "__main__":
+    main()
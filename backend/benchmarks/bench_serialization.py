@@ -0,0 +1,85 @@
+"""Per-row serialization cost of list responses: response_model validation vs. the orjson fast path.
+
+Usage: python -m benchmarks.bench_serialization [--rows N] [--repeat N]
+
+"before" reproduces the original path: FastAPI validating every ORM row into
+a TodoBase-derived schema (input validators included) and encoding it with
+JSONResponse. "after" is TodoListResponse.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from datetime import date, datetime, timedelta
+from typing import List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from pydantic import ConfigDict
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+from app import schemas
+from app.database import Base
+from app.models import Todo
+from app.responses import TodoListResponse
+
+class LegacyTodo(schemas.TodoBase):
+    id: int
+    is_completed: bool
+    created_at: datetime
+    model_config = ConfigDict(from_attributes=True)
+
+def load_rows(rows: int) -> List[Todo]:
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add_all(
+            Todo(
+                title=f"Todo {i}",
+                description="Pick up groceries and drop off the dry cleaning",
+                due_date=date(2025, 1, 1) + timedelta(days=i % 90) if i % 3 else None,
+                is_completed=i % 4 == 0,
+            )
+            for i in range(rows)
+        )
+        db.commit()
+    db = Session(engine)
+    return list(db.query(Todo))
+
+def before(todos: List[Todo], field) -> bytes:
+    content = asyncio.run(serialize_response(field=field, response_content=todos))
+    return JSONResponse(content).body
+
+def after(todos: List[Todo]) -> bytes:
+    return TodoListResponse(todos).body
+
+def timed(fn, repeat: int) -> List[float]:
+    fn()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    todos = load_rows(args.rows)
+    field = create_response_field(name="response", type_=List[LegacyTodo])
+    # Both paths must produce the same document.
+    assert json.loads(before(todos, field)) == json.loads(after(todos))
+    print(f"{'path':<10}{'median ms':>12}{'us/row':>10}{'bytes':>12}")
+    for name, fn in (("before", lambda: before(todos, field)), ("after", lambda: after(todos))):
+        median = statistics.median(timed(fn, args.repeat))
+        print(f"{name:<10}{median:>12.2f}{median * 1000 / args.rows:>10.2f}{len(fn()):>12}")
+
+if __name__ == "__main__":
+    main()
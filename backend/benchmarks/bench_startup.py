@@ -0,0 +1,91 @@
+"""Measure worker cold start: importing app.main, running its lifespan and serving a first request.
+
+Usage: python -m benchmarks.bench_startup [--runs N] [--budget-ms MS] [--top N] [--url DATABASE_URL]
+
+Each run starts a fresh interpreter with ``-X importtime``. The slowest
+imports of the last run are listed by cumulative time. Exits with status 1
+when the median import of app.main exceeds --budget-ms, so CI can keep cold
+start within a budget. Without --url a temporary SQLite file is used and the
+lifespan creates its tables.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from typing import List, Tuple
+
+# Runs in the child interpreter; prints one JSON line of timings in ms.
+CHILD = """
+import json, time
+start = time.perf_counter()
+from app.main import app
+imported = time.perf_counter()
+from fastapi.testclient import TestClient
+client = TestClient(app)
+ready = time.perf_counter()
+with client:
+    started = time.perf_counter()
+    client.get("/todos", params={"limit": 1}).raise_for_status()
+    served = time.perf_counter()
+print(json.dumps({
+    "import": (imported - start) * 1000,
+    "lifespan": (started - ready) * 1000,
+    "first_request": (served - started) * 1000,
+}))
+"""
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int]]:
+    """(module, self us, cumulative us) for each line of ``-X importtime`` output."""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        if self_us.strip().isdigit():
+            modules.append((name.strip(), int(self_us), int(cumulative_us)))
+    return modules
+
+def run_once(url: str) -> Tuple[dict, List[Tuple[str, int, int]]]:
+    env = dict(os.environ, DATABASE_URL=url, DB_CREATE_SCHEMA="true", LOG_LEVEL="WARNING")
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD], env=env, capture_output=True, text=True, check=True
+    )
+    return json.loads(completed.stdout.splitlines()[-1]), parse_importtime(completed.stderr)
+
+def run(url: str, runs: int, budget_ms: float, top: int) -> int:
+    timings = []
+    for _ in range(runs):
+        timing, modules = run_once(url)
+        timings.append(timing)
+    print(f"{'phase':<16}{'median ms':>11}{'max ms':>9}")
+    for phase in ("import", "lifespan", "first_request"):
+        values = [timing[phase] for timing in timings]
+        print(f"{phase:<16}{statistics.median(values):>11.1f}{max(values):>9.1f}")
+
+    print(f"\nslowest imports (last run)\n{'module':<48}{'self ms':>9}{'cumulative ms':>15}")
+    for name, self_us, cumulative_us in sorted(modules, key=lambda m: m[2], reverse=True)[:top]:
+        print(f"{name:<48}{self_us / 1000:>9.1f}{cumulative_us / 1000:>15.1f}")
+
+    median_import = statistics.median(timing["import"] for timing in timings)
+    if budget_ms and median_import > budget_ms:
+        print(f"\nimport of app.main took {median_import:.0f} ms, over the {budget_ms:.0f} ms budget")
+        return 1
+    return 0
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=1500.0)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--url", default=None)
+    args = parser.parse_args()
+    if args.url:
+        sys.exit(run(args.url, args.runs, args.budget_ms, args.top))
+    with tempfile.TemporaryDirectory() as tmp:
+        sys.exit(run(f"sqlite:///{os.path.join(tmp, 'bench.db')}", args.runs, args.budget_ms, args.top))
+
+if __name__ == "__main__":
+    main()
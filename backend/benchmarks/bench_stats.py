@@ -0,0 +1,67 @@
+"""Compare the two GET /todos/stats strategies: one aggregate scan of todos vs. maintained counts.
+
+Usage: python -m benchmarks.bench_stats [--rows N] [--url DATABASE_URL]
+
+Seeds --rows synthetic todos (default 1,000,000) and times get_stats both
+ways. The counts move the cost onto writes, so the write paths are timed
+with and without maintaining them too. Without --url a temporary SQLite file
+is used.
+"""
+import argparse
+import itertools
+import os
+import tempfile
+import time
+from datetime import date, timedelta
+
+from app import schemas
+from app.repositories.todo_repository import TodoRepository
+
+from benchmarks.harness import measure, summarize
+from benchmarks.suite import Context, _new_todo, backend_name, make_engine, print_result
+
+def run(url: str, rows: int, seed: int) -> None:
+    engine = make_engine(url)
+    backend = backend_name(url)
+    ctx = Context(engine, rows, seed)
+    counter = itertools.count()
+    today = date.today()
+    try:
+        with ctx.Session() as db:
+            start = time.perf_counter()
+            TodoRepository(db, counts=True).rebuild_counts()
+            print(f"rebuild_counts: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+        for counts in (False, True):
+            strategy = "counts" if counts else "scan"
+            repo = lambda call: ctx.in_session(lambda db: call(TodoRepository(db, counts=counts)))
+            cases = [
+                ("get_stats", repo(lambda r: r.get_stats(today)), None),
+                ("create", repo(lambda r: r.create(_new_todo(next(counter)))), None),
+                ("update[due_date]", repo(
+                    lambda r: r.update(ctx.target, schemas.TodoUpdate(due_date=today + timedelta(days=next(counter) % 30)))
+                ), ctx.pick),
+                ("complete", repo(lambda r: r.complete(ctx.target)), ctx.with_completed(True)),
+                ("delete", repo(lambda r: r.delete(ctx.target)), ctx.fresh),
+            ]
+            for name, fn, setup in cases:
+                timings = measure(fn, setup, min_iterations=5, max_iterations=200, min_seconds=1.0)
+                print_result(summarize(backend, rows, strategy, name, timings))
+    finally:
+        engine.dispose()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--url", default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    print(f"{'backend':<14}{'rows':>9}  {'strategy':<14}{'case':<34}{'iters':>6}{'median ms':>11}{'p95 ms':>11}")
+    if args.url:
+        run(args.url, args.rows, args.seed)
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        run(f"sqlite:///{os.path.join(tmp, 'bench.db')}", args.rows, args.seed)
+
+if __name__ == "__main__":
+    main()
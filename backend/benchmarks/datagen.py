@@ -0,0 +1,58 @@
+"""Synthetic todo data with realistic due-date and completion distributions.
+
+- about 30% of todos have no due date;
+- due dates cluster around today (normal, sd 30 days), skewed slightly into
+  the past so there is always an overdue tail;
+- todos due in the past are mostly completed, future ones mostly open;
+- created_at precedes the due date by up to 60 days and lies in the last year.
+"""
+import random
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List, Optional
+
+from sqlalchemy import insert
+from sqlalchemy.engine import Engine
+
+from app.models import Todo
+
+WORDS = (
+    "buy call email fix plan review write book clean pay send read update "
+    "prepare schedule groceries report invoice dentist taxes garden car meeting "
+    "slides budget laundry birthday flights backup"
+).split()
+
+def _title(rng: random.Random) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 5))).capitalize()
+
+def generate_rows(count: int, seed: int = 0, today: Optional[date] = None) -> Iterator[Dict]:
+    rng = random.Random(seed)
+    today = today or date.today()
+    now = datetime.combine(today, datetime.min.time())
+    for _ in range(count):
+        due_date = None
+        if rng.random() >= 0.3:
+            due_date = today + timedelta(days=round(rng.gauss(-5, 30)))
+        if due_date is None:
+            completed = rng.random() < 0.5
+            created_at = now - timedelta(days=rng.uniform(0, 365))
+        else:
+            completed = rng.random() < (0.8 if due_date < today else 0.15)
+            created_at = datetime.combine(due_date, datetime.min.time()) - timedelta(days=rng.uniform(0, 60))
+            created_at = min(created_at, now - timedelta(seconds=rng.uniform(0, 3600)))
+        yield {
+            "title": _title(rng),
+            "description": _title(rng) if rng.random() < 0.5 else None,
+            "due_date": due_date,
+            "is_completed": completed,
+            "created_at": created_at,
+        }
+
+def seed(engine: Engine, count: int, seed: int = 0, batch_size: int = 10000) -> None:
+    """Insert ``count`` generated todos with batched executemany INSERTs."""
+    rows = generate_rows(count, seed)
+    with engine.begin() as conn:
+        while True:
+            batch: List[Dict] = [row for _, row in zip(range(batch_size), rows)]
+            if not batch:
+                break
+            conn.execute(insert(Todo.__table__), batch)
@@ -0,0 +1,115 @@
+"""Timing, JSON results and baseline comparison shared by the benchmark suite."""
+import json
+import platform
+import statistics
+import sys
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+@dataclass
+class Result:
+    backend: str
+    rows: int
+    layer: str
+    name: str
+    iterations: int
+    median_ms: float
+    p95_ms: float
+    mean_ms: float
+    min_ms: float
+
+    @property
+    def key(self) -> Tuple[str, int, str, str]:
+        return self.backend, self.rows, self.layer, self.name
+
+def measure(
+    fn: Callable[[], object],
+    setup: Optional[Callable[[], None]] = None,
+    min_iterations: int = 5,
+    max_iterations: int = 200,
+    min_seconds: float = 0.5,
+    warmup: int = 1,
+) -> List[float]:
+    """Call ``fn`` until both ``min_iterations`` and ``min_seconds`` are reached; return per-call ms.
+
+    ``setup`` runs untimed before every call (including warm-up calls).
+    """
+    for _ in range(warmup):
+        if setup:
+            setup()
+        fn()
+    timings: List[float] = []
+    deadline = time.perf_counter() + min_seconds
+    while len(timings) < max_iterations and (len(timings) < min_iterations or time.perf_counter() < deadline):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+def summarize(backend: str, rows: int, layer: str, name: str, timings: List[float]) -> Result:
+    ordered = sorted(timings)
+    p95 = ordered[min(len(ordered) - 1, round(0.95 * (len(ordered) - 1)))]
+    return Result(
+        backend=backend,
+        rows=rows,
+        layer=layer,
+        name=name,
+        iterations=len(timings),
+        median_ms=statistics.median(timings),
+        p95_ms=p95,
+        mean_ms=statistics.mean(timings),
+        min_ms=ordered[0],
+    )
+
+def write_results(path: str, results: Iterable[Result], options: Dict) -> None:
+    document = {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "options": options,
+        },
+        "results": [asdict(result) for result in results],
+    }
+    with open(path, "w") as f:
+        json.dump(document, f, indent=2)
+
+def load_results(path: str) -> List[Result]:
+    with open(path) as f:
+        return [Result(**result) for result in json.load(f)["results"]]
+
+@dataclass
+class Comparison:
+    key: Tuple[str, int, str, str]
+    baseline_ms: float
+    current_ms: float
+
+    @property
+    def change(self) -> float:
+        return self.current_ms / self.baseline_ms - 1 if self.baseline_ms else 0.0
+
+def compare(
+    baseline: Iterable[Result], current: Iterable[Result], threshold: float, min_delta_ms: float = 0.05
+) -> Tuple[List[Comparison], List[Comparison]]:
+    """Pair results by (backend, rows, layer, name) on median time.
+
+    Returns (all comparisons, regressions). A case regresses when it is more
+    than ``threshold`` (a fraction, 0.2 = 20%) slower than the baseline and
+    the absolute slowdown exceeds ``min_delta_ms``, which keeps timer noise on
+    sub-millisecond cases from failing the run.
+    """
+    previous = {result.key: result for result in baseline}
+    comparisons = [
+        Comparison(result.key, previous[result.key].median_ms, result.median_ms)
+        for result in current
+        if result.key in previous
+    ]
+    regressions = [
+        c for c in comparisons
+        if c.change > threshold and c.current_ms - c.baseline_ms > min_delta_ms
+    ]
+    return comparisons, regressions
@@ -0,0 +1,304 @@
+"""Layered benchmark suite: repository, service, serialization and HTTP timings.
+
+Usage: python -m benchmarks.suite [--rows N [N ...]] [--url DATABASE_URL ...]
+                                  [--layer LAYER [LAYER ...]] [--output results.json]
+                                  [--baseline baseline.json] [--threshold 0.2]
+
+Every --url (default: in-memory SQLite) is seeded with each --rows count of
+synthetic todos (benchmarks.datagen) and every layer is timed against it:
+
+- repository: TodoRepository methods, one session per call
+- service: TodoService methods, one session per call
+- serialization: output schemas, list responses and export formatters
+- http: a TestClient round trip for every route in app/routes.py
+
+Mutating cases prepare their target rows untimed (e.g. a todo is reopened
+before timing "complete"), so every iteration does the same work. DELETE
+/todos runs once, last, as it empties the table.
+
+--output writes the results as JSON. --baseline compares median times with a
+previous --output file and exits with status 1 when any case is more than
+--threshold slower.
+"""
+import argparse
+import itertools
+import logging
+import os
+import random
+import sys
+from datetime import date, timedelta
+from typing import Callable, Iterator, List, Optional, Tuple
+
+# app.database builds its engine at import; keep it off a real database
+# unless one was configured explicitly.
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from sqlalchemy import create_engine, insert, select, update
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import schemas
+from app.database import Base
+from app.export import csv_chunks, ndjson_chunks
+from app.models import Todo
+from app.repositories.todo_repository import TodoRepository
+from app.responses import TodoListResponse
+from app.services.todo_service import TodoService
+
+from benchmarks import datagen
+from benchmarks.harness import Result, compare, load_results, measure, summarize, write_results
+
+LAYERS = ("repository", "service", "serialization", "http")
+BATCH = 100
+PAGE = 50
+
+Case = Tuple[str, Callable[[], object], Optional[Callable[[], None]]]
+
+def make_engine(url: str) -> Engine:
+    if make_url(url).get_backend_name() != "sqlite":
+        return create_engine(url)
+    # The TestClient calls the app from another thread.
+    options = {"connect_args": {"check_same_thread": False}}
+    if make_url(url).database in (None, "", ":memory:"):
+        options["poolclass"] = StaticPool
+    return create_engine(url, **options)
+
+def backend_name(url: str) -> str:
+    parsed = make_url(url)
+    name = parsed.get_backend_name()
+    if name == "sqlite" and parsed.database in (None, "", ":memory:"):
+        return "sqlite-memory"
+    return name
+
+class Context:
+    """A seeded database plus the untimed helpers cases use to prepare their targets."""
+
+    def __init__(self, engine: Engine, rows: int, seed: int):
+        self.engine = engine
+        self.Session = sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+        self.rng = random.Random(seed)
+        self.fresh_rows = datagen.generate_rows(10 ** 9, seed + 1)
+        Base.metadata.drop_all(engine)
+        Base.metadata.create_all(engine)
+        datagen.seed(engine, rows, seed)
+        with engine.begin() as conn:
+            conn.exec_driver_sql("ANALYZE")
+            self.ids = list(conn.scalars(select(Todo.id)))
+        self.target = None
+
+    def pick(self) -> None:
+        self.target = self.rng.choice(self.ids)
+
+    def pick_many(self) -> None:
+        self.target = self.rng.sample(self.ids, BATCH)
+
+    def insert_fresh(self, count: int) -> List[int]:
+        rows = list(itertools.islice(self.fresh_rows, count))
+        with self.engine.begin() as conn:
+            return list(conn.scalars(insert(Todo).returning(Todo.id), rows))
+
+    def fresh(self) -> None:
+        self.target = self.insert_fresh(1)[0]
+
+    def fresh_many(self) -> None:
+        self.target = self.insert_fresh(BATCH)
+
+    def with_completed(self, completed: bool) -> Callable[[], None]:
+        """Setup that picks a todo and puts it in the opposite state, so the timed call changes it."""
+        def setup() -> None:
+            self.pick()
+            with self.engine.begin() as conn:
+                conn.execute(update(Todo).where(Todo.id == self.target).values(is_completed=not completed))
+        return setup
+
+    def in_session(self, call: Callable) -> Callable[[], object]:
+        def fn():
+            with self.Session() as db:
+                return call(db)
+        return fn
+
+def _new_todo(i: int) -> schemas.TodoCreate:
+    return schemas.TodoCreate(title=f"Benchmark todo {i}", due_date=date.today() + timedelta(days=i % 30))
+
+def repository_cases(ctx: Context) -> Iterator[Case]:
+    repo = lambda call: ctx.in_session(lambda db: call(TodoRepository(db)))
+    counter = itertools.count()
+    yield "get_by_id", repo(lambda r: r.get_by_id(ctx.target)), ctx.pick
+    for sort in ("created_at", "due_date", "title"):
+        yield f"get_page[{sort}]", repo(lambda r, sort=sort: r.get_page(PAGE, sort=sort)), None
+    yield "get_page[overdue]", repo(lambda r: r.get_page(PAGE, status="overdue", sort="due_date")), None
+    yield "get_all", repo(lambda r: r.get_all()), None
+    yield "get_all[overdue]", repo(lambda r: r.get_all(status="overdue")), None
+    yield "iter_batches", repo(lambda r: sum(len(b) for b in r.iter_batches(1000))), None
+    yield "get_stats", repo(lambda r: r.get_stats(date.today())), None
+    yield "search", repo(lambda r: r.search("dentist taxes", PAGE)), None
+    with ctx.Session() as db:
+        TodoRepository(db, counts=True).rebuild_counts()
+    yield "get_stats[counts]", ctx.in_session(lambda db: TodoRepository(db, counts=True).get_stats(date.today())), None
+    yield "create", repo(lambda r: r.create(_new_todo(next(counter)))), None
+    yield f"create_many[{BATCH}]", repo(lambda r: r.create_many([_new_todo(next(counter)) for _ in range(BATCH)])), None
+    yield "update", repo(lambda r: r.update(ctx.target, schemas.TodoUpdate(title="Renamed"))), ctx.pick
+    yield f"update_many[{BATCH}]", repo(lambda r: r.update_many({i: {"title": "Renamed"} for i in ctx.target})), ctx.pick_many
+    yield "complete", repo(lambda r: r.complete(ctx.target)), ctx.with_completed(True)
+    yield "incomplete", repo(lambda r: r.incomplete(ctx.target)), ctx.with_completed(False)
+    yield "delete", repo(lambda r: r.delete(ctx.target)), ctx.fresh
+    yield f"delete_many[{BATCH}]", repo(lambda r: r.delete_many(ctx.target)), ctx.fresh_many
+
+def service_cases(ctx: Context) -> Iterator[Case]:
+    service = lambda call: ctx.in_session(lambda db: call(TodoService(TodoRepository(db))))
+    counter = itertools.count()
+    with ctx.Session() as db:
+        _, cursor = TodoService(TodoRepository(db)).get_todo_page(PAGE, None)
+    yield "get_todo", service(lambda s: s.get_todo(ctx.target)), ctx.pick
+    yield "get_todo_page", service(lambda s: s.get_todo_page(PAGE, None)), None
+    yield "get_todo_page[cursor]", service(lambda s: s.get_todo_page(PAGE, cursor)), None
+    yield "get_all_todos", service(lambda s: s.get_all_todos()), None
+    yield "export_todos", service(lambda s: sum(len(b) for b in s.export_todos(1000))), None
+    yield "create_todo", service(lambda s: s.create_todo(_new_todo(next(counter)))), None
+    yield f"create_todos[{BATCH}]", service(lambda s: s.create_todos([_new_todo(next(counter)) for _ in range(BATCH)])), None
+    yield "update_todo", service(lambda s: s.update_todo(ctx.target, schemas.TodoUpdate(title="Renamed"))), ctx.pick
+    yield f"update_todos[{BATCH}]", service(
+        lambda s: s.update_todos([schemas.TodoBulkUpdate(id=i, title="Renamed") for i in ctx.target])
+    ), ctx.pick_many
+    yield "complete_todo", service(lambda s: s.complete_todo(ctx.target)), ctx.with_completed(True)
+    yield "incomplete_todo", service(lambda s: s.incomplete_todo(ctx.target)), ctx.with_completed(False)
+    yield "delete_todo", service(lambda s: s.delete_todo(ctx.target)), ctx.fresh
+    yield f"delete_todos[{BATCH}]", service(lambda s: s.delete_todos(ctx.target)), ctx.fresh_many
+
+def serialization_cases(ctx: Context) -> Iterator[Case]:
+    with ctx.Session() as db:
+        todos = TodoRepository(db).get_page(500)
+    payload = [{"title": f"Todo {i}", "description": "Notes", "due_date": "2030-01-01"} for i in range(BATCH)]
+    yield f"todo_model_validate[{len(todos)}]", lambda: [schemas.Todo.model_validate(t) for t in todos], None
+    yield f"list_response[{len(todos)}]", lambda: TodoListResponse(todos).body, None
+    yield f"ndjson_export[{len(todos)}]", lambda: list(ndjson_chunks([todos])), None
+    yield f"csv_export[{len(todos)}]", lambda: list(csv_chunks([todos])), None
+    yield "todo_create_validate", lambda: schemas.TodoCreate.model_validate(payload[0]), None
+    yield f"bulk_create_validate[{BATCH}]", lambda: [schemas.TodoCreate.model_validate(p) for p in payload], None
+
+def http_cases(ctx: Context) -> Iterator[Case]:
+    from fastapi.testclient import TestClient
+
+    from app.database import get_db
+    from app.main import app
+
+    def override_get_db():
+        db = ctx.Session()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    client = TestClient(app)
+
+    def call(method: str, url: Callable[[], str], json: Callable[[], object] = lambda: None):
+        def fn():
+            response = client.request(method, url(), json=json())
+            if response.status_code >= 400:
+                raise RuntimeError(f"{method} {response.url} returned {response.status_code}: {response.text}")
+            return response.content
+        return fn
+
+    counter = itertools.count()
+    new_todo = lambda: {"title": f"Benchmark todo {next(counter)}", "due_date": "2030-01-01"}
+    cursor = client.get("/todos", params={"limit": PAGE}).headers.get("X-Next-Cursor", "")
+    try:
+        yield "GET /todos", call("GET", lambda: "/todos"), None
+        yield "GET /todos?limit", call("GET", lambda: f"/todos?limit={PAGE}"), None
+        yield "GET /todos?limit&cursor", call("GET", lambda: f"/todos?limit={PAGE}&cursor={cursor}"), None
+        yield "GET /todos?status=overdue", call("GET", lambda: f"/todos?limit={PAGE}&status=overdue&sort=due_date"), None
+        yield "GET /todos/stats", call("GET", lambda: "/todos/stats"), None
+        yield "GET /todos/search", call("GET", lambda: f"/todos/search?q=dentist+taxes&limit={PAGE}"), None
+        for fmt in ("ndjson", "csv"):
+            yield f"GET /todos/export?format={fmt}", call("GET", lambda fmt=fmt: f"/todos/export?format={fmt}"), None
+        yield f"POST /todos/bulk[{BATCH}]", call("POST", lambda: "/todos/bulk", lambda: [new_todo() for _ in range(BATCH)]), None
+        yield f"PATCH /todos/bulk[{BATCH}]", call(
+            "PATCH", lambda: "/todos/bulk", lambda: [{"id": i, "title": "Renamed"} for i in ctx.target]
+        ), ctx.pick_many
+        yield f"DELETE /todos/bulk[{BATCH}]", call("DELETE", lambda: "/todos/bulk", lambda: ctx.target), ctx.fresh_many
+        yield "GET /todos/{id}", call("GET", lambda: f"/todos/{ctx.target}"), ctx.pick
+        yield "POST /todos", call("POST", lambda: "/todos", new_todo), None
+        yield "PUT /todos/{id}", call("PUT", lambda: f"/todos/{ctx.target}", lambda: {"title": "Renamed"}), ctx.pick
+        yield "DELETE /todos/{id}", call("DELETE", lambda: f"/todos/{ctx.target}"), ctx.fresh
+        yield "PATCH /todos/{id}/complete", call("PATCH", lambda: f"/todos/{ctx.target}/complete"), ctx.with_completed(True)
+        yield "PATCH /todos/{id}/incomplete", call("PATCH", lambda: f"/todos/{ctx.target}/incomplete"), ctx.with_completed(False)
+        yield "DELETE /todos", call("DELETE", lambda: "/todos"), None
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+
+CASES = {
+    "repository": repository_cases,
+    "service": service_cases,
+    "serialization": serialization_cases,
+    "http": http_cases,
+}
+
+def run(url: str, rows: int, layers: List[str], args) -> Iterator[Result]:
+    engine = make_engine(url)
+    backend = backend_name(url)
+    ctx = Context(engine, rows, args.seed)
+    try:
+        for layer in layers:
+            for name, fn, setup in CASES[layer](ctx):
+                single = name == "DELETE /todos"
+                timings = measure(
+                    fn,
+                    setup,
+                    min_iterations=1 if single else args.min_iterations,
+                    max_iterations=1 if single else args.max_iterations,
+                    min_seconds=args.min_seconds,
+                    warmup=0 if single else 1,
+                )
+                yield summarize(backend, rows, layer, name, timings)
+    finally:
+        engine.dispose()
+
+def print_result(result: Result) -> None:
+    print(
+        f"{result.backend:<14}{result.rows:>9}  {result.layer:<14}{result.name:<34}"
+        f"{result.iterations:>6}{result.median_ms:>11.3f}{result.p95_ms:>11.3f}"
+    )
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000])
+    parser.add_argument("--url", action="append", help="database URL; repeat for several (default: sqlite://)")
+    parser.add_argument("--layer", nargs="+", choices=LAYERS, default=list(LAYERS))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--min-seconds", type=float, default=0.5, help="minimum timed seconds per case")
+    parser.add_argument("--min-iterations", type=int, default=5)
+    parser.add_argument("--max-iterations", type=int, default=200)
+    parser.add_argument("--output", help="write results as JSON to this path")
+    parser.add_argument("--baseline", help="compare against a previous --output file")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown vs. baseline (0.2 = 20%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=0.05, help="ignore slowdowns smaller than this")
+    args = parser.parse_args()
+    if min(args.rows) < BATCH:
+        # The batch cases update and delete BATCH distinct seeded todos.
+        parser.error(f"--rows must be at least {BATCH}")
+    # Keep layers in dependency order; DELETE /todos must run last.
+    layers = [layer for layer in LAYERS if layer in args.layer]
+
+    print(f"{'backend':<14}{'rows':>9}  {'layer':<14}{'case':<34}{'iters':>6}{'median ms':>11}{'p95 ms':>11}")
+    results: List[Result] = []
+    for url in args.url or ["sqlite://"]:
+        for rows in args.rows:
+            for result in run(url, rows, layers, args):
+                print_result(result)
+                results.append(result)
+
+    if args.output:
+        write_results(args.output, results, {k: v for k, v in vars(args).items() if k not in ("output", "baseline")})
+    if args.baseline:
+        comparisons, regressions = compare(load_results(args.baseline), results, args.threshold, args.min_delta_ms)
+        print(f"\n{len(comparisons)} cases compared with {args.baseline}, {len(regressions)} regressed:")
+        for c in sorted(regressions, key=lambda c: -c.change):
+            print(f"  {' / '.join(map(str, c.key))}: {c.baseline_ms:.3f} -> {c.current_ms:.3f} ms ({c.change:+.0%})")
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -3,12 +3,20 @@ from setuptools import setup, find_packages
 setup(
     name="todo-app",
     version="0.1.0",
-    packages=find_packages(),
+    packages=find_packages(exclude=["tests", "benchmarks", "benchmarks.*"]),
     install_requires=[
         "fastapi",
         "uvicorn",
         "sqlalchemy",
         "pydantic",
         "psycopg2-binary",
+        "orjson",
+        "msgpack",
+        "prometheus-client",
     ],
+    extras_require={
+        "async": ["asyncpg", "aiosqlite"],
+        "server": ["uvloop", "httptools"],
+        "compression": ["brotli", "zstandard"],
+    },
 ) 
\ No newline at end of file
@@ -1,3 +1,8 @@
+import os
+
+# Tests bring their own engines; skip warming the configured one.
+os.environ.setdefault("DB_WARMUP_CONNECTIONS", "0")
+
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
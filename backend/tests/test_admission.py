@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+
+from app import admission
+from app.admission import AdmissionController, Rejected, TokenBuckets
+
+def _controller(max_in_flight=1, max_queue=1, queue_timeout_seconds=1.0, rate_limits=None):
+    return AdmissionController(max_in_flight, max_queue, queue_timeout_seconds, 1.0, rate_limits)
+
+def test_token_buckets():
+    buckets = TokenBuckets(rate_per_second=2, burst=2, max_clients=2)
+    assert [buckets.take("a", 0.0) for _ in range(3)] == [0.0, 0.0, 0.5]
+    assert buckets.take("a", 0.5) == 0.0
+    assert buckets.take("b", 0.5) == 0.0
+    buckets.take("c", 0.5)
+    # "a" was least recently seen, so it was dropped and starts full again.
+    assert len(buckets) == 2
+    assert buckets.take("a", 0.5) == 0.0
+
+def test_queues_in_order_and_sheds_when_full():
+    async def scenario():
+        controller = _controller()
+        order = []
+        release = asyncio.Event()
+
+        async def request(name):
+            async with controller.admit("client"):
+                order.append(name)
+                await release.wait()
+
+        first = asyncio.create_task(request("first"))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(request("second"))
+        await asyncio.sleep(0)
+        with pytest.raises(Rejected) as rejected:
+            await request("third")
+        assert (rejected.value.status_code, rejected.value.reason) == (503, "queue_full")
+        assert controller.stats()["queued"] == 1
+        release.set()
+        await asyncio.gather(first, second)
+        return controller, order
+
+    controller, order = asyncio.run(scenario())
+    assert order == ["first", "second"]
+    assert controller.stats()["in_flight"] == 0
+    assert controller.admitted == 2
+    assert controller.shed["queue_full"] == 1
+
+def test_waiters_past_their_deadline_are_shed():
+    async def scenario():
+        controller = _controller(queue_timeout_seconds=0.01)
+        async with controller.admit("client"):
+            with pytest.raises(Rejected) as rejected:
+                async with controller.admit("client"):
+                    pass
+        assert rejected.value.reason == "queue_timeout"
+        return controller
+
+    controller = asyncio.run(scenario())
+    assert controller.stats()["queued"] == 0
+    assert controller.in_flight == 0
+
+def test_cancelled_waiters_leave_the_queue():
+    async def scenario():
+        controller = _controller()
+        async with controller.admit("client"):
+            waiter = asyncio.create_task(controller.admit("client").__aenter__())
+            await asyncio.sleep(0)
+            waiter.cancel()
+            await asyncio.gather(waiter, return_exceptions=True)
+            assert controller.stats()["queued"] == 0
+        return controller
+
+    assert asyncio.run(scenario()).in_flight == 0
+
+@pytest.fixture
+def controller(monkeypatch):
+    def install(controller):
+        monkeypatch.setattr(admission, "admission_controller", controller)
+        return controller
+    return install
+
+def test_overloaded_routes_return_503(client, controller):
+    overloaded = controller(_controller(max_queue=0))
+    overloaded.in_flight = 1
+    response = client.get("/todos")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    # Internal endpoints are not gated.
+    data = client.get("/internal/admission").json()
+    assert data["shed"]["queue_full"] == 1
+    assert "# TYPE http_requests_shed_total counter" in client.get("/metrics").text
+
+def test_rate_limited_clients_get_429(client, controller):
+    controller(_controller(max_in_flight=0, rate_limits=TokenBuckets(rate_per_second=0.5, burst=2)))
+    assert [client.get("/todos").status_code for _ in range(3)] == [200, 200, 429]
+    response = client.get("/todos")
+    assert response.headers["Retry-After"] == "2"
+    assert client.get("/internal/admission").json()["rate_limit"]["clients"] == 1
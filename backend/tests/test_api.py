@@ -1,5 +1,9 @@
+import csv
+import io
+import json
 from fastapi.testclient import TestClient
 from app.main import app
+from app.pagination import encode_cursor
 
 client = TestClient(app)
 
@@ -197,3 +201,297 @@ def test_incomplete_todo_not_found(client):
     response = client.patch("/todos/999/incomplete")
     assert response.status_code == 404
     assert response.json()["detail"] == "Todo with id 999 not found" 
+
+def test_list_todos_paginated(client):
+    for i in range(5):
+        client.post("/todos", json={"title": f"Todo {i}"})
+
+    response = client.get("/todos", params={"limit": 2})
+    assert response.status_code == 200
+    assert [t["title"] for t in response.json()] == ["Todo 0", "Todo 1"]
+    cursor = response.headers["X-Next-Cursor"]
+
+    response = client.get("/todos", params={"limit": 2, "cursor": cursor})
+    assert [t["title"] for t in response.json()] == ["Todo 2", "Todo 3"]
+    cursor = response.headers["X-Next-Cursor"]
+
+    response = client.get("/todos", params={"limit": 2, "cursor": cursor})
+    assert [t["title"] for t in response.json()] == ["Todo 4"]
+    assert "X-Next-Cursor" not in response.headers
+
+def test_list_todos_invalid_cursor(client):
+    response = client.get("/todos", params={"limit": 2, "cursor": "not-a-cursor"})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid pagination cursor"
+
+def test_list_todos_limit_out_of_range(client):
+    response = client.get("/todos", params={"limit": 0})
+    assert response.status_code == 422
+
+def test_list_todos_status_filter(client, sample_todo, no_date_todo, completed_todo):
+    sample_id, no_date_id, completed_id = sample_todo.id, no_date_todo.id, completed_todo.id
+
+    response = client.get("/todos", params={"status": "completed"})
+    assert [t["id"] for t in response.json()] == [completed_id]
+
+    response = client.get("/todos", params={"status": "incomplete"})
+    assert [t["id"] for t in response.json()] == [sample_id, no_date_id]
+
+    response = client.get("/todos", params={"status": "overdue"})
+    assert [t["id"] for t in response.json()] == [sample_id]
+
+def test_list_todos_invalid_status(client):
+    response = client.get("/todos", params={"status": "archived"})
+    assert response.status_code == 422
+
+def test_list_todos_sorted(client):
+    client.post("/todos", json={"title": "b", "due_date": "2025-03-01"})
+    client.post("/todos", json={"title": "c"})
+    client.post("/todos", json={"title": "a", "due_date": "2025-01-01"})
+
+    response = client.get("/todos", params={"sort": "title"})
+    assert [t["title"] for t in response.json()] == ["a", "b", "c"]
+
+    response = client.get("/todos", params={"sort": "due_date"})
+    assert [t["title"] for t in response.json()] == ["a", "b", "c"]
+
+def test_list_todos_paginated_by_due_date(client):
+    for title, due_date in [("b", "2025-03-01"), ("d", None), ("a", "2025-01-01"), ("e", None), ("c", "2025-03-01")]:
+        client.post("/todos", json={"title": title, "due_date": due_date})
+
+    titles, cursor = [], None
+    while True:
+        params = {"sort": "due_date", "limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/todos", params=params)
+        titles.extend(t["title"] for t in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert titles == ["a", "b", "c", "d", "e"]
+
+def test_list_todos_cursor_from_other_sort(client):
+    for i in range(3):
+        client.post("/todos", json={"title": f"Todo {i}"})
+    cursor = client.get("/todos", params={"limit": 1}).headers["X-Next-Cursor"]
+    response = client.get("/todos", params={"limit": 1, "cursor": cursor, "sort": "title"})
+    assert response.status_code == 400
+
+def test_complete_todo_already_completed(client, completed_todo):
+    response = client.patch(f"/todos/{completed_todo.id}/complete")
+    assert response.status_code == 404
+    assert response.json()["detail"] == f"Todo with id {completed_todo.id} is already completed"
+
+def test_delete_all_todos(client, sample_todo, completed_todo):
+    response = client.delete("/todos")
+    assert response.status_code == 204
+    assert client.get("/todos").json() == []
+
+def test_bulk_create_todos(client):
+    response = client.post(
+        "/todos/bulk",
+        json=[{"title": "First", "due_date": "2025-01-01"}, {"title": "Second", "due_date": ""}]
+    )
+    assert response.status_code == 200
+    results = response.json()
+    assert [r["status"] for r in results] == [200, 200]
+    assert [r["todo"]["title"] for r in results] == ["First", "Second"]
+    assert results[1]["todo"]["due_date"] is None
+    assert results[0]["todo"]["is_completed"] is False
+    assert len(client.get("/todos").json()) == 2
+
+def test_bulk_create_todos_validation(client):
+    response = client.post("/todos/bulk", json=[{"title": "Valid"}, {"title": ""}])
+    assert response.status_code == 422
+    assert client.get("/todos").json() == []
+
+def test_bulk_update_todos(client, sample_todo, completed_todo):
+    sample_id, completed_id = sample_todo.id, completed_todo.id
+    response = client.patch(
+        "/todos/bulk",
+        json=[
+            {"id": sample_id, "is_completed": True},
+            {"id": 999, "title": "Missing"},
+            {"id": completed_id, "title": "Renamed", "is_completed": False},
+        ]
+    )
+    assert response.status_code == 200
+    results = response.json()
+    assert [r["status"] for r in results] == [200, 404, 200]
+    assert results[0]["todo"]["is_completed"] is True
+    assert results[0]["todo"]["title"] == "Test Todo"
+    assert results[1]["detail"] == "Todo with id 999 not found"
+    assert results[2]["todo"]["title"] == "Renamed"
+    assert results[2]["todo"]["is_completed"] is False
+
+def test_bulk_delete_todos(client, sample_todo, completed_todo):
+    sample_id, completed_id = sample_todo.id, completed_todo.id
+    response = client.request("DELETE", "/todos/bulk", json=[sample_id, 999, completed_id])
+    assert response.status_code == 200
+    assert [r["status"] for r in response.json()] == [204, 404, 204]
+    assert client.get("/todos").json() == []
+
+def test_bulk_delete_todos_empty(client):
+    response = client.request("DELETE", "/todos/bulk", json=[])
+    assert response.status_code == 422
+
+def test_export_todos_ndjson(client, sample_todo, no_date_todo, completed_todo):
+    response = client.get("/todos/export")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert [row["title"] for row in rows] == ["Test Todo", "No Date Todo", "Completed Todo"]
+    assert rows[0]["due_date"] == "2024-12-31"
+    assert rows[1]["due_date"] is None
+
+def test_export_todos_csv_filtered(client, sample_todo, no_date_todo, completed_todo):
+    response = client.get("/todos/export", params={"format": "csv", "status": "incomplete", "sort": "title"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert 'filename="todos.csv"' in response.headers["content-disposition"]
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [row["title"] for row in rows] == ["No Date Todo", "Test Todo"]
+    assert rows[0]["due_date"] == ""
+    assert rows[1]["is_completed"] == "False"
+
+def test_export_todos_empty_csv_has_header(client):
+    response = client.get("/todos/export", params={"format": "csv"})
+    assert response.text.strip() == "title,description,due_date,id,is_completed,created_at"
+
+def test_export_todos_invalid_format(client):
+    assert client.get("/todos/export", params={"format": "xml"}).status_code == 422
+
+def test_changes_full_sync_resets(client, sample_todo, no_date_todo):
+    response = client.get("/todos/changes")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["reset"] is True
+    assert [todo["id"] for todo in data["upserts"]] == [sample_todo.id, no_date_todo.id]
+    assert data["cursor"]
+
+def test_changes_since_cursor_are_incremental(client, sample_todo, no_date_todo):
+    cursor = client.get("/todos/changes").json()["cursor"]
+    assert client.get("/todos/changes", params={"since": cursor}).json() == {
+        "upserts": [], "deleted": [], "reset": False, "cursor": cursor
+    }
+
+    created = client.post("/todos", json={"title": "Later"}).json()
+    client.put(f"/todos/{sample_todo.id}", json={"title": "Renamed"})
+    client.delete(f"/todos/{no_date_todo.id}")
+
+    data = client.get("/todos/changes", params={"since": cursor}).json()
+    assert data["reset"] is False
+    assert [todo["title"] for todo in data["upserts"]] == ["Later", "Renamed"]
+    assert data["deleted"] == [no_date_todo.id]
+
+    data = client.get("/todos/changes", params={"since": data["cursor"]}).json()
+    assert data["upserts"] == [] and data["deleted"] == []
+    client.patch(f"/todos/{created['id']}/complete")
+    [todo] = client.get("/todos/changes", params={"since": data["cursor"]}).json()["upserts"]
+    assert todo["id"] == created["id"] and todo["is_completed"] is True
+
+def test_changes_after_delete_all_resets(client, sample_todo):
+    cursor = client.get("/todos/changes").json()["cursor"]
+    client.delete("/todos")
+    client.post("/todos", json={"title": "Fresh"})
+    data = client.get("/todos/changes", params={"since": cursor}).json()
+    assert data["reset"] is True
+    assert [todo["title"] for todo in data["upserts"]] == ["Fresh"]
+    assert data["deleted"] == []
+
+def test_changes_invalid_cursor(client):
+    assert client.get("/todos/changes", params={"since": "garbage"}).status_code == 400
+    list_cursor = encode_cursor("created_at", None, 1)
+    assert client.get("/todos/changes", params={"since": list_cursor}).status_code == 400
+
+def test_stats(client, sample_todo, no_date_todo, completed_todo):
+    response = client.get("/todos/stats")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total"] == 3
+    assert data["completed"] == 1
+    assert data["incomplete"] == 2
+    assert set(data) == {"total", "completed", "incomplete", "overdue", "due_today", "due_this_week"}
+
+def test_search_todos_paginates_ranked_results(client):
+    client.post("/todos/bulk", json=[{"title": f"Report {i}", "description": "weekly report"} for i in range(5)])
+    client.post("/todos", json={"title": "Other", "description": "report"})
+    seen, cursor = [], None
+    while True:
+        params = {"q": "report", "limit": 2, **({"cursor": cursor} if cursor else {})}
+        response = client.get("/todos/search", params=params)
+        assert response.status_code == 200
+        seen += [todo["title"] for todo in response.json()]
+        cursor = response.headers.get("x-next-cursor")
+        if not cursor:
+            break
+    assert len(seen) == 6 and len(set(seen)) == 6
+    assert seen[-1] == "Other"
+
+def test_search_todos_invalid_input(client):
+    assert client.get("/todos/search").status_code == 422
+    assert client.get("/todos/search", params={"q": "x", "cursor": "garbage"}).status_code == 400
+
+def test_batch_commits_every_operation(client, sample_todo, completed_todo):
+    sample_id, completed_id = sample_todo.id, completed_todo.id
+    response = client.post("/batch", json={"operations": [
+        {"op": "create", "todo": {"title": "Batched", "due_date": "2025-03-01"}},
+        {"op": "update", "id": sample_id, "todo": {"title": "Renamed"}},
+        {"op": "complete", "id": sample_id},
+        {"op": "incomplete", "id": completed_id},
+        {"op": "delete", "id": completed_id},
+    ]})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["committed"] is True
+    assert [r["status"] for r in data["results"]] == [200, 200, 200, 200, 204]
+    assert data["results"][0]["todo"]["title"] == "Batched"
+    assert data["results"][1]["todo"]["is_completed"] is False
+    assert data["results"][2]["todo"]["title"] == "Renamed"
+    todos = client.get("/todos").json()
+    assert sorted((t["title"], t["is_completed"]) for t in todos) == [("Batched", False), ("Renamed", True)]
+
+def test_batch_atomic_failure_rolls_back(client, sample_todo):
+    sample_id = sample_todo.id
+    response = client.post("/batch", json={"operations": [
+        {"op": "create", "todo": {"title": "Rolled back"}},
+        {"op": "complete", "id": sample_id},
+        {"op": "delete", "id": 999},
+        {"op": "update", "id": sample_id, "todo": {"title": "Never"}},
+    ]})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["committed"] is False
+    assert [r["status"] for r in data["results"]] == [424, 424, 404, 424]
+    assert data["results"][2]["detail"] == "Todo with id 999 not found"
+    assert data["results"][0]["detail"] == "Not applied: operation 2 failed"
+    todos = client.get("/todos").json()
+    assert [(t["title"], t["is_completed"]) for t in todos] == [("Test Todo", False)]
+
+def test_batch_continue_on_error_keeps_successes(client, sample_todo, completed_todo):
+    sample_id, completed_id = sample_todo.id, completed_todo.id
+    response = client.post("/batch", json={"atomic": False, "operations": [
+        {"op": "create", "todo": {"title": "Kept"}},
+        {"op": "complete", "id": completed_id},
+        {"op": "update", "id": 999, "todo": {"title": "Missing"}},
+        {"op": "delete", "id": sample_id},
+    ]})
+    data = response.json()
+    assert data["committed"] is True
+    assert [r["status"] for r in data["results"]] == [200, 404, 404, 204]
+    assert data["results"][1]["detail"] == f"Todo with id {completed_id} is already completed"
+    assert data["results"][2] == {"id": 999, "status": 404, "todo": None, "detail": "Todo with id 999 not found"}
+    assert sorted(t["title"] for t in client.get("/todos").json()) == ["Completed Todo", "Kept"]
+    # Versions taken by undone operations were rolled back with them.
+    changes = client.get("/todos/changes").json()
+    assert sorted(t["title"] for t in changes["upserts"]) == ["Completed Todo", "Kept"]
+
+def test_batch_validation(client):
+    assert client.post("/batch", json={"operations": []}).status_code == 422
+    assert client.post("/batch", json={"operations": [{"op": "archive", "id": 1}]}).status_code == 422
+    assert client.post("/batch", json={"operations": [{"op": "update", "todo": {}}]}).status_code == 422
+    # Request validation covers the whole batch, as it does the bulk endpoints.
+    response = client.post("/batch", json={"operations": [{"op": "create", "todo": {"title": "Valid"}}, {"op": "create", "todo": {"title": ""}}]})
+    assert response.status_code == 422
+    assert client.get("/todos").json() == []
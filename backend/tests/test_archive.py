@@ -0,0 +1,138 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from app.archive import archive_completed, prune_changes
+from app.models import ArchivedTodo, Todo, TodoChange, TodoTombstone
+from app.repositories.todo_repository import TodoRepository
+from app.services.todo_service import TodoService
+
+OLD = datetime.utcnow() - timedelta(days=100)
+
+@pytest.fixture
+def todos(db_session):
+    rows = [
+        Todo(title="Old done 1", is_completed=True, created_at=OLD, updated_at=OLD, due_date=date(2024, 1, 1)),
+        Todo(title="Old done 2", is_completed=True, created_at=OLD, updated_at=OLD + timedelta(hours=1)),
+        Todo(title="Old open", is_completed=False, created_at=OLD, updated_at=OLD),
+        Todo(title="Recent done", is_completed=True),
+    ]
+    db_session.add_all(rows)
+    db_session.commit()
+    return {todo.title: todo.id for todo in rows}
+
+def _archive(db_session, batch_size=1000) -> int:
+    return archive_completed(lambda: db_session, 90, batch_size)
+
+def _titles(response):
+    return [todo["title"] for todo in response.json()]
+
+def test_archives_old_completed_todos_in_batches(db_session, todos):
+    assert _archive(db_session, batch_size=1) == 2
+    assert sorted(todo.title for todo in db_session.query(ArchivedTodo)) == ["Old done 1", "Old done 2"]
+    assert sorted(todo.title for todo in db_session.query(Todo)) == ["Old open", "Recent done"]
+    assert db_session.get(ArchivedTodo, todos["Old done 1"]).due_date == date(2024, 1, 1)
+    assert _archive(db_session) == 0
+
+def test_listings_skip_archived_todos_unless_asked(client, db_session, todos):
+    _archive(db_session)
+    assert _titles(client.get("/todos")) == ["Old open", "Recent done"]
+    response = client.get("/todos", params={"include_archived": True, "status": "completed"})
+    assert _titles(response) == ["Old done 1", "Old done 2", "Recent done"]
+
+    pages = []
+    cursor = None
+    while True:
+        params = {"include_archived": True, "sort": "title", "limit": 3}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/todos", params=params)
+        pages.append(_titles(response))
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            break
+    assert pages == [["Old done 1", "Old done 2", "Old open"], ["Recent done"]]
+
+def test_archived_todos_are_readable_and_reopening_restores_them(client, db_session, todos):
+    _archive(db_session)
+    todo_id = todos["Old done 1"]
+    assert client.get(f"/todos/{todo_id}").json()["title"] == "Old done 1"
+    response = client.patch(f"/todos/{todo_id}/complete")
+    assert response.status_code == 404
+    assert "already completed" in response.json()["detail"]
+
+    response = client.patch(f"/todos/{todo_id}/incomplete")
+    assert response.status_code == 200
+    assert response.json()["id"] == todo_id
+    assert response.json()["is_completed"] is False
+    assert db_session.get(ArchivedTodo, todo_id) is None
+    assert "Old done 1" in _titles(client.get("/todos"))
+
+def test_updating_an_archived_todo_restores_it(client, db_session, todos):
+    _archive(db_session)
+    todo_id = todos["Old done 1"]
+    response = client.put(f"/todos/{todo_id}", json={"title": "Updated"})
+    assert response.status_code == 200
+    assert (response.json()["title"], response.json()["is_completed"]) == ("Updated", True)
+    assert db_session.get(ArchivedTodo, todo_id) is None
+
+    todo_id = todos["Old done 2"]
+    response = client.patch("/todos/bulk", json=[{"id": todo_id, "is_completed": False}, {"id": 999999, "title": "x"}])
+    assert [result["status"] for result in response.json()] == [200, 404]
+    assert response.json()[0]["todo"]["is_completed"] is False
+    assert sorted(_titles(client.get("/todos"))) == ["Old done 2", "Old open", "Recent done", "Updated"]
+
+def test_deleting_an_archived_todo(client, db_session, todos):
+    _archive(db_session)
+    todo_id = todos["Old done 2"]
+    assert client.delete(f"/todos/{todo_id}").status_code == 204
+    assert client.get(f"/todos/{todo_id}").status_code == 404
+    assert client.delete(f"/todos/{todo_id}").status_code == 404
+
+def test_change_feed_reports_archived_todos_as_deleted(client, db_session, todos):
+    cursor = client.get("/todos/changes").json()["cursor"]
+    _archive(db_session)
+    changes = client.get("/todos/changes", params={"since": cursor}).json()
+    assert sorted(changes["deleted"]) == sorted([todos["Old done 1"], todos["Old done 2"]])
+
+def test_stats_counts_follow_archiving_and_restoring(db_session, todos):
+    repository = TodoRepository(db_session, counts=True)
+    repository.rebuild_counts()
+    service = TodoService(repository)
+    service.archive_todos(datetime.utcnow() - timedelta(days=90), 1000)
+    assert service.get_stats().completed == 1
+    service.incomplete_todo(todos["Old done 1"])
+    stats = service.get_stats()
+    assert (stats.total, stats.completed) == (3, 1)
+    assert stats == TodoService(TodoRepository(db_session)).get_stats()
+
+def test_stats_include_archived_todos_when_asked(client, db_session, todos):
+    _archive(db_session)
+    assert client.get("/todos/stats").json()["total"] == 2
+    stats = client.get("/todos/stats", params={"include_archived": True}).json()
+    assert (stats["total"], stats["completed"], stats["incomplete"]) == (4, 3, 1)
+
+def test_pruning_the_change_feed_resets_older_cursors(client, db_session, todos):
+    old_cursor = client.get("/todos/changes").json()["cursor"]
+    client.delete(f"/todos/{todos['Old open']}")
+    cursor = client.get("/todos/changes").json()["cursor"]
+    client.delete(f"/todos/{todos['Recent done']}")
+    # Only the first deletion, and the change log, are past the retention period.
+    db_session.query(TodoTombstone).filter_by(todo_id=todos["Old open"]).update({"deleted_at": OLD})
+    db_session.query(TodoChange).update({"changed_at": OLD})
+    db_session.commit()
+
+    assert prune_changes(lambda: db_session, 0) == 0
+    assert prune_changes(lambda: db_session, 30) == 1
+    assert prune_changes(lambda: db_session, 30) == 0
+    # The newest change-log row stays: SQLite's watermark reads it.
+    assert db_session.query(TodoChange).count() == 1
+
+    changes = client.get("/todos/changes", params={"since": old_cursor}).json()
+    assert changes["reset"] is True
+    assert sorted(todo["title"] for todo in changes["upserts"]) == ["Old done 1", "Old done 2"]
+    changes = client.get("/todos/changes", params={"since": cursor}).json()
+    assert (changes["reset"], changes["deleted"]) == (False, [todos["Recent done"]])
+    client.post("/todos", json={"title": "New"})
+    changes = client.get("/todos/changes", params={"since": changes["cursor"]}).json()
+    assert (changes["reset"], [todo["title"] for todo in changes["upserts"]]) == (False, ["New"])
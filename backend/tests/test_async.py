@@ -0,0 +1,173 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from app import async_routes, routes
+from app.async_database import get_async_db, to_async_url
+from app.database import Base
+
+@pytest.fixture
+def async_client(tmp_path):
+    url = f"sqlite:///{tmp_path / 'async.db'}"
+    sync_engine = create_engine(url)
+    Base.metadata.create_all(bind=sync_engine)
+    async_engine = create_async_engine(to_async_url(url), poolclass=NullPool)
+    AsyncTestingSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+    async def override_get_async_db():
+        async with AsyncTestingSessionLocal() as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(async_routes.overlay(routes.router))
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    with TestClient(app) as client:
+        yield client
+    asyncio.run(async_engine.dispose())
+    sync_engine.dispose()
+
+def test_to_async_url():
+    assert to_async_url("postgresql+psycopg2://todo:todo@db:5432/tododb") == "postgresql+asyncpg://todo:todo@db:5432/tododb"
+    assert to_async_url("sqlite:///./test.db") == "sqlite+aiosqlite:///./test.db"
+
+def test_overlay_swaps_in_async_handlers():
+    merged = async_routes.overlay(routes.router)
+    async_keys = {(r.path, frozenset(r.methods)) for r in async_routes.router.routes}
+    assert len(merged.routes) == len(routes.router.routes)
+    for sync_route, merged_route in zip(routes.router.routes, merged.routes):
+        if (sync_route.path, frozenset(sync_route.methods)) in async_keys:
+            assert asyncio.iscoroutinefunction(merged_route.endpoint)
+        else:
+            assert merged_route is sync_route
+    assert any(r.path == "/todos/{todo_id}" and asyncio.iscoroutinefunction(r.endpoint) for r in merged.routes)
+
+def test_async_crud_round_trip(async_client):
+    response = async_client.post("/todos", json={"title": "Async Todo", "due_date": "2025-04-01"})
+    assert response.status_code == 200
+    todo_id = response.json()["id"]
+
+    response = async_client.put(f"/todos/{todo_id}", json={"title": "Renamed"})
+    assert response.json()["title"] == "Renamed"
+
+    response = async_client.patch(f"/todos/{todo_id}/complete")
+    assert response.json()["is_completed"] is True
+
+    response = async_client.patch(f"/todos/{todo_id}/complete")
+    assert response.status_code == 404
+    assert response.json()["detail"] == f"Todo with id {todo_id} is already completed"
+
+    response = async_client.patch(f"/todos/{todo_id}/incomplete")
+    assert response.json()["is_completed"] is False
+
+    assert async_client.delete(f"/todos/{todo_id}").status_code == 204
+    assert async_client.get(f"/todos/{todo_id}").status_code == 404
+
+def test_async_list_and_bulk(async_client):
+    response = async_client.post("/todos/bulk", json=[{"title": f"Todo {i}"} for i in range(3)])
+    ids = [r["id"] for r in response.json()]
+
+    response = async_client.get("/todos", params={"limit": 2})
+    assert [t["id"] for t in response.json()] == ids[:2]
+    assert "X-Next-Cursor" in response.headers
+
+    response = async_client.patch("/todos/bulk", json=[{"id": ids[0], "is_completed": True}, {"id": 999}])
+    assert [r["status"] for r in response.json()] == [200, 404]
+    assert [t["id"] for t in async_client.get("/todos", params={"status": "completed"}).json()] == [ids[0]]
+
+    response = async_client.request("DELETE", "/todos/bulk", json=ids[1:])
+    assert [r["status"] for r in response.json()] == [204, 204]
+    assert async_client.delete("/todos").status_code == 204
+    assert async_client.get("/todos").json() == []
+
+def test_async_not_found(async_client):
+    assert async_client.get("/todos/999").json()["detail"] == "Todo with id 999 not found"
+    assert async_client.put("/todos/999", json={"title": "x"}).status_code == 404
+    assert async_client.delete("/todos/999").status_code == 404
+    assert async_client.patch("/todos/999/incomplete").status_code == 404
+
+def test_async_changes(async_client):
+    first = async_client.post("/todos", json={"title": "Kept"}).json()
+    second = async_client.post("/todos", json={"title": "Dropped"}).json()
+    cursor = async_client.get("/todos/changes").json()["cursor"]
+    async_client.patch(f"/todos/{first['id']}/complete")
+    async_client.delete(f"/todos/{second['id']}")
+    data = async_client.get("/todos/changes", params={"since": cursor}).json()
+    assert data["reset"] is False
+    assert [todo["id"] for todo in data["upserts"]] == [first["id"]]
+    assert data["deleted"] == [second["id"]]
+
+def test_async_stats(async_client):
+    async_client.post("/todos", json={"title": "Open"})
+    done = async_client.post("/todos", json={"title": "Done"}).json()
+    async_client.patch(f"/todos/{done['id']}/complete")
+    data = async_client.get("/todos/stats").json()
+    assert (data["total"], data["completed"], data["incomplete"]) == (2, 1, 1)
+
+def test_async_search(async_client):
+    async_client.post("/todos", json={"title": "Pay taxes"})
+    async_client.post("/todos", json={"title": "Water garden"})
+    assert [todo["title"] for todo in async_client.get("/todos/search", params={"q": "taxes"}).json()] == ["Pay taxes"]
+
+def test_async_batch(async_client):
+    kept = async_client.post("/todos", json={"title": "Kept"}).json()
+    atomic = async_client.post("/batch", json={"operations": [
+        {"op": "create", "todo": {"title": "Rolled back"}},
+        {"op": "complete", "id": 999},
+    ]}).json()
+    assert atomic["committed"] is False
+    assert [r["status"] for r in atomic["results"]] == [424, 404]
+    partial = async_client.post("/batch", json={"atomic": False, "operations": [
+        {"op": "complete", "id": kept["id"]},
+        {"op": "delete", "id": 999},
+        {"op": "create", "todo": {"title": "Added"}},
+    ]}).json()
+    assert partial["committed"] is True
+    assert [r["status"] for r in partial["results"]] == [200, 404, 200]
+    todos = async_client.get("/todos").json()
+    assert [(t["title"], t["is_completed"]) for t in todos] == [("Kept", True), ("Added", False)]
+
+def test_async_reads_use_replicas(async_client, tmp_path, monkeypatch):
+    from app import async_database
+    from app.replicas import AsyncReplicaSet
+
+    url = f"sqlite:///{tmp_path / 'replica.db'}"
+    replica_engine = create_engine(url)
+    Base.metadata.create_all(bind=replica_engine)
+    replica_engine.dispose()
+    replica_set = AsyncReplicaSet([async_database._replica(url)], check_seconds=0, retry_seconds=60)
+    monkeypatch.setattr(async_database, "async_replica_set", replica_set)
+
+    response = async_client.post("/todos", json={"title": "On the primary"})
+    assert response.status_code == 200
+    # The empty replica answers reads.
+    assert async_client.get("/todos").json() == []
+    assert async_client.get(f"/todos/{response.json()['id']}").status_code == 404
+    asyncio.run(replica_set.replicas[0].engine.dispose())
+
+def test_async_archived_todos(async_client, tmp_path):
+    from sqlalchemy.orm import sessionmaker
+
+    from app.archive import archive_completed
+
+    todo_id = async_client.post("/todos", json={"title": "Done long ago"}).json()["id"]
+    async_client.patch(f"/todos/{todo_id}/complete")
+    engine = create_engine(f"sqlite:///{tmp_path / 'async.db'}")
+    assert archive_completed(sessionmaker(bind=engine), -1, 10) == 1
+    engine.dispose()
+
+    assert async_client.get("/todos").json() == []
+    assert [todo["id"] for todo in async_client.get("/todos", params={"include_archived": True}).json()] == [todo_id]
+    assert async_client.get(f"/todos/{todo_id}").json()["is_completed"] is True
+    assert async_client.patch(f"/todos/{todo_id}/incomplete").json()["is_completed"] is False
+    assert [todo["id"] for todo in async_client.get("/todos").json()] == [todo_id]
+    async_client.patch(f"/todos/{todo_id}/complete")
+    assert archive_completed(sessionmaker(bind=engine), -1, 10) == 1
+    engine.dispose()
+    assert async_client.get("/todos/stats", params={"include_archived": True}).json()["completed"] == 1
+    assert async_client.put(f"/todos/{todo_id}", json={"title": "Restored"}).json()["title"] == "Restored"
+    assert async_client.get("/todos/stats").json()["completed"] == 1
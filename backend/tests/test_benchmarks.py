@@ -0,0 +1,37 @@
+from datetime import date
+
+from benchmarks import datagen
+from benchmarks.harness import Result, compare, load_results, summarize, write_results
+
+def _result(name: str, median_ms: float) -> Result:
+    return summarize("sqlite-memory", 1000, "repository", name, [median_ms])
+
+def test_generated_rows_are_deterministic_and_realistic():
+    today = date(2025, 6, 1)
+    rows = list(datagen.generate_rows(5000, seed=1, today=today))
+    assert rows == list(datagen.generate_rows(5000, seed=1, today=today))
+
+    dated = [row for row in rows if row["due_date"] is not None]
+    past = [row for row in dated if row["due_date"] < today]
+    future = [row for row in dated if row["due_date"] >= today]
+    assert 0.25 < 1 - len(dated) / len(rows) < 0.35
+    assert sum(row["is_completed"] for row in past) / len(past) > 0.7
+    assert sum(row["is_completed"] for row in future) / len(future) < 0.25
+    assert all(row["created_at"].date() <= today for row in rows)
+
+def test_compare_flags_regressions_over_threshold():
+    baseline = [_result("get_by_id", 1.0), _result("get_page", 2.0), _result("removed", 1.0)]
+    current = [_result("get_by_id", 1.3), _result("get_page", 2.1), _result("added", 1.0)]
+    comparisons, regressions = compare(baseline, current, threshold=0.2)
+    assert {c.key[-1] for c in comparisons} == {"get_by_id", "get_page"}
+    assert [c.key[-1] for c in regressions] == ["get_by_id"]
+
+def test_compare_ignores_sub_noise_slowdowns():
+    _, regressions = compare([_result("fast", 0.01)], [_result("fast", 0.03)], threshold=0.2)
+    assert regressions == []
+
+def test_results_round_trip(tmp_path):
+    path = tmp_path / "results.json"
+    results = [_result("get_by_id", 1.0)]
+    write_results(str(path), results, {"rows": [1000]})
+    assert load_results(str(path)) == results
@@ -0,0 +1,103 @@
+import time
+
+import pytest
+from sqlalchemy import event
+
+from app import cache
+from app.cache import LRUCache
+from app.repositories.todo_repository import TodoRepository
+from app.services.todo_service import TodoService
+
+@pytest.fixture
+def todo_cache(monkeypatch):
+    todo_cache = LRUCache(max_entries=2, ttl_seconds=60)
+    monkeypatch.setattr(cache, "todo_cache", todo_cache)
+    return todo_cache
+
+def test_lru_eviction():
+    lru = LRUCache(max_entries=2, ttl_seconds=0)
+    for key in (1, 2):
+        lru.fill(key, str(key), lru.generation())
+    assert lru.get(1) == "1"
+    lru.fill(3, "3", lru.generation())
+    assert lru.get(2) is None
+    assert lru.get(1) == "1"
+    assert lru.stats()["evictions"] == 1
+
+def test_ttl_expiry():
+    lru = LRUCache(max_entries=10, ttl_seconds=0.01)
+    lru.fill(1, "1", lru.generation())
+    time.sleep(0.02)
+    assert lru.get(1) is None
+    assert lru.stats()["expirations"] == 1
+
+def test_fill_after_invalidation_is_rejected():
+    lru = LRUCache(max_entries=10, ttl_seconds=0)
+    generation = lru.generation()
+    lru.invalidate([1])
+    assert lru.fill(1, "stale", generation) is False
+    assert lru.get(1) is None
+
+def test_fills_older_than_a_recent_write_are_rejected():
+    lru = LRUCache(max_entries=10, ttl_seconds=0, floor_seconds=0.05)
+    lru.invalidate([1], version=5)
+    assert lru.fill(1, "lagging", lru.generation(), version=4) is False
+    assert lru.fill(2, "other", lru.generation(), version=1) is True
+    assert lru.fill(1, "current", lru.generation(), version=5) is True
+    lru.clear(version=8)
+    assert lru.fill(2, "lagging", lru.generation(), version=1) is False
+    assert lru.stats()["stale_fills"] == 2
+    time.sleep(0.06)
+    # Past the window replicas are assumed to have caught up.
+    assert lru.fill(2, "old", lru.generation(), version=1) is True
+
+def test_cache_hit_skips_database(db_session, sample_todo, todo_cache):
+    service = TodoService(TodoRepository(db_session), todo_cache)
+    todo_id = sample_todo.id
+    service.get_todo(todo_id)
+
+    statements = []
+    engine = db_session.get_bind()
+    listener = lambda *args: statements.append(args[2])
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        assert service.get_todo(todo_id).title == "Test Todo"
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert statements == []
+    assert todo_cache.stats()["hits"] == 1
+
+def test_writes_invalidate_cached_todo(client, sample_todo, todo_cache):
+    todo_id = sample_todo.id
+    assert client.get(f"/todos/{todo_id}").json()["is_completed"] is False
+
+    client.patch(f"/todos/{todo_id}/complete")
+    assert client.get(f"/todos/{todo_id}").json()["is_completed"] is True
+
+    client.put(f"/todos/{todo_id}", json={"title": "Renamed"})
+    assert client.get(f"/todos/{todo_id}").json()["title"] == "Renamed"
+
+    client.patch("/todos/bulk", json=[{"id": todo_id, "title": "Bulk renamed"}])
+    assert client.get(f"/todos/{todo_id}").json()["title"] == "Bulk renamed"
+
+    client.delete(f"/todos/{todo_id}")
+    assert client.get(f"/todos/{todo_id}").status_code == 404
+
+def test_delete_all_clears_cache(client, sample_todo, todo_cache):
+    todo_id = sample_todo.id
+    client.get(f"/todos/{todo_id}")
+    client.delete("/todos")
+    assert client.get(f"/todos/{todo_id}").status_code == 404
+    assert todo_cache.stats()["size"] == 0
+
+def test_internal_cache_endpoint(client, sample_todo, todo_cache):
+    todo_id = sample_todo.id
+    client.get(f"/todos/{todo_id}")
+    client.get(f"/todos/{todo_id}")
+    data = client.get("/internal/cache").json()
+    assert data["enabled"] is True
+    assert data["hits"] == 1
+    assert data["misses"] == 1
+
+def test_internal_cache_endpoint_disabled(client):
+    assert client.get("/internal/cache").json() == {"enabled": False}
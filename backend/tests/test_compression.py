@@ -0,0 +1,98 @@
+import gzip
+
+import brotli
+import pytest
+import zstandard
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.middleware.compression import ENCODERS, CompressionMiddleware, choose_encoding
+from app.models import Todo
+
+BODY = "todo " * 1000
+
+def _raw(client, path, accept_encoding):
+    with client.stream("GET", path, headers={"Accept-Encoding": accept_encoding}) as response:
+        return response, b"".join(response.iter_raw())
+
+@pytest.fixture
+def app_client():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=100, route_levels={"/fast": {"gzip": 1}})
+
+    @app.get("/small")
+    def small():
+        return PlainTextResponse("todo")
+
+    @app.get("/large")
+    def large():
+        return PlainTextResponse(BODY)
+
+    @app.get("/fast")
+    def fast():
+        return PlainTextResponse(BODY)
+
+    @app.get("/stream")
+    def stream():
+        return StreamingResponse(iter(["todo\n"] * 3), media_type="application/x-ndjson")
+
+    @app.get("/events")
+    def events():
+        return StreamingResponse(iter(["data: todo\n\n"] * 50), media_type="text/event-stream")
+
+    return TestClient(app)
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip, deflate, br, zstd", "zstd"),
+    ("gzip, br;q=0.9", "gzip"),
+    ("br, zstd;q=0", "br"),
+    ("*", "zstd"),
+    ("identity", None),
+    ("", None),
+])
+def test_choose_encoding(header, expected):
+    assert choose_encoding(header, ENCODERS) == expected
+
+@pytest.mark.parametrize("encoding, decompress", [
+    ("gzip", gzip.decompress),
+    ("br", brotli.decompress),
+    ("zstd", lambda data: zstandard.ZstdDecompressor().decompressobj().decompress(data)),
+])
+def test_compresses_large_responses(app_client, encoding, decompress):
+    response, body = _raw(app_client, "/large", encoding)
+    assert response.headers["Content-Encoding"] == encoding
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert int(response.headers["Content-Length"]) == len(body) < len(BODY)
+    assert decompress(body) == BODY.encode()
+
+def test_small_and_unaccepted_responses_are_sent_as_they_are(app_client):
+    response, body = _raw(app_client, "/small", "gzip")
+    assert "Content-Encoding" not in response.headers
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert body == b"todo"
+    response, body = _raw(app_client, "/large", "identity")
+    assert "Content-Encoding" not in response.headers
+    assert body == BODY.encode()
+
+def test_route_levels(app_client):
+    _, default = _raw(app_client, "/large", "gzip")
+    _, fast = _raw(app_client, "/fast", "gzip")
+    assert default == ENCODERS["gzip"](6).finish(BODY.encode())
+    assert fast == ENCODERS["gzip"](1).finish(BODY.encode())
+
+def test_streams_are_compressed_chunk_by_chunk_except_event_streams(app_client):
+    response, body = _raw(app_client, "/stream", "gzip")
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Content-Length" not in response.headers
+    assert gzip.decompress(body) == b"todo\n" * 3
+    response, body = _raw(app_client, "/events", "gzip")
+    assert "Content-Encoding" not in response.headers
+    assert body == b"data: todo\n\n" * 50
+
+def test_todo_list_is_compressed(client, db_session):
+    db_session.add_all(Todo(title=f"Todo {i}", description="Compress me") for i in range(50))
+    db_session.commit()
+    response = client.get("/todos", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert len(response.json()) == 50
@@ -0,0 +1,194 @@
+import asyncio
+
+import orjson
+
+from app import events, routes
+from app.events import HEARTBEAT, EventBroadcaster, format_event, read_committed
+from app.pagination import decode_version_cursor
+from app.repositories.todo_repository import TodoRepository
+from app.schemas import TodoCreate, TodoUpdate
+from app.services.todo_service import TodoService
+
+def _broadcaster(**overrides) -> EventBroadcaster:
+    options = {"max_queued": 10, "history": 100, "heartbeat_seconds": 60.0, "max_subscribers": 100}
+    options.update(overrides)
+    return EventBroadcaster(**options)
+
+def test_publish_from_a_thread_fans_out_one_frame():
+    broadcaster = _broadcaster()
+
+    async def scenario():
+        streams = [broadcaster.stream(), broadcaster.stream()]
+        pending = [asyncio.ensure_future(anext(stream)) for stream in streams]
+        await asyncio.sleep(0)
+        assert broadcaster.subscribers == 2
+        await asyncio.to_thread(broadcaster.publish, 7, "created", [{"id": 1}])
+        frames = await asyncio.gather(*pending)
+        for stream in streams:
+            await stream.aclose()
+        return frames
+
+    first, second = asyncio.run(scenario())
+    assert first == b'id: 7\nevent: created\ndata: [{"id":1}]\n\n'
+    assert second is first
+    assert broadcaster.subscribers == 0
+
+def test_slow_subscriber_is_disconnected():
+    broadcaster = _broadcaster(max_queued=2)
+
+    async def scenario():
+        stream = broadcaster.stream()
+        first = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0)
+        broadcaster.publish(1, "deleted", [1])
+        await first
+        for version in range(2, 5):
+            broadcaster.publish(version, "deleted", [version])
+        return [frame async for frame in stream]
+
+    assert asyncio.run(scenario()) == []
+    assert broadcaster.dropped == 1
+    assert broadcaster.subscribers == 0
+
+def test_resume_replays_history_or_asks_for_resync():
+    broadcaster = _broadcaster()
+    for version in (1, 2, 3):
+        broadcaster.publish(version, "deleted", [version])
+
+    async def first_frames(last_event_id, count):
+        stream = broadcaster.stream(last_event_id)
+        frames = [await anext(stream) for _ in range(count)]
+        await stream.aclose()
+        return frames
+
+    assert asyncio.run(first_frames(1, 2)) == [format_event(2, "deleted", [2]), format_event(3, "deleted", [3])]
+    [resync] = asyncio.run(first_frames(99, 1))
+    assert resync.startswith(b"event: resync\n")
+    payload = orjson.loads(resync.split(b"data: ")[1])
+    assert decode_version_cursor(payload["cursor"]) == 99
+
+def test_idle_subscribers_get_heartbeats():
+    broadcaster = _broadcaster(heartbeat_seconds=0.01)
+
+    async def scenario():
+        stream = broadcaster.stream()
+        frame = await asyncio.wait_for(anext(stream), 1)
+        await stream.aclose()
+        return frame
+
+    assert asyncio.run(scenario()) == HEARTBEAT
+
+def test_writes_from_other_workers_send_a_resync(db_session):
+    broadcaster = _broadcaster()
+    here = TodoService(TodoRepository(db_session), events=broadcaster)
+    elsewhere = TodoService(TodoRepository(db_session))
+
+    def reconcile():
+        broadcaster.reconcile(*read_committed(lambda: db_session, broadcaster.covered()))
+
+    async def scenario():
+        stream = broadcaster.stream()
+        first = asyncio.ensure_future(anext(stream))
+        await asyncio.sleep(0)
+        here.create_todo(TodoCreate(title="Before"))
+        reconcile()
+        start = broadcaster.covered()
+        here.create_todo(TodoCreate(title="Here"))
+        elsewhere.create_todo(TodoCreate(title="Elsewhere"))
+        reconcile()
+        here.create_todo(TodoCreate(title="Here again"))
+        reconcile()
+        frames = [await first] + [await asyncio.wait_for(anext(stream), 1) for _ in range(3)]
+        await stream.aclose()
+        return start, frames
+
+    start, frames = asyncio.run(scenario())
+    assert [frame.split(b"\n")[1] for frame in frames] == [
+        b"event: created", b"event: created", b"event: resync", b"event: created"
+    ]
+    payload = orjson.loads(frames[2].split(b"data: ")[1])
+    assert decode_version_cursor(payload["cursor"]) == start
+    changes = TodoRepository(db_session).get_changes(start)
+    assert [todo.title for todo in changes.upserts] == ["Here", "Elsewhere", "Here again"]
+    assert broadcaster.resyncs == 1
+
+class RecordingBroadcaster:
+    def __init__(self):
+        self.published = []
+
+    def publish(self, event_id, event, data):
+        self.published.append((event_id, event, data))
+
+def test_service_publishes_committed_writes_with_their_versions(db_session):
+    recorder = RecordingBroadcaster()
+    service = TodoService(TodoRepository(db_session), events=recorder)
+    todo = service.create_todo(TodoCreate(title="Streamed"))
+    service.complete_todo(todo.id)
+    service.delete_todos([todo.id, 999])
+    service.delete_all_todos()
+
+    assert [event for _, event, _ in recorder.published] == ["created", "completed", "deleted", "cleared"]
+    versions = [event_id for event_id, _, _ in recorder.published]
+    assert versions == sorted(versions) and versions[-1] == TodoRepository(db_session).current_version()
+    assert recorder.published[1][2][0]["is_completed"] is True
+    assert recorder.published[2][2] == [todo.id]
+    assert recorder.published[3][2] == {"deleted": 0}
+
+def test_operations_that_take_no_version_publish_nothing(db_session):
+    recorder = RecordingBroadcaster()
+    service = TodoService(TodoRepository(db_session), events=recorder)
+    with service.transaction():
+        with service.savepoint():
+            todo = service.create_todo(TodoCreate(title="Batched"))
+        with service.savepoint():
+            service.update_todo(todo.id, TodoUpdate())
+        with service.savepoint():
+            service.complete_todo(todo.id)
+    service.update_todo(todo.id, TodoUpdate())
+    assert [event for _, event, _ in recorder.published] == ["created", "completed"]
+    event_ids = [event_id for event_id, _, _ in recorder.published]
+    assert len(set(event_ids)) == 2
+
+def test_stream_route(client, monkeypatch):
+    broadcaster = _broadcaster(max_subscribers=0)
+    monkeypatch.setattr(events, "todo_events", broadcaster)
+    assert client.get("/todos/stream").status_code == 503
+
+    broadcaster.max_subscribers = 1
+    broadcaster.publish(1, "cleared", {"deleted": 0})
+
+    async def first_frame():
+        response = await routes.stream_todos(last_event_id=0)
+        frame = await anext(response.body_iterator)
+        await response.body_iterator.aclose()
+        return response, frame
+
+    response, frame = asyncio.run(first_frame())
+    assert response.media_type == "text/event-stream"
+    assert response.headers["cache-control"] == "no-cache"
+    assert frame.startswith(b"event: resync\n")
+
+def test_transaction_defers_events_until_commit(db_session):
+    recorder = RecordingBroadcaster()
+    service = TodoService(TodoRepository(db_session), events=recorder)
+    with service.transaction():
+        kept = service.create_todo(TodoCreate(title="Kept"))
+        try:
+            with service.savepoint():
+                service.create_todo(TodoCreate(title="Undone"))
+                raise ValueError("undo")
+        except ValueError:
+            pass
+        service.complete_todo(kept.id)
+        assert recorder.published == []
+    assert [event for _, event, _ in recorder.published] == ["created", "completed"]
+    assert [todo.title for todo in service.get_all_todos()] == ["Kept"]
+
+    try:
+        with service.transaction():
+            service.delete_todo(kept.id)
+            raise RuntimeError("abort")
+    except RuntimeError:
+        pass
+    assert len(recorder.published) == 2
+    assert service.get_todo(kept.id).is_completed is True
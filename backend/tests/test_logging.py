@@ -0,0 +1,72 @@
+import json
+import logging
+import queue
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import logging_config
+from app.logging_config import ExceptionRateLimitFilter, JSONFormatter, NonBlockingQueueHandler
+from app.middleware.error_handler import ErrorHandler
+
+def _record(exc: BaseException = None, **extra) -> logging.LogRecord:
+    exc_info = (type(exc), exc, exc.__traceback__) if exc else None
+    record = logging.LogRecord("test", logging.ERROR, __file__, 1, "failed %s", ("here",), exc_info)
+    record.__dict__.update(extra)
+    return record
+
+def _raised(exc: BaseException) -> BaseException:
+    try:
+        raise exc
+    except BaseException as caught:
+        return caught
+
+def test_json_formatter_inlines_extra_fields_and_traceback():
+    document = json.loads(JSONFormatter().format(_record(_raised(ValueError("boom")), path="/todos")))
+    assert document["message"] == "failed here"
+    assert document["level"] == "ERROR"
+    assert document["path"] == "/todos"
+    assert document["exc_type"] == "ValueError"
+    assert "ValueError: boom" in document["traceback"]
+
+def test_queue_handler_defers_formatting_and_drops_when_full():
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=1))
+    handler.handle(_record(_raised(ValueError("boom"))))
+    handler.handle(_record())
+    record = handler.queue.get_nowait()
+    assert record.msg == "failed here" and record.args is None
+    assert record.exc_info is not None and record.exc_text is None
+    assert handler.dropped == 1
+
+def test_exceptions_are_rate_limited_per_type(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(logging_config.time, "monotonic", lambda: now[0])
+    limiter = ExceptionRateLimitFilter(rate=1.0, burst=2)
+    value_error = _raised(ValueError())
+
+    assert [limiter.filter(_record(value_error)) for _ in range(4)] == [True, True, False, False]
+    assert limiter.filter(_record(_raised(KeyError())))
+    assert limiter.filter(_record())
+
+    now[0] = 1.0
+    record = _record(value_error)
+    assert limiter.filter(record)
+    assert record.suppressed == 2
+
+def test_error_handler_logs_once_and_hides_traceback_in_production(caplog):
+    app = FastAPI(debug=False)
+    app.exception_handler(Exception)(ErrorHandler.handle_exception)
+
+    @app.get("/fail")
+    def fail():
+        raise RuntimeError("database went away")
+
+    client = TestClient(app, raise_server_exceptions=False)
+    with caplog.at_level(logging.ERROR, logger="app.middleware.error_handler"):
+        response = client.get("/fail")
+
+    assert response.status_code == 500
+    assert response.json() == {"error": "An unexpected error occurred"}
+    [record] = caplog.records
+    assert record.exc_info[0] is RuntimeError
+    assert record.path == "/fail"
@@ -0,0 +1,58 @@
+import os
+import subprocess
+import sys
+
+from prometheus_client import REGISTRY
+
+from app import metrics
+
+def _sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+def test_requests_are_labeled_by_route_template(client, sample_todo):
+    todo_id = sample_todo.id
+    labels = {"method": "GET", "route": "/todos/{todo_id}", "status": "200"}
+    before = _sample("http_requests_total", **labels)
+    before_latency = _sample("http_request_duration_seconds_count", **labels)
+
+    assert client.get(f"/todos/{todo_id}").status_code == 200
+
+    assert _sample("http_requests_total", **labels) == before + 1
+    assert _sample("http_request_duration_seconds_count", **labels) == before_latency + 1
+    assert _sample("http_requests_in_flight", method="GET") == 0
+
+def test_missing_todo_and_unknown_path(client):
+    not_found = {"method": "GET", "route": "/todos/{todo_id}", "status": "404"}
+    unmatched = {"method": "GET", "route": metrics.UNMATCHED_ROUTE, "status": "404"}
+    before = _sample("http_requests_total", **not_found), _sample("http_requests_total", **unmatched)
+
+    client.get("/todos/999999")
+    client.get("/no/such/path")
+
+    after = _sample("http_requests_total", **not_found), _sample("http_requests_total", **unmatched)
+    assert after == (before[0] + 1, before[1] + 1)
+
+def test_db_queries_per_request(client, sample_todo):
+    labels = {"method": "PATCH", "route": "/todos/{todo_id}/complete"}
+    before = _sample("http_request_db_queries_count", **labels)
+    client.patch(f"/todos/{sample_todo.id}/complete")
+    assert _sample("http_request_db_queries_count", **labels) == before + 1
+
+def test_metrics_endpoint(client):
+    client.get("/todos")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'http_requests_total{method="GET",route="/todos",status="200"}' in response.text
+
+def test_workers_are_aggregated_in_multiprocess_mode(tmp_path):
+    env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path)}
+    record = "from app import metrics; metrics.observe_request('GET', '/todos', 200, 0.01, 2, 0.001)"
+    for _ in range(2):
+        subprocess.run([sys.executable, "-c", record], env=env, check=True)
+    output = subprocess.run(
+        [sys.executable, "-c", "from app import metrics; print(metrics.render()[0].decode())"],
+        env=env, check=True, capture_output=True, text=True,
+    ).stdout
+    assert 'http_requests_total{method="GET",route="/todos",status="200"} 2.0' in output
+    assert 'http_request_db_queries_sum{method="GET",route="/todos"} 4.0' in output
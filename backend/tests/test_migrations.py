@@ -0,0 +1,123 @@
+from datetime import date
+
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import Session
+
+from app.database import Base
+from app.migrations import MIGRATIONS, migrate
+from app.repositories.todo_repository import TodoRepository
+from app.schemas import TodoCreate
+
+REVISIONS = [migration.revision for migration in MIGRATIONS]
+
+# todos as created before versioned migrations.
+LEGACY_SCHEMA = [
+    """CREATE TABLE todos (
+        id INTEGER NOT NULL PRIMARY KEY,
+        title VARCHAR NOT NULL,
+        description VARCHAR,
+        due_date DATE,
+        is_completed BOOLEAN NOT NULL,
+        created_at DATETIME NOT NULL
+    )""",
+    "CREATE INDEX ix_todos_id ON todos (id)",
+    """INSERT INTO todos (title, description, due_date, is_completed, created_at)
+    VALUES ('Buy milk', 'Semi-skimmed', '2024-12-31', 0, '2024-01-01 09:00:00')""",
+]
+
+def _engine(tmp_path):
+    return create_engine(f"sqlite:///{tmp_path / 'todo.db'}")
+
+def _legacy_engine(tmp_path):
+    engine = _engine(tmp_path)
+    with engine.begin() as connection:
+        for statement in LEGACY_SCHEMA:
+            connection.exec_driver_sql(statement)
+    return engine
+
+def _schema(engine):
+    inspector = inspect(engine)
+    return {
+        table: (
+            {column["name"] for column in inspector.get_columns(table)},
+            {index["name"] for index in inspector.get_indexes(table)},
+        )
+        for table in inspector.get_table_names()
+    }
+
+def _recorded(engine):
+    with engine.connect() as connection:
+        return list(connection.scalars(text("SELECT revision FROM schema_migrations ORDER BY revision")))
+
+def test_a_new_database_is_created_at_the_latest_revision(tmp_path):
+    engine = _engine(tmp_path)
+    assert migrate(engine) == REVISIONS
+    assert set(Base.metadata.tables) <= set(inspect(engine).get_table_names())
+    assert _recorded(engine) == REVISIONS
+    assert migrate(engine) == []
+    engine.dispose()
+
+def test_an_existing_database_is_upgraded_in_place(tmp_path):
+    engine = _legacy_engine(tmp_path)
+    assert migrate(engine) == REVISIONS
+    assert _recorded(engine) == REVISIONS
+    indexes = {index["name"] for index in inspect(engine).get_indexes("todos")}
+    assert {"ix_todos_created_at_id", "ix_todos_title_id", "ix_todos_open_due_date"} <= indexes
+    with engine.connect() as connection:
+        assert connection.scalar(text("SELECT title FROM todos")) == "Buy milk"
+        # Existing todos are indexed for search.
+        assert connection.scalar(text("SELECT rowid FROM todos_fts WHERE todos_fts MATCH 'milk'")) == 1
+    assert migrate(engine) == []
+
+    with Session(engine) as db:
+        repository = TodoRepository(db, counts=True)
+        # The backfilled counts include the existing todo.
+        assert repository.get_stats(date(2024, 12, 31))["due_today"] == 1
+        created = repository.create(TodoCreate(title="Call mum"))
+        changes = repository.get_changes(None)
+        assert [(todo.title, todo.version) for todo in changes.upserts] == [("Buy milk", 1), ("Call mum", 2)]
+        assert repository.get_changes(1).upserts == [created]
+        assert repository.get_stats(date(2024, 12, 31))["total"] == 2
+    engine.dispose()
+
+def test_an_upgraded_database_matches_a_new_one(tmp_path):
+    (tmp_path / "new").mkdir()
+    new = _engine(tmp_path / "new")
+    migrate(new)
+    upgraded = _legacy_engine(tmp_path)
+    migrate(upgraded)
+    assert _schema(upgraded) == _schema(new)
+
+    with Session(upgraded) as db:
+        repository = TodoRepository(db)
+        repository.create(TodoCreate(title="Call mum"))
+        repository.delete(2)
+        # todos is AUTOINCREMENT now, so a deleted id is not handed out again.
+        assert repository.create(TodoCreate(title="Walk the dog")).id == 3
+        assert [todo.title for todo, _ in repository.search("milk")] == ["Buy milk"]
+    new.dispose()
+    upgraded.dispose()
+
+def test_only_missing_revisions_are_applied(tmp_path):
+    engine = _legacy_engine(tmp_path)
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            "CREATE TABLE schema_migrations (revision VARCHAR(64) PRIMARY KEY, applied_at DATETIME NOT NULL)"
+        )
+        connection.exec_driver_sql(
+            "INSERT INTO schema_migrations VALUES ('0001_baseline', '2024-01-01 00:00:00')"
+        )
+
+    assert migrate(engine) == REVISIONS[1:]
+    engine.dispose()
+
+def test_revisions_skip_what_create_all_already_made(tmp_path):
+    # Databases created with create_all before migrations were recorded.
+    engine = _engine(tmp_path)
+    Base.metadata.create_all(engine)
+    assert migrate(engine) == REVISIONS
+    with Session(engine) as db:
+        repository = TodoRepository(db)
+        repository.create(TodoCreate(title="Call mum"))
+        assert repository.current_version() == repository.last_version
+    engine.dispose()
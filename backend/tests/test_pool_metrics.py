@@ -0,0 +1,61 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+from app.pool_metrics import PoolMetrics
+
+@pytest.fixture
+def metrics():
+    return PoolMetrics()
+
+@pytest.fixture
+def engine(tmp_path, metrics):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=metrics.pool_class(QueuePool),
+        pool_size=1,
+        max_overflow=1,
+        pool_timeout=0.05,
+    )
+    metrics.listen(engine)
+    yield engine
+    engine.dispose()
+
+def test_checkouts_and_waits_are_recorded(engine, metrics):
+    for _ in range(3):
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+    stats = metrics.snapshot(engine.pool)
+    assert stats["pool_class"] == "InstrumentedQueuePool"
+    assert stats["checkouts"] == 3
+    assert stats["checkins"] == 3
+    assert stats["connects"] == 1
+    assert stats["wait_seconds"]["count"] == 3
+    assert stats["checkedout"] == 0
+    assert stats["size"] == 1
+
+def test_overflow_and_timeouts_are_recorded(engine, metrics):
+    first, second = engine.connect(), engine.connect()
+    with pytest.raises(PoolTimeoutError):
+        engine.connect()
+    stats = metrics.snapshot(engine.pool)
+    assert stats["checkedout"] == 2
+    assert stats["peak_checked_out"] == 2
+    assert stats["peak_overflow"] == 1
+    assert stats["timeouts"] == 1
+    assert stats["wait_seconds"]["max"] >= 0.05
+    first.close()
+    second.close()
+
+def test_invalidations_are_recorded(engine, metrics):
+    with engine.connect() as conn:
+        conn.invalidate()
+    assert metrics.snapshot(engine.pool)["invalidations"] == 1
+
+def test_internal_pool_endpoint(client):
+    response = client.get("/internal/pool")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["config"]["pool_size"] == 5
+    assert "checkouts" in data["primary"]
@@ -0,0 +1,128 @@
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import sessionmaker
+
+from app import cache, database
+from app.cache import LRUCache
+from app.database import Base, _replica
+from app.middleware.read_your_writes import ReadYourWritesMiddleware
+from app.models import Todo
+from app.replicas import WROTE_AT_COOKIE, ReplicaSet
+
+def _replica_with(url: str, title: str):
+    replica = _replica(url)
+    Base.metadata.create_all(bind=replica.engine)
+    db = sessionmaker(bind=replica.engine)()
+    db.add(Todo(title=title))
+    db.commit()
+    db.close()
+    return replica
+
+@pytest.fixture
+def replicas(tmp_path, monkeypatch):
+    replica_set = ReplicaSet(
+        [_replica_with(f"sqlite:///{tmp_path / f'replica{i}.db'}", f"From replica {i}") for i in range(2)],
+        check_seconds=0,
+        retry_seconds=60,
+    )
+    monkeypatch.setattr(database, "replica_set", replica_set)
+    yield replica_set
+    for replica in replica_set.replicas:
+        replica.engine.dispose()
+
+def _titles(client):
+    return [todo["title"] for todo in client.get("/todos").json()]
+
+def test_reads_round_robin_over_replicas(client, replicas):
+    assert [_titles(client) for _ in range(4)] == [
+        ["From replica 0"], ["From replica 1"], ["From replica 0"], ["From replica 1"],
+    ]
+
+def test_writes_go_to_the_primary(client, replicas, db_session):
+    response = client.post("/todos", json={"title": "On the primary"})
+    assert response.status_code == 200
+    assert db_session.query(Todo).one().title == "On the primary"
+
+def test_the_change_feed_reads_from_the_primary(client, replicas, db_session):
+    db_session.add(Todo(title="On the primary"))
+    db_session.commit()
+    upserts = client.get("/todos/changes").json()["upserts"]
+    assert [todo["title"] for todo in upserts] == ["On the primary"]
+
+def test_recent_writers_read_from_the_primary(client, replicas, db_session):
+    db_session.add(Todo(title="On the primary"))
+    db_session.commit()
+    client.cookies.set(WROTE_AT_COOKIE, str(time.time()))
+    assert _titles(client) == ["On the primary"]
+    client.cookies.set(WROTE_AT_COOKIE, str(time.time() - 60))
+    assert _titles(client) in (["From replica 0"], ["From replica 1"])
+
+def test_replica_reads_only_fill_the_cache_once_caught_up_with_its_writes(client, replicas, db_session, monkeypatch):
+    todo_cache = LRUCache(max_entries=10, ttl_seconds=60, floor_seconds=60)
+    monkeypatch.setattr(cache, "todo_cache", todo_cache)
+    db_session.add(Todo(title="On the primary"))
+    db_session.commit()
+    todo_id = client.put("/todos/1", json={"title": "Renamed"}).json()["id"]
+    client.cookies.clear()
+    # The replicas have not caught up with the rename.
+    assert client.get(f"/todos/{todo_id}").json()["title"] == "From replica 0"
+    assert todo_cache.stats()["size"] == 0
+    assert todo_cache.stats()["stale_fills"] == 1
+
+    for replica in replicas.replicas:
+        with replica.engine.begin() as connection:
+            connection.exec_driver_sql("UPDATE todos SET title = 'Replicated', version = 1000")
+    assert client.get(f"/todos/{todo_id}").json()["title"] == "Replicated"
+    assert client.get(f"/todos/{todo_id}").json()["title"] == "Replicated"
+    assert todo_cache.stats()["hits"] == 1
+
+def test_down_replicas_are_skipped_then_fall_back_to_the_primary(client, tmp_path, monkeypatch, db_session):
+    healthy = _replica_with(f"sqlite:///{tmp_path / 'replica.db'}", "From replica")
+    # SQLite cannot create a file in a missing directory, so connecting fails.
+    broken = _replica(f"sqlite:///{tmp_path / 'missing' / 'replica.db'}")
+    replica_set = ReplicaSet([broken, healthy], check_seconds=0, retry_seconds=60)
+    monkeypatch.setattr(database, "replica_set", replica_set)
+    db_session.add(Todo(title="On the primary"))
+    db_session.commit()
+
+    assert [_titles(client) for _ in range(3)] == [["From replica"]] * 3
+    assert [replica["up"] for replica in replica_set.status()["replicas"]] == [False, True]
+
+    healthy.engine.dispose()
+    (tmp_path / "replica.db").unlink()
+    (tmp_path / "replica.db").mkdir()
+    assert _titles(client) == ["On the primary"]
+    assert replica_set.status()["fallbacks"] == 1
+
+    # Retried once the retry interval has passed.
+    (tmp_path / "missing").mkdir()
+    Base.metadata.create_all(bind=broken.engine)
+    broken.down_until = 0.0
+    assert _titles(client) == []
+    broken.engine.dispose()
+
+def test_internal_pool_reports_replicas(client, replicas):
+    data = client.get("/internal/pool").json()
+    assert [replica["up"] for replica in data["replicas"]["replicas"]] == [True, True]
+
+def test_middleware_marks_successful_writes_only():
+    app = FastAPI()
+    app.add_middleware(ReadYourWritesMiddleware)
+
+    @app.get("/read")
+    def read():
+        return {}
+
+    @app.post("/write/{status}")
+    def write(status: int):
+        from fastapi.responses import JSONResponse
+        return JSONResponse({}, status_code=status)
+
+    client = TestClient(app)
+    assert WROTE_AT_COOKIE not in client.get("/read").cookies
+    assert WROTE_AT_COOKIE not in client.post("/write/400").cookies
+    cookie = client.post("/write/201").cookies[WROTE_AT_COOKIE]
+    assert abs(float(cookie) - time.time()) < 5
@@ -0,0 +1,187 @@
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.dialects import postgresql
+
+from app.repositories.todo_repository import TodoRepository, next_version_statement
+from app.schemas import TodoCreate, TodoUpdate
+
+@pytest.fixture(params=[True, False], ids=["returning", "select-then-write"])
+def repository(request, db_session):
+    return TodoRepository(db_session, returning=request.param)
+
+@pytest.fixture
+def statements(db_session):
+    engine = db_session.get_bind()
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement.split()[0].upper())
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield executed
+    event.remove(engine, "before_cursor_execute", record)
+
+def test_complete(repository, sample_todo):
+    todo = repository.complete(sample_todo.id)
+    assert todo.id == sample_todo.id
+    assert todo.is_completed is True
+
+def test_complete_already_completed(repository, completed_todo):
+    assert repository.complete(completed_todo.id) is None
+
+def test_complete_not_found(repository):
+    assert repository.complete(999) is None
+
+def test_incomplete(repository, completed_todo):
+    todo = repository.incomplete(completed_todo.id)
+    assert todo.is_completed is False
+
+def test_incomplete_already_incomplete(repository, sample_todo):
+    assert repository.incomplete(sample_todo.id) is None
+
+def test_update(repository, sample_todo):
+    todo = repository.update(sample_todo.id, TodoUpdate(title="Updated", due_date=None))
+    assert todo.title == "Updated"
+    assert todo.due_date is None
+    assert todo.description == "Test Description"
+
+def test_update_not_found(repository):
+    assert repository.update(999, TodoUpdate(title="Updated")) is None
+
+def test_delete(repository, sample_todo):
+    todo_id = sample_todo.id
+    assert repository.delete(todo_id) is True
+    assert repository.get_by_id(todo_id) is None
+
+def test_delete_not_found(repository):
+    assert repository.delete(999) is False
+
+def test_delete_all(repository, sample_todo, completed_todo):
+    assert repository.delete_all() == 2
+    assert repository.get_all() == []
+
+def test_returning_mutations_use_one_statement_per_row_change(db_session, sample_todo, statements):
+    repository = TodoRepository(db_session, returning=True)
+    todo_id = sample_todo.id
+
+    repository.complete(todo_id)
+    repository.incomplete(todo_id)
+    repository.update(todo_id, TodoUpdate(title="Updated"))
+    repository.delete(todo_id)
+    # Each write first takes a change version (INSERT INTO todo_changes); deletes leave a tombstone.
+    assert statements == ["INSERT", "UPDATE"] * 3 + ["INSERT", "DELETE", "INSERT"]
+
+def test_postgresql_writers_lock_their_version_before_and_after_taking_it():
+    sql = str(next_version_statement("postgresql").compile(dialect=postgresql.dialect()))
+    # The marker comes first, in the CTE the INSERT reads from; the version lock in RETURNING.
+    assert sql.index("pg_advisory_xact_lock_shared") < sql.index("INSERT INTO todo_changes")
+    assert "RETURNING todo_changes.version, pg_advisory_xact_lock_shared(todo_changes.version)" in sql
+
+def test_writes_that_change_nothing_give_back_their_version(repository, completed_todo):
+    version = repository.current_version()
+    assert repository.complete(completed_todo.id) is None
+    assert repository.update(999, TodoUpdate(title="Missing")) is None
+    assert repository.update_many({999: {"title": "Missing"}}) == {}
+    assert repository.delete(999) is False
+    assert repository.delete_many([999]) == set()
+    assert repository.last_version is None
+    assert repository.current_version() == version
+    repository.incomplete(completed_todo.id)
+    assert repository.current_version() == version + 1
+
+def test_create(repository):
+    todo = repository.create(TodoCreate(title="New"))
+    assert todo.id is not None
+    assert todo.is_completed is False
+
+def test_create_many(repository):
+    todos = repository.create_many([TodoCreate(title="One"), TodoCreate(title="Two", due_date="")])
+    assert [todo.title for todo in todos] == ["One", "Two"]
+    assert all(todo.id is not None and todo.is_completed is False for todo in todos)
+
+def test_update_many(repository, sample_todo, completed_todo):
+    updated = repository.update_many({
+        sample_todo.id: {"is_completed": True},
+        completed_todo.id: {"title": "Renamed"},
+        999: {"title": "Missing"},
+    })
+    assert set(updated) == {sample_todo.id, completed_todo.id}
+    assert updated[sample_todo.id].is_completed is True
+    assert updated[completed_todo.id].title == "Renamed"
+
+def test_delete_many(repository, sample_todo, completed_todo):
+    assert repository.delete_many([sample_todo.id, 999]) == {sample_todo.id}
+    assert [todo.id for todo in repository.get_all()] == [completed_todo.id]
+
+def test_iter_batches(repository):
+    repository.create_many([TodoCreate(title=f"Todo {i}") for i in range(5)])
+    batches = list(repository.iter_batches(2))
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    assert [todo.title for batch in batches for todo in batch] == [f"Todo {i}" for i in range(5)]
+
+TODAY = date(2025, 6, 10)
+
+def _seed_for_stats(repository):
+    due = {"overdue": TODAY - timedelta(days=3), "today": TODAY, "soon": TODAY + timedelta(days=6), "later": TODAY + timedelta(days=7)}
+    todos = repository.create_many(
+        [TodoCreate(title=name, due_date=due_date) for name, due_date in due.items()] + [TodoCreate(title="undated")]
+    )
+    return {todo.title: todo.id for todo in todos}
+
+def test_get_stats(repository):
+    ids = _seed_for_stats(repository)
+    repository.complete(ids["later"])
+    assert repository.get_stats(TODAY) == {
+        "total": 5, "completed": 1, "overdue": 1, "due_today": 1, "due_this_week": 2
+    }
+
+def test_counts_follow_every_write(db_session, repository):
+    repository.counts = True
+    ids = _seed_for_stats(repository)
+    repository.complete(ids["overdue"])
+    repository.incomplete(ids["overdue"])
+    repository.complete(ids["today"])
+    repository.update(ids["soon"], TodoUpdate(due_date=TODAY - timedelta(days=1)))
+    repository.update(ids["undated"], TodoUpdate(title="Renamed"))
+    repository.update_many({ids["later"]: {"due_date": TODAY, "is_completed": True}, 999: {"title": "missing"}})
+    repository.delete(ids["undated"])
+    repository.delete_many([ids["overdue"], 999])
+    repository.create(TodoCreate(title="new", due_date=TODAY))
+
+    counted = repository.get_stats(TODAY)
+    repository.counts = False
+    assert counted == repository.get_stats(TODAY)
+    assert counted == {"total": 4, "completed": 2, "overdue": 1, "due_today": 1, "due_this_week": 1}
+
+    repository.counts = True
+    repository.delete_all()
+    repository.create(TodoCreate(title="after reset"))
+    assert repository.get_stats(TODAY)["total"] == 1
+
+def test_rebuild_counts(db_session, repository):
+    _seed_for_stats(repository)
+    counted = TodoRepository(db_session, counts=True)
+    assert counted.get_stats(TODAY)["total"] == 0
+    counted.rebuild_counts()
+    assert counted.get_stats(TODAY) == repository.get_stats(TODAY)
+
+def test_search_ranks_title_matches_first_and_stems(repository):
+    repository.create_many([
+        TodoCreate(title="Call the dentist", description="Ask about groceries"),
+        TodoCreate(title="Buy groceries", description="Milk and eggs"),
+        TodoCreate(title="Unrelated", description=None),
+    ])
+    assert [todo.title for todo, _ in repository.search("grocery")] == ["Buy groceries", "Call the dentist"]
+    assert [todo.title for todo, _ in repository.search("buy milk")] == ["Buy groceries"]
+    assert len(repository.search('"dentist" (call*')) == 1
+    assert repository.search("   ") == []
+
+def test_search_follows_updates_and_deletes(repository, sample_todo):
+    assert repository.search("renamed") == []
+    repository.update(sample_todo.id, TodoUpdate(title="Renamed todo"))
+    [(todo, _)] = repository.search("renamed")
+    assert todo.id == sample_todo.id
+    repository.delete(sample_todo.id)
+    assert repository.search("renamed") == []
@@ -0,0 +1,73 @@
+import json
+from datetime import date, datetime
+
+import msgpack
+import pytest
+
+from app import schemas
+from app.middleware.content_negotiation import prefers_msgpack
+from app.models import Todo
+from app.responses import TodoListResponse, msgpack_requested
+
+MSGPACK = "application/msgpack"
+
+def test_todo_list_response_matches_schema_serialization():
+    todos = [
+        Todo(id=1, title="Dated", description="Description", due_date=date(2024, 12, 31),
+             is_completed=True, created_at=datetime(2024, 1, 2, 3, 4, 5, 678901)),
+        Todo(id=2, title="Undated", created_at=datetime(2024, 1, 2)),
+    ]
+    expected = [schemas.Todo.model_validate(todo).model_dump(mode="json") for todo in todos]
+    assert json.loads(TodoListResponse(todos).body) == expected
+
+def test_output_schema_skips_input_validators():
+    todo = schemas.Todo(id=1, title="  padded  ", is_completed=False, created_at=datetime(2024, 1, 1))
+    assert todo.title == "  padded  "
+
+def test_msgpack_list_matches_json():
+    todos = [Todo(id=1, title="Dated", due_date=date(2024, 12, 31), is_completed=False,
+                  created_at=datetime(2024, 1, 2, 3, 4, 5, 678901))]
+    token = msgpack_requested.set(True)
+    try:
+        response = TodoListResponse(todos)
+    finally:
+        msgpack_requested.reset(token)
+    assert response.headers["Content-Type"] == MSGPACK
+    assert msgpack.unpackb(response.body) == json.loads(TodoListResponse(todos).body)
+
+@pytest.mark.parametrize("accept, expected", [
+    (MSGPACK, True),
+    ("application/x-msgpack", True),
+    (f"{MSGPACK}, application/json;q=0.5", True),
+    (f"application/json, {MSGPACK};q=0.5", False),
+    (f"{MSGPACK};q=0", False),
+    ("application/json", False),
+    ("*/*", False),
+])
+def test_prefers_msgpack(accept, expected):
+    assert prefers_msgpack(accept) is expected
+
+def test_msgpack_requests_and_responses(client):
+    headers = {"Accept": MSGPACK, "Content-Type": MSGPACK}
+    response = client.post("/todos", content=msgpack.packb({"title": "Packed", "due_date": None}), headers=headers)
+    assert response.status_code == 200
+    assert response.headers["Content-Type"] == MSGPACK
+    assert "Accept" in response.headers["Vary"].split(", ")
+    todo = msgpack.unpackb(response.content)
+    assert todo["title"] == "Packed"
+
+    response = client.get(f"/todos/{todo['id']}", headers={"Accept": MSGPACK})
+    assert msgpack.unpackb(response.content) == todo
+    response = client.get("/todos", headers={"Accept": MSGPACK})
+    assert msgpack.unpackb(response.content) == [todo]
+    assert client.get("/todos").json() == [todo]
+
+def test_msgpack_errors_are_json(client):
+    headers = {"Accept": MSGPACK, "Content-Type": MSGPACK}
+    response = client.post("/todos", content=b"\xc1", headers=headers)
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Request body is not valid MessagePack"}
+    response = client.post("/todos", content=msgpack.packb({"title": ""}), headers=headers)
+    assert response.status_code == 422
+    assert response.headers["Content-Type"] == "application/json"
+    assert client.get("/todos/999", headers=headers).json()["detail"] == "Todo with id 999 not found"
@@ -0,0 +1,64 @@
+import asyncio
+import logging
+import os
+import subprocess
+import sys
+
+from fastapi import FastAPI
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.orm import sessionmaker
+
+from app import config, startup
+from benchmarks.bench_startup import parse_importtime
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _run_lifespan():
+    async def scenario():
+        async with startup.lifespan(FastAPI()):
+            pass
+
+    asyncio.run(scenario())
+
+def _use_engine(monkeypatch, url):
+    engine = create_engine(url, pool_size=5)
+    monkeypatch.setattr(startup, "engine", engine)
+    monkeypatch.setattr(startup, "SessionLocal", sessionmaker(bind=engine))
+    monkeypatch.setattr(config, "DB_MODE", "sync")
+    monkeypatch.setattr(startup, "_prepared", False)
+    return engine
+
+def test_importing_the_app_does_not_touch_the_database(tmp_path):
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp_path / 'missing' / 'todo.db'}")
+    completed = subprocess.run(
+        [sys.executable, "-c", "import app.main"], cwd=BACKEND, env=env, capture_output=True, text=True
+    )
+    assert completed.returncode == 0, completed.stderr
+    assert not (tmp_path / "missing").exists()
+
+def test_lifespan_creates_schema_and_warms_the_pool(tmp_path, monkeypatch):
+    engine = _use_engine(monkeypatch, f"sqlite:///{tmp_path / 'todo.db'}")
+    monkeypatch.setattr(config, "DB_CREATE_SCHEMA", True)
+    monkeypatch.setattr(config, "DB_WARMUP_CONNECTIONS", 3)
+    _run_lifespan()
+    assert {"todos", "todo_changes"} <= set(inspect(engine).get_table_names())
+    assert engine.pool.checkedin() == 3
+    engine.dispose()
+
+def test_failed_warm_up_is_logged_not_raised(tmp_path, monkeypatch, caplog):
+    # No schema: the warm-up queries fail.
+    engine = _use_engine(monkeypatch, f"sqlite:///{tmp_path / 'todo.db'}")
+    monkeypatch.setattr(config, "DB_CREATE_SCHEMA", False)
+    monkeypatch.setattr(config, "DB_WARMUP_CONNECTIONS", 2)
+    with caplog.at_level(logging.WARNING, logger="app.startup"):
+        _run_lifespan()
+    assert "Database warm-up failed" in caplog.text
+    engine.dispose()
+
+def test_parse_importtime():
+    stderr = (
+        "import time: self [us] | cumulative | imported package\n"
+        "import time:       591 |        591 |   app.config\n"
+        "import time:     19672 |     801198 | app.main\n"
+    )
+    assert parse_importtime(stderr) == [("app.config", 591, 591), ("app.main", 19672, 801198)]
@@ -0,0 +1,61 @@
+import logging
+import re
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app import request_timing, routes
+from app.database import get_db
+from app.middleware.timing import TimingMiddleware
+
+@pytest.fixture
+def timed_engine(db_session):
+    engine = db_session.get_bind()
+    request_timing.listen(engine)
+    yield engine
+    event.remove(engine, "before_cursor_execute", request_timing._before_cursor_execute)
+    event.remove(engine, "after_cursor_execute", request_timing._after_cursor_execute)
+
+def _server_timing(response) -> dict:
+    return {
+        name: float(duration)
+        for name, duration in re.findall(r"(\w+);dur=([\d.]+)", response.headers["Server-Timing"])
+    }
+
+def test_server_timing_header(client, timed_engine, sample_todo):
+    todo_id = sample_todo.id
+    response = client.get(f"/todos/{todo_id}")
+    assert response.status_code == 200
+    assert 'desc="1 queries"' in response.headers["Server-Timing"]
+    timings = _server_timing(response)
+    assert set(timings) == {"db", "pool", "handler", "serialize", "total"}
+    assert timings["handler"] >= timings["db"]
+    assert timings["total"] >= timings["handler"] + timings["serialize"]
+
+def test_queries_are_recorded_only_while_a_timing_is_active(db_session, timed_engine, sample_todo):
+    db_session.expire_all()
+    timing = request_timing.RequestTiming()
+    token = request_timing.activate(timing)
+    db_session.get(type(sample_todo), sample_todo.id)
+    request_timing.deactivate(token)
+    db_session.expire_all()
+    db_session.get(type(sample_todo), sample_todo.id)
+    assert timing.queries == 1
+    assert timing.statements[0][0].startswith("SELECT")
+
+def test_slow_requests_are_logged_with_their_sql(db_session, timed_engine, sample_todo, caplog):
+    app = FastAPI()
+    app.include_router(routes.router)
+    app.add_middleware(TimingMiddleware, slow_request_ms=0.001)
+    app.dependency_overrides[get_db] = lambda: db_session
+    todo_id = sample_todo.id
+
+    with caplog.at_level(logging.WARNING, logger="app.slow_requests"):
+        response = TestClient(app).patch(f"/todos/{todo_id}/complete")
+    assert response.status_code == 200
+    [record] = caplog.records
+    message = record.getMessage()
+    assert message.startswith(f"Slow request PATCH /todos/{todo_id}/complete -> 200")
+    assert "UPDATE todos" in message
@@ -0,0 +1,151 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import routes
+from app.async_database import to_async_url
+from app.database import Base
+from app.models import Todo
+from app.repositories.async_todo_repository import AsyncTodoRepository
+from app.repositories.todo_repository import TodoRepository
+from app.schemas import TodoCreate
+from app.services.async_todo_service import AsyncTodoService
+from app.services.todo_service import TodoService
+from app.write_coalescer import AsyncWriteCoalescer, WriteCoalescer, WriteTimeout
+
+@pytest.fixture
+def url(tmp_path):
+    url = f"sqlite:///{tmp_path / 'todo.db'}"
+    engine = create_engine(url)
+    Base.metadata.create_all(bind=engine)
+    engine.dispose()
+    return url
+
+@pytest.fixture
+def session_factory(url):
+    engine = create_engine(url)
+    yield sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+    engine.dispose()
+
+def _coalescer(session_factory, service_factory=None, window_seconds=0.05, timeout_seconds=60.0):
+    service_factory = service_factory or (lambda db: TodoService(TodoRepository(db)))
+    return WriteCoalescer(session_factory, service_factory, window_seconds, 100, timeout_seconds)
+
+def _count(session_factory) -> int:
+    with session_factory() as db:
+        return db.scalar(select(func.count()).select_from(Todo))
+
+def test_concurrent_writes_share_commits(session_factory):
+    coalescer = _coalescer(session_factory)
+    with ThreadPoolExecutor(20) as pool:
+        created = list(pool.map(lambda i: coalescer.create_todo(TodoCreate(title=f"Todo {i}")), range(20)))
+    assert sorted(todo.title for todo in created) == sorted(f"Todo {i}" for i in range(20))
+    assert len({todo.id for todo in created}) == 20
+    assert _count(session_factory) == 20
+    assert coalescer.writes == 20
+    assert coalescer.batches < 20
+
+def test_each_write_gets_its_own_error(session_factory):
+    coalescer = _coalescer(session_factory)
+    todo = coalescer.create_todo(TodoCreate(title="Done"))
+    calls = [
+        lambda: coalescer.complete_todo(todo.id),
+        lambda: coalescer.complete_todo(999),
+        lambda: coalescer.create_todo(TodoCreate(title="Kept")),
+    ]
+    with ThreadPoolExecutor(len(calls)) as pool:
+        futures = [pool.submit(call) for call in calls]
+    assert futures[0].result().is_completed is True
+    with pytest.raises(ValueError, match="not found"):
+        futures[1].result()
+    assert futures[2].result().title == "Kept"
+    assert _count(session_factory) == 2
+
+def test_failed_commit_fails_every_write(session_factory):
+    def failing_service(db):
+        def commit():
+            raise RuntimeError("disk full")
+        db.commit = commit
+        return TodoService(TodoRepository(db))
+
+    coalescer = _coalescer(session_factory, failing_service)
+    with ThreadPoolExecutor(3) as pool:
+        futures = [pool.submit(coalescer.create_todo, TodoCreate(title=f"Todo {i}")) for i in range(3)]
+    for future in futures:
+        with pytest.raises(RuntimeError, match="disk full"):
+            future.result()
+    assert _count(session_factory) == 0
+
+def test_failing_to_open_a_session_fails_the_batch_not_the_flusher(session_factory):
+    failures = [RuntimeError("pool timeout")]
+
+    def flaky_session_factory():
+        if failures:
+            raise failures.pop()
+        return session_factory()
+
+    coalescer = _coalescer(flaky_session_factory, timeout_seconds=5)
+    with pytest.raises(RuntimeError, match="pool timeout"):
+        coalescer.create_todo(TodoCreate(title="Lost"))
+    assert coalescer.create_todo(TodoCreate(title="Kept")).title == "Kept"
+    assert _count(session_factory) == 1
+
+def test_writes_time_out_instead_of_waiting_forever(session_factory):
+    release = threading.Event()
+
+    def stuck_session_factory():
+        release.wait(5)
+        return session_factory()
+
+    coalescer = _coalescer(stuck_session_factory, window_seconds=0, timeout_seconds=0.1)
+    with ThreadPoolExecutor(2) as pool:
+        running = pool.submit(coalescer.create_todo, TodoCreate(title="Running"))
+        time.sleep(0.05)
+        queued = pool.submit(coalescer.create_todo, TodoCreate(title="Queued"))
+        for future, was_queued in ((running, False), (queued, True)):
+            with pytest.raises(WriteTimeout) as timeout:
+                future.result()
+            assert timeout.value.queued is was_queued
+        release.set()
+    # The queued write was dropped; the one whose batch was running still commits.
+    time.sleep(0.2)
+    assert _count(session_factory) == 1
+
+def test_async_coalescer(url):
+    async def scenario():
+        engine = create_async_engine(to_async_url(url))
+        factory = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+        coalescer = AsyncWriteCoalescer(
+            factory, lambda db: AsyncTodoService(AsyncTodoRepository(db)), 0.05, max_batch=100
+        )
+        results = await asyncio.gather(
+            *(coalescer.create_todo(TodoCreate(title=f"Todo {i}")) for i in range(10)),
+            coalescer.incomplete_todo(999),
+            return_exceptions=True,
+        )
+        await engine.dispose()
+        return coalescer, results
+
+    coalescer, results = asyncio.run(scenario())
+    assert [todo.title for todo in results[:10]] == [f"Todo {i}" for i in range(10)]
+    assert isinstance(results[10], ValueError)
+    assert coalescer.batches == 1
+
+def test_routes_use_the_coalescer(client, db_session, monkeypatch):
+    coalescer = WriteCoalescer(lambda: db_session, routes.get_todo_service, 0, max_batch=100)
+    monkeypatch.setattr(routes, "write_coalescer", coalescer)
+    response = client.post("/todos", json={"title": "Coalesced"})
+    assert response.status_code == 200
+    todo_id = response.json()["id"]
+    assert client.patch(f"/todos/{todo_id}/complete").json()["is_completed"] is True
+    assert client.patch(f"/todos/{todo_id}/complete").status_code == 404
+    assert client.put(f"/todos/{todo_id}", json={"title": "Renamed"}).json()["title"] == "Renamed"
+    assert client.patch("/todos/999/incomplete").status_code == 404
+    assert coalescer.writes == 5
+    assert client.get("/internal/write-coalescer").json()["writes"] == 5
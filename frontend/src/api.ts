@@ -36,6 +36,8 @@ const apiCall = async <T>(
       method,
       url: `${API_URL}${endpoint}`,
       data,
+      // Sends the read-your-writes cookie, so reads after a write see it.
+      withCredentials: true,
       headers: {
         'Content-Type': 'application/json',
       },